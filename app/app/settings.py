@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.QueryCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,15 +81,30 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# DB_POOL=1 switches to core.backends.postgresql_pool, which hands each
+# request a connection from a per process pool of at most POOL MAX_SIZE
+DB_POOL = bool(int(os.environ.get('DB_POOL', 0)))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.backends.postgresql_pool' if DB_POOL
+            else 'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
-
-
+        # Seconds to keep connections open between requests, opt in
+        # with DB_CONN_MAX_AGE. Pooled connections go back to the pool
+        # after each request instead
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'TIMEOUT': 30,
+            'MAX_AGE': 1800,
+            'CHECK_INTERVAL': 30,
+        },
     }
 }
 
@@ -140,3 +158,129 @@ STATIC_ROOT = 'vol/web/static'
 # the DRF browsable API and Django Admin
 
 AUTH_USER_MODEL = 'core.User'
+
+REST_FRAMEWORK = {
+    # Keyset pagination keeps list endpoints O(page size) however deep the
+    # client pages, the ordering comes from each viewset's 'ordering'
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
+    # JSON is encoded and decoded with orjson when it is installed and with
+    # the stdlib otherwise, see core.renderers. The browsable API is only
+    # offered while debugging
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+    ) + (('rest_framework.renderers.BrowsableAPIRenderer',) if DEBUG else ()),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Token to user resolution cached by user.authentication, entries live
+# for TTL seconds in a per-process LRU or, when SHARED_CACHE names a
+# CACHES alias, only in that cache so every worker sees invalidations
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'SHARED_CACHE': None,
+}
+
+# Uploaded recipe images are stored and resized to these variants on a
+# thread pool by recipe.images, EAGER processes them in the request instead
+RECIPE_IMAGE_PIPELINE = {
+    'WORKERS': 2,
+    'EAGER': False,
+    'VARIANTS': {
+        'thumbnail': (150, 150),
+        'medium': (600, 600),
+    },
+    'QUALITY': 80,
+}
+
+# Rendered list responses of the recipe API cached per user by
+# recipe.caching, in a per-process LRU bounded by MAX_SIZE entries and
+# MAX_BYTES, or in the CACHES alias named by SHARED_CACHE
+RECIPE_RESPONSE_CACHE = {
+    'ENABLED': True,
+    'MAX_SIZE': 1000,
+    'MAX_BYTES': 32 * 1024 * 1024,
+    'TTL': 300,
+    'SHARED_CACHE': None,
+}
+
+# List recipes, tags and ingredients from values() rows rather than
+# model instances when the serializer allows it, see recipe.fastpath
+RECIPE_FAST_LIST = True
+
+# Recipes streamed by the NDJSON export are read from a server side cursor
+# and written out this many at a time, see recipe.exporting
+RECIPE_EXPORT_CHUNK_SIZE = 1000
+
+# Stats of a user's recipes served by recipes/stats/, with the TOP most
+# used tags and ingredients. With ROLLUP on, RECIPE_STATS_ROLLUP=1, the
+# unfiltered stats are read from a per user rollup kept up to date on
+# every write rather than aggregated over the whole collection. Rollups
+# are not updated while it is off, empty core_recipestats before turning
+# it back on
+RECIPE_STATS = {
+    'ROLLUP': os.environ.get('RECIPE_STATS_ROLLUP') == '1',
+    'TOP': 10,
+}
+
+# Recipes sharing tags and ingredients with a recipe, served by
+# recipes/<id>/similar/ from per user indexes held by core.similarity in
+# each process, for the MAX_USERS users that asked lately and at most
+# TTL seconds. LIMIT recipes are returned unless ?limit= asks for more,
+# up to MAX_LIMIT. NumPy is used to rank them when it is installed. An
+# index is dropped, to be built again, once MAX_JOURNAL writes of its
+# user are waiting to be applied to it
+RECIPE_SIMILARITY = {
+    'MAX_USERS': 100,
+    'TTL': 3600,
+    'LIMIT': 10,
+    'MAX_LIMIT': 100,
+    'MAX_JOURNAL': 1000,
+}
+
+# Requests are timed by core.middleware, broken down into SQL, auth, view
+# and render time. The breakdown goes in a Server-Timing header and in the
+# rolling stats of the last WINDOW requests to each endpoint, readable by
+# staff at /api/performance/. Each request is logged to 'core.performance',
+# at WARNING once it takes SLOW_REQUEST_MS
+PERFORMANCE_INSTRUMENTATION = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'WINDOW': 1000,
+    'SLOW_REQUEST_MS': 1000,
+}
+
+# Requests running one query shape THRESHOLD times or more are logged to
+# 'core.querycheck' by core.middleware, QUERY_CHECK=1 turns it on in staging.
+# Tests using core.querycheck.QueryCheckMixin fail on them instead
+QUERY_CHECK = {
+    'ENABLED': os.environ.get('QUERY_CHECK') == '1',
+    'THRESHOLD': 3,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('PERFORMANCE_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+        'core.querycheck': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -18,8 +18,12 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import PerformanceStatsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('api/performance/', PerformanceStatsView.as_view(),
+         name='performance'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
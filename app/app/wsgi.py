@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# Connect each forked worker before its first request instead of during
+# it, never this process whose sockets the workers would share
+if os.environ.get('DB_WARM_CONNECTIONS'):
+    from core.db import warm_after_fork
+    warm_after_fork()
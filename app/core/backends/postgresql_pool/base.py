@@ -0,0 +1,145 @@
+import os
+import threading
+
+from django.db.backends.postgresql import base, creation
+from django.db.backends.postgresql.base import Database
+
+from core.pool import ConnectionPool
+
+
+DEFAULTS = {
+    'MAX_SIZE': 10,
+    # Seconds to wait for a free connection
+    'TIMEOUT': 30,
+    # Seconds after which a connection is closed instead of reused
+    'MAX_AGE': 1800,
+    # Validate connections idle for longer than this many seconds
+    'CHECK_INTERVAL': 30,
+}
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, config):
+    """Return the process wide pool for a set of connection params
+
+    Pools are dropped after a fork, a child must never reuse the
+    sockets of its parent.
+    """
+    global _pools_pid
+    key = (alias, tuple(sorted(conn_params.items())))
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                connect=lambda: Database.connect(**conn_params),
+                close=lambda connection: connection.close(),
+                check=check_connection,
+                max_size=config['MAX_SIZE'],
+                timeout=config['TIMEOUT'],
+                max_age=config['MAX_AGE'],
+                check_interval=config['CHECK_INTERVAL']
+            )
+
+        return _pools[key]
+
+
+def pool_stats():
+    """Return {alias: stats} of the pools of this process"""
+    with _pools_lock:
+        pools = list(_pools.items())
+    stats = {}
+    for (alias, params), pool in pools:
+        name = f'{alias}:{dict(params).get("database")}'
+        stats[name] = pool.stats()
+
+    return stats
+
+
+def close_pools(alias=None):
+    """Close the pooled connections of alias, or of every alias"""
+    with _pools_lock:
+        pools = [
+            pool for (pool_alias, _), pool in _pools.items()
+            if alias is None or pool_alias == alias
+        ]
+    for pool in pools:
+        pool.close_all()
+
+
+def check_connection(connection):
+    """Return whether a psycopg2 connection still answers queries"""
+    if connection.closed:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return reset_connection(connection)
+
+
+def reset_connection(connection):
+    """Roll back any open transaction, returning False if that failed"""
+    if connection.closed:
+        return False
+    status = connection.get_transaction_status()
+    if status == Database.extensions.TRANSACTION_STATUS_IDLE:
+        return True
+    if status == Database.extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    try:
+        connection.rollback()
+    except Database.Error:
+        return False
+
+    return True
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Postgres refuses to drop a database with open connections
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend handing out connections from a per process pool
+
+    Closing a connection, which Django does at the end of every request
+    when CONN_MAX_AGE is 0, returns it to the pool instead. Connections
+    that saw an error or are left in a failed transaction are closed
+    rather than reused. The pool is configured by the POOL dict of the
+    database settings, see DEFAULTS.
+    """
+    creation_class = DatabaseCreation
+
+    def get_pool_config(self):
+        """Return the POOL settings merged over the defaults"""
+        config = dict(DEFAULTS)
+        config.update(self.settings_dict.get('POOL') or {})
+        return config
+
+    def get_new_connection(self, conn_params):
+        self._pool = get_pool(self.alias, conn_params, self.get_pool_config())
+        connection = self._pool.acquire()
+
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        discard = (
+            self.errors_occurred or
+            not reset_connection(self.connection)
+        )
+        self._pool.release(self.connection, discard=discard)
@@ -0,0 +1,210 @@
+import random
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from core import summaries
+from core.models import Recipe, Tag, Ingredient
+
+
+class _Rollback(Exception):
+    """Raised to unwind the benchmark transaction"""
+
+
+@contextmanager
+def rollback():
+    """Run the block in a transaction that is always rolled back
+
+    Benchmarks seed large datasets, this keeps them out of the database
+    once the numbers have been collected.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def percentile(timings, pct):
+    """Return the pct percentile of an already sorted list of timings"""
+    if not timings:
+        return 0.0
+    index = min(len(timings) - 1, int(round(pct / 100 * (len(timings) - 1))))
+
+    return timings[index]
+
+
+def summarize(timings):
+    """Return the min, percentiles and max of timings in milliseconds"""
+    timings = sorted(timings)
+
+    return {
+        'min': timings[0],
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+        'max': timings[-1],
+    }
+
+
+def measure(func, repeat=10):
+    """Call func repeat times and return its timings in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return summarize(timings)
+
+
+def seed_user(email='benchmark@mail.com'):
+    """Create and return the user that owns the benchmark data"""
+    return get_user_model().objects.create_user(
+        email=email,
+        name='Benchmark',
+        password='benchmark'
+    )
+
+
+def seed_recipes(user, count, batch_size=5000):
+    """Bulk create count recipes for user"""
+    Recipe.objects.bulk_create(
+        (
+            Recipe(
+                user=user,
+                title=f'Recipe {i}',
+                time_minutes=i % 120 + 1,
+                price=i % 100 + 0.5
+            )
+            for i in range(count)
+        ),
+        batch_size=batch_size
+    )
+
+
+def seed_tags(user, count, batch_size=5000):
+    """Bulk create count tags for user"""
+    Tag.objects.bulk_create(
+        (Tag(user=user, name=f'Tag {i}') for i in range(count)),
+        batch_size=batch_size
+    )
+
+
+def seed_ingredients(user, count, batch_size=5000):
+    """Bulk create count ingredients for user"""
+    Ingredient.objects.bulk_create(
+        (Ingredient(user=user, name=f'Ingredient {i}') for i in range(count)),
+        batch_size=batch_size
+    )
+
+
+def seed_dataset(users=1, recipes=1000, tags=50, ingredients=100,
+                 tags_per_recipe=3, ingredients_per_recipe=5,
+                 batch_size=5000, seed=0):
+    """Seed users that each own recipes linked to their tags and ingredients
+
+    Links are picked with a seeded random generator so runs are
+    repeatable, and the recipe summaries are rebuilt to match them.
+    Returns the list of users created.
+    """
+    rng = random.Random(seed)
+    created = []
+    for index in range(users):
+        user = seed_user(email=f'benchmark{index}@mail.com')
+        created.append(user)
+        seed_tags(user, tags, batch_size)
+        seed_ingredients(user, ingredients, batch_size)
+        seed_recipes(user, recipes, batch_size)
+
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(user=user).values_list('id', flat=True)
+        )
+        recipe_ids = Recipe.objects.filter(user=user).values_list(
+            'id', flat=True
+        )
+        recipe_tags = []
+        recipe_ingredients = []
+        for recipe_id in recipe_ids.iterator():
+            recipe_tags.extend(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for tag_id in rng.sample(
+                    tag_ids, min(tags_per_recipe, len(tag_ids))
+                )
+            )
+            recipe_ingredients.extend(
+                Recipe.ingredients.through(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id
+                )
+                for ingredient_id in rng.sample(
+                    ingredient_ids,
+                    min(ingredients_per_recipe, len(ingredient_ids))
+                )
+            )
+        Recipe.tags.through.objects.bulk_create(
+            recipe_tags, batch_size=batch_size
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            recipe_ingredients, batch_size=batch_size
+        )
+        summaries.rebuild_summaries(Recipe.objects.filter(user=user))
+
+    return created
+
+
+def analyze():
+    """Settle the seeded data so the planner sees realistic statistics
+
+    Runs deferred constraint checks, which would otherwise block DDL,
+    and refreshes the statistics of the recipe tables. Postgres only.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        for model in (Tag, Ingredient, Recipe,
+                      Recipe.tags.through, Recipe.ingredients.through):
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+
+def format_timings(label, timings):
+    """Return a report line for the result of measure()"""
+    return (
+        f'{label:<40} min {timings["min"]:8.2f}ms  '
+        f'p50 {timings["p50"]:8.2f}ms  p95 {timings["p95"]:8.2f}ms'
+    )
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Return the regressions of results against a baseline
+
+    Both map scenario names to their 'p50' and 'p95' latencies and mean
+    'queries' per request. A latency more than tolerance above the
+    baseline, or any extra query, is a regression. Scenarios missing
+    from either side are not compared.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for key in ('p50', 'p95'):
+            if result[key] > before[key] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: {key} {result[key]:.2f}ms, baseline '
+                    f'{before[key]:.2f}ms'
+                )
+        if result['queries'] > before['queries']:
+            regressions.append(
+                f'{name}: {result["queries"]:g} queries per request, '
+                f'baseline {before["queries"]:g}'
+            )
+
+    return regressions
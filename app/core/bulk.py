@@ -0,0 +1,137 @@
+import datetime
+import io
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def _array_literal(values):
+    """Return a list in the text format of Postgres arrays"""
+    items = []
+    for value in values:
+        if value is None:
+            items.append('NULL')
+        else:
+            items.append('"{}"'.format(
+                str(value).replace('\\', '\\\\').replace('"', '\\"')
+            ))
+
+    return '{' + ','.join(items) + '}'
+
+
+def _copy_value(value):
+    """Return value in the text format of COPY"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        value = _array_literal(value)
+
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace(
+        '\n', '\\n'
+    ).replace('\r', '\\r')
+
+
+def supports_copy(using=DEFAULT_DB_ALIAS):
+    """Return whether rows can be loaded with COPY on the database"""
+    return connections[using].vendor == 'postgresql'
+
+
+def reserve_ids(model, count, using=DEFAULT_DB_ALIAS):
+    """Return count new primary keys drawn from the sequence of model"""
+    if not count:
+        return []
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+            'FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, count]
+        )
+        return [pk for pk, in cursor.fetchall()]
+
+
+def copy_rows(model, fields, rows, using=DEFAULT_DB_ALIAS):
+    """Load rows, tuples of database values for fields, with COPY"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN',
+            buffer
+        )
+
+
+def bulk_insert(model, objs, fetch_ids=True, use_copy=True,
+                using=DEFAULT_DB_ALIAS):
+    """Insert objs with COPY where the database has it, else bulk_create
+
+    With fetch_ids primary keys are reserved up front and set on objs,
+    otherwise the database fills them in. Like bulk_create, save() is
+    not called and no signals are sent.
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+    if not (use_copy and supports_copy(using)):
+        return model._base_manager.using(using).bulk_create(objs)
+
+    connection = connections[using]
+    pk = model._meta.pk
+    fields = [field for field in model._meta.concrete_fields
+              if fetch_ids or field is not pk]
+    if fetch_ids:
+        for obj, pk_value in zip(objs, reserve_ids(model, len(objs), using)):
+            obj.pk = pk_value
+
+    copy_rows(
+        model,
+        fields,
+        (
+            tuple(
+                field.get_db_prep_save(field.pre_save(obj, True), connection)
+                for field in fields
+            )
+            for obj in objs
+        ),
+        using
+    )
+    for obj in objs:
+        obj._state.adding = False
+        obj._state.db = using
+
+    return objs
+
+
+def bulk_insert_values(model, field_names, rows, use_copy=True,
+                       using=DEFAULT_DB_ALIAS):
+    """Insert rows, tuples of values for field_names, letting ids default
+
+    Where COPY is available the values are loaded as they are, without
+    building an instance per row. They must already be database values,
+    such as the ids of foreign keys.
+    """
+    if not (use_copy and supports_copy(using)):
+        bulk_insert(
+            model,
+            (model(**dict(zip(field_names, row))) for row in rows),
+            fetch_ids=False,
+            use_copy=False,
+            using=using
+        )
+        return
+
+    copy_rows(
+        model,
+        [model._meta.get_field(name) for name in field_names],
+        rows,
+        using
+    )
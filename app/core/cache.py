@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread safe in-process cache bounded by entry count with a TTL
+
+    The least recently used entry is evicted once 'max_size' entries are
+    held, or once the entries add up to more than 'max_bytes' as measured
+    by 'sizeof', and entries older than 'ttl' seconds are treated as
+    missing.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, timer=time.monotonic,
+                 max_bytes=None, sizeof=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._timer = timer
+        self._sizeof = sizeof or (lambda key, value: 0)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the value stored under key, or default"""
+        with self._lock:
+            try:
+                value, expires, _ = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= self._timer():
+                self._pop(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def set(self, key, value):
+        """Store value under key, evicting the oldest entries if full"""
+        expires = self._timer() + self.ttl if self.ttl else None
+        size = self._sizeof(key, value)
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (value, expires, size)
+            self.bytes += size
+            while self._data and (
+                len(self._data) > self.max_size or
+                (self.max_bytes is not None and self.bytes > self.max_bytes)
+            ):
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def delete(self, key):
+        """Remove key from the cache if present"""
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+
+    def delete_matching(self, predicate):
+        """Remove every key for which predicate(key) is true
+
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                self._pop(key)
+
+        return len(keys)
+
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def _pop(self, key):
+        """Remove key, which must be present, while holding the lock"""
+        _, _, size = self._data.pop(key)
+        self.bytes -= size
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        """Return whether key is held and not expired, without counting a
+        lookup
+        """
+        with self._lock:
+            try:
+                _, expires, _ = self._data[key]
+            except KeyError:
+                return False
+            if expires is not None and expires <= self._timer():
+                self._pop(key)
+                return False
+
+            return True
+
+    def stats(self):
+        """Return the hit and miss counters of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
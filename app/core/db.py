@@ -0,0 +1,84 @@
+import os
+import time
+from functools import partial
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import OperationalError
+
+
+def check_connection(alias=DEFAULT_DB_ALIAS):
+    """Open the connection of alias if needed and run SELECT 1 on it
+
+    Raises OperationalError when the database can not be reached.
+    """
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def wait_for_connection(alias=DEFAULT_DB_ALIAS, timeout=60,
+                        initial_delay=0.1, max_delay=5, on_retry=None):
+    """Block until check_connection(alias) succeeds
+
+    Failed attempts are retried after a delay that starts at
+    initial_delay and doubles up to max_delay, on_retry(attempt, delay,
+    error) is called before each wait. Returns (attempts, seconds) once
+    connected and re-raises the last OperationalError after timeout
+    seconds.
+    """
+    start = time.monotonic()
+    delay = initial_delay
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            check_connection(alias)
+            return attempts, time.monotonic() - start
+        except OperationalError as error:
+            # Do not keep a half opened connection around for the retry,
+            # unless it holds a transaction someone else is running
+            if not connections[alias].in_atomic_block:
+                connections[alias].close()
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                raise
+            delay = min(delay, max_delay, remaining)
+            if on_retry is not None:
+                on_retry(attempts, delay, error)
+            time.sleep(delay)
+            delay *= 2
+
+
+def warm_connections(aliases=None):
+    """Open and validate the connections of this thread ahead of requests
+
+    With CONN_MAX_AGE set the connections stay open, so the first
+    requests served by this thread skip the connection setup. Returns
+    {alias: milliseconds} spent on each.
+    """
+    timings = {}
+    for alias in aliases or connections:
+        start = time.perf_counter()
+        check_connection(alias)
+        timings[alias] = (time.perf_counter() - start) * 1000
+
+    return timings
+
+
+def warm_after_fork(aliases=None):
+    """Warm the connections of every worker forked from this process
+
+    Servers that load the application before forking their workers, like
+    gunicorn --preload, would share one socket between all the workers
+    if it were opened here. Each worker opens its own right after the
+    fork instead, which only pays off with CONN_MAX_AGE set.
+    """
+    os.register_at_fork(after_in_child=partial(_warm_in_worker, aliases))
+
+
+def _warm_in_worker(aliases):
+    try:
+        warm_connections(aliases)
+    except OperationalError:
+        # The worker's first request connects, or fails, as usual
+        pass
@@ -0,0 +1,177 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from core.benchmark import summarize
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'WINDOW': 1000,
+    'SLOW_REQUEST_MS': 1000,
+}
+# Upper bounds in milliseconds of the latency histogram buckets
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Phases of a request in the order they are reported
+PHASES = ('sql', 'auth', 'view', 'render', 'total')
+
+_local = threading.local()
+
+
+def get_config():
+    """Return the PERFORMANCE_INSTRUMENTATION setting with its defaults"""
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'PERFORMANCE_INSTRUMENTATION', {}))
+    return config
+
+
+class RequestTimings:
+    """Milliseconds spent in each phase of a request and its queries"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {'auth': 0.0, 'render': 0.0, 'sql': 0.0}
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Count and time a query, installed with execute_wrapper()"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.phases['sql'] += (time.perf_counter() - start) * 1000
+
+    def add(self, phase, elapsed):
+        """Add elapsed milliseconds to phase"""
+        self.phases[phase] += elapsed
+
+    def finish(self):
+        """Return the time of each phase and the number of queries
+
+        The view is whatever the total leaves once authentication and
+        rendering are taken out, SQL is counted in the phase it ran in.
+        """
+        total = (time.perf_counter() - self.start) * 1000
+        timings = dict(self.phases)
+        timings['view'] = max(
+            total - timings['auth'] - timings['render'], 0.0
+        )
+        timings['total'] = total
+        timings['queries'] = self.queries
+        return timings
+
+
+@contextmanager
+def recording():
+    """Record the timings of the request handled in the block
+
+    Yields the RequestTimings that timed() in this thread adds to and
+    that every query on any database connection is counted in.
+    """
+    timings = RequestTimings()
+    previous = getattr(_local, 'timings', None)
+    _local.timings = timings
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            yield timings
+    finally:
+        _local.timings = previous
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to phase of the current request
+
+    Does nothing outside recording().
+    """
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, (time.perf_counter() - start) * 1000)
+
+
+def server_timing(timings):
+    """Return the Server-Timing header value for request timings"""
+    metrics = []
+    for phase in PHASES:
+        metric = f'{phase};dur={timings[phase]:.1f}'
+        if phase == 'sql':
+            metric += f';desc="{timings["queries"]} queries"'
+        metrics.append(metric)
+
+    return ', '.join(metrics)
+
+
+class EndpointStats:
+    """Rolling timings of the last window requests to each endpoint"""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """Build the stats from the PERFORMANCE_INSTRUMENTATION setting"""
+        return cls(window=get_config()['WINDOW'])
+
+    def record(self, endpoint, timings):
+        """Add the timings of one request to endpoint"""
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(timings)
+
+    def clear(self):
+        """Forget every endpoint"""
+        with self._lock:
+            self._samples.clear()
+
+    def stats(self):
+        """Return latency percentiles, a histogram and means per endpoint"""
+        with self._lock:
+            samples = {
+                endpoint: list(timings)
+                for endpoint, timings in self._samples.items()
+            }
+
+        stats = {}
+        for endpoint, timings in sorted(samples.items()):
+            totals = [sample['total'] for sample in timings]
+            histogram = [0] * (len(BUCKETS) + 1)
+            for total in totals:
+                histogram[bisect_left(BUCKETS, total)] += 1
+
+            stats[endpoint] = {
+                'count': len(timings),
+                'latency': summarize(totals),
+                'histogram': dict(zip(
+                    [f'le_{bound}' for bound in BUCKETS] + ['inf'],
+                    histogram
+                )),
+                'mean': {
+                    key: sum(sample[key] for sample in timings) / len(timings)
+                    for key in PHASES + ('queries',)
+                },
+            }
+
+        return stats
+
+
+endpoint_stats = EndpointStats.from_settings()
@@ -0,0 +1,260 @@
+import io
+import itertools
+import json
+import platform
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from PIL import Image
+
+from rest_framework.test import APIClient
+
+from core import benchmark
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.caching import response_cache
+
+
+class Scenario:
+    """Requests of one kind, driven through the in-process test client
+
+    request is called with the client and a seeded user for every
+    request and returns the response, whose status must be status.
+    """
+
+    def __init__(self, name, request, status=200, cold=True):
+        self.name = name
+        self.request = request
+        self.status = status
+        # Clear the response cache first so each list request is served
+        # by the view rather than by the cache
+        self.cold = cold
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the API endpoints end to end"""
+    help = 'Seed users with recipes, tags and ingredients, time requests ' \
+           'to each endpoint and record latency percentiles, queries per ' \
+           'request and throughput, comparing them against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=1000,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--ingredients', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Timed requests per scenario')
+        parser.add_argument('--scenario', action='append',
+                            help='Only run the named scenarios')
+        parser.add_argument('--output',
+                            help='Write the results to this JSON file')
+        parser.add_argument('--baseline',
+                            help='Fail on regressions against this file')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Latency increase allowed over baseline')
+
+    def handle(self, *args, **options):
+        scale = {
+            key: options[key]
+            for key in ('users', 'recipes', 'tags', 'ingredients',
+                        'requests')
+        }
+        scenarios = self.get_scenarios()
+        if options['scenario']:
+            unknown = set(options['scenario']) - {s.name for s in scenarios}
+            if unknown:
+                raise CommandError(
+                    f'Unknown scenarios: {", ".join(sorted(unknown))}'
+                )
+            scenarios = [s for s in scenarios
+                         if s.name in options['scenario']]
+
+        results = {}
+        with benchmark.rollback(), tempfile.TemporaryDirectory() as media:
+            self.stdout.write('Seeding dataset...')
+            self.users = benchmark.seed_dataset(
+                users=options['users'],
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients']
+            )
+            benchmark.analyze()
+
+            # The test client's host, images resized in the request and
+            # written to a directory removed afterwards
+            with override_settings(
+                ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['testserver'],
+                MEDIA_ROOT=media,
+                RECIPE_IMAGE_PIPELINE=dict(settings.RECIPE_IMAGE_PIPELINE,
+                                           EAGER=True)
+            ):
+                self.prepare()
+                for scenario in scenarios:
+                    results[scenario.name] = self.run(
+                        scenario, options['requests']
+                    )
+                    self.report(scenario.name, results[scenario.name])
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'scale': scale,
+                    'environment': {
+                        'python': platform.python_version(),
+                        'database': connection.vendor,
+                    },
+                    'scenarios': results,
+                }, file, indent=2, sort_keys=True)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if options['baseline']:
+            self.check_baseline(options['baseline'], scale, results,
+                                options['tolerance'])
+
+    def get_scenarios(self):
+        """Return the scenarios covering each endpoint"""
+        return (
+            Scenario('token', lambda client, user: client.post(
+                reverse('user:token'),
+                {'email': user.email, 'password': 'benchmark'}
+            )),
+            Scenario('me', lambda client, user: client.get(
+                reverse('user:me')
+            )),
+            Scenario('recipes', lambda client, user: client.get(
+                reverse('recipe:recipe-list')
+            )),
+            Scenario('recipes cached', lambda client, user: client.get(
+                reverse('recipe:recipe-list')
+            ), cold=False),
+            Scenario('recipes by tags', lambda client, user: client.get(
+                reverse('recipe:recipe-list'),
+                {'tags': next(self.filters[user.pk]['tags'])}
+            )),
+            Scenario('recipes by ingredients', lambda client, user: (
+                client.get(reverse('recipe:recipe-list'), {
+                    'ingredients': next(self.filters[user.pk]['ingredients'])
+                })
+            )),
+            Scenario('recipe detail', lambda client, user: client.get(
+                reverse('recipe:recipe-detail',
+                        args=[next(self.recipes[user.pk])])
+            )),
+            Scenario('upload image', lambda client, user: client.post(
+                reverse('recipe:recipe-upload-image',
+                        args=[next(self.recipes[user.pk])]),
+                {'image': SimpleUploadedFile(
+                    'image.jpg', self.image, content_type='image/jpeg'
+                )},
+                format='multipart'
+            ), status=202),
+        )
+
+    def prepare(self):
+        """Log the seeded users in and pick what their requests target"""
+        self.clients = {}
+        self.recipes = {}
+        self.filters = {}
+        for user in self.users:
+            client = APIClient()
+            res = client.post(reverse('user:token'), {
+                'email': user.email,
+                'password': 'benchmark',
+            })
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Token {res.data["token"]}'
+            )
+            self.clients[user.pk] = client
+
+            self.recipes[user.pk] = itertools.cycle(
+                Recipe.objects.filter(user=user).order_by('id').values_list(
+                    'id', flat=True
+                )[:100]
+            )
+            self.filters[user.pk] = {
+                name: itertools.cycle([
+                    ','.join(str(pk) for pk in ids[i:i + 2])
+                    for i in range(0, len(ids), 2)
+                ])
+                for name, ids in (
+                    ('tags', list(Tag.objects.filter(
+                        user=user
+                    ).values_list('id', flat=True))),
+                    ('ingredients', list(Ingredient.objects.filter(
+                        user=user
+                    ).values_list('id', flat=True))),
+                )
+            }
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600), 'orange').save(buffer, format='JPEG')
+        self.image = buffer.getvalue()
+
+    def run(self, scenario, requests):
+        """Time requests of scenario, spread over the seeded users"""
+        users = itertools.cycle(self.users)
+        # One untimed request per user warms the caches and connections
+        for user in self.users:
+            self.send(scenario, user)
+
+        timings = []
+        queries = 0
+        start = time.perf_counter()
+        for _ in range(requests):
+            user = next(users)
+            with CaptureQueriesContext(connection) as context:
+                request_start = time.perf_counter()
+                self.send(scenario, user)
+                timings.append((time.perf_counter() - request_start) * 1000)
+            queries += len(context.captured_queries)
+        elapsed = time.perf_counter() - start
+
+        result = benchmark.summarize(timings)
+        result['queries'] = queries / requests
+        result['throughput'] = requests / elapsed
+        return result
+
+    def send(self, scenario, user):
+        """Make one request of scenario as user, checking its status"""
+        if scenario.cold:
+            response_cache.clear()
+        res = scenario.request(self.clients[user.pk], user)
+        if res.status_code != scenario.status:
+            raise CommandError(
+                f'{scenario.name}: expected {scenario.status}, got '
+                f'{res.status_code}'
+            )
+
+    def report(self, name, result):
+        """Write the results of one scenario"""
+        self.stdout.write(
+            benchmark.format_timings(name, result) +
+            f'  p99 {result["p99"]:8.2f}ms  {result["queries"]:5.1f} '
+            f'queries  {result["throughput"]:8.1f} req/s'
+        )
+
+    def check_baseline(self, path, scale, results, tolerance):
+        """Raise CommandError listing the regressions against path"""
+        with open(path) as file:
+            baseline = json.load(file)
+        if baseline['scale'] != scale:
+            self.stdout.write(self.style.WARNING(
+                f'Baseline was recorded at another scale: {baseline["scale"]}'
+            ))
+
+        regressions = benchmark.compare(
+            results, baseline['scenarios'], tolerance
+        )
+        if regressions:
+            raise CommandError(
+                'Regressions against the baseline:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('No regressions'))
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import benchmark
+from core.models import Tag, Ingredient
+
+from recipe import views
+
+
+class Command(BaseCommand):
+    """Django command to compare single item and bulk create throughput"""
+    help = 'Time creating tags and recipes one request at a time ' \
+           'against the bulk endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        items = options['items']
+        batch_size = options['batch_size']
+
+        with benchmark.rollback():
+            self.user = benchmark.seed_user()
+            benchmark.seed_tags(self.user, 20)
+            benchmark.seed_ingredients(self.user, 20)
+            tag_ids = list(Tag.objects.values_list('id', flat=True))
+            ingredient_ids = list(
+                Ingredient.objects.values_list('id', flat=True)
+            )
+
+            tags = [{'name': f'Bulk tag {i}'} for i in range(items)]
+            recipes = [
+                {
+                    'title': f'Bulk recipe {i}',
+                    'tags': tag_ids[i % 17:i % 17 + 3],
+                    'ingredients': ingredient_ids[i % 13:i % 13 + 5],
+                    'time_minutes': 10,
+                    'price': '5.00',
+                }
+                for i in range(items)
+            ]
+
+            self.compare('tags', views.TagViewSet, tags, batch_size)
+            self.compare('recipes', views.RecipeViewset, recipes, batch_size)
+
+    def compare(self, label, viewset, payloads, batch_size):
+        """Report items per second for both ways of creating payloads"""
+        create = viewset.as_view({'post': 'create'})
+        bulk = viewset.as_view({'post': 'bulk'})
+
+        def single():
+            for payload in payloads:
+                self.post(create, payload, 201)
+
+        def batched():
+            for start in range(0, len(payloads), batch_size):
+                self.post(bulk, payloads[start:start + batch_size], 201)
+
+        for mode, func in (('single', single), ('bulk', batched)):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{label:<10} [{mode:<6}] {len(payloads)} items in '
+                f'{elapsed:7.2f}s  {len(payloads) / elapsed:10.1f} items/s'
+            )
+
+    def post(self, view, data, expected_status):
+        """Send data to view as the benchmark user"""
+        request = self.factory.post('/', data, format='json')
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        assert response.status_code == expected_status, response.data
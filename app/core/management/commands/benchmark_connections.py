@@ -0,0 +1,112 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+
+from core import benchmark
+
+
+PLAIN_ENGINE = 'django.db.backends.postgresql'
+POOL_ENGINE = 'core.backends.postgresql_pool'
+
+MODES = {
+    # name: (engine, CONN_MAX_AGE)
+    'connect per request': (PLAIN_ENGINE, 0),
+    'persistent': (PLAIN_ENGINE, None),
+    'pooled': (POOL_ENGINE, 0),
+}
+
+
+class Command(BaseCommand):
+    """Django command to benchmark database connection handling"""
+    help = 'Run concurrent request-like workloads opening a connection ' \
+           'per request, keeping one per thread and using the pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per thread')
+        parser.add_argument('--pool-size', type=int, default=4)
+        parser.add_argument('--query', default='SELECT 1')
+
+    def handle(self, *args, **options):
+        for mode, (engine, max_age) in MODES.items():
+            settings_dict = dict(
+                connections[options['database']].settings_dict
+            )
+            settings_dict.update({
+                'ENGINE': engine,
+                'CONN_MAX_AGE': max_age,
+                'POOL': dict(settings_dict.get('POOL') or {},
+                             MAX_SIZE=options['pool_size']),
+                # Keep the benchmark pool apart from the app's own
+                'OPTIONS': dict(settings_dict['OPTIONS'],
+                                application_name='benchmark_connections'),
+            })
+            timings, elapsed, pool = self.run(
+                options['database'], settings_dict, options
+            )
+
+            total = len(timings)
+            self.stdout.write(benchmark.format_timings(
+                f'{mode} ({total / elapsed:.0f} req/s)',
+                {
+                    'min': timings[0],
+                    'p50': benchmark.percentile(timings, 50),
+                    'p95': benchmark.percentile(timings, 95),
+                    'max': timings[-1],
+                }
+            ))
+            if pool is not None:
+                stats = pool.stats()
+                self.stdout.write(
+                    f'  {stats["created"]} connections opened, '
+                    f'{stats["reused"]} reused, '
+                    f'{stats["waits"]} waits for a free one'
+                )
+                pool.close_all()
+
+    def run(self, alias, settings_dict, options):
+        """Send the requests of every thread
+
+        Returns the sorted timings, the seconds it all took and the
+        connection pool used, if any.
+        """
+        backend = load_backend(settings_dict['ENGINE'])
+        timings = []
+        pools = set()
+        lock = threading.Lock()
+
+        def worker():
+            wrapper = backend.DatabaseWrapper(dict(settings_dict), alias)
+            local = []
+            for _ in range(options['requests']):
+                start = time.perf_counter()
+                # What Django does around every request
+                wrapper.close_if_unusable_or_obsolete()
+                with wrapper.cursor() as cursor:
+                    cursor.execute(options['query'])
+                    cursor.fetchall()
+                wrapper.close_if_unusable_or_obsolete()
+                local.append((time.perf_counter() - start) * 1000)
+            wrapper.close()
+            with lock:
+                timings.extend(local)
+                pools.add(getattr(wrapper, '_pool', None))
+
+        threads = [
+            threading.Thread(target=worker)
+            for _ in range(options['threads'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        timings.sort()
+
+        return timings, elapsed, pools.pop()
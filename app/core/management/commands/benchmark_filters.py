@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import benchmark
+from core.models import Recipe, Tag
+
+from recipe import filters, views
+
+
+class Command(BaseCommand):
+    """Django command to benchmark filtering recipes by tag"""
+    help = 'Compare row counts, queries and latency of the tag filters ' \
+           'on recipes with many tags'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-recipe', type=int, default=15)
+        parser.add_argument('--filter-tags', type=int, default=5,
+                            help='Number of tag ids in the filter')
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        with benchmark.rollback():
+            self.stdout.write('Seeding dataset...')
+            user, = benchmark.seed_dataset(
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=0,
+                tags_per_recipe=options['tags_per_recipe'],
+                ingredients_per_recipe=0
+            )
+            benchmark.analyze()
+            tag_ids = list(Tag.objects.filter(user=user).values_list(
+                'id', flat=True
+            )[:options['filter_tags']])
+            recipes = Recipe.objects.filter(user=user)
+
+            self.stdout.write(self.style.MIGRATE_HEADING('SQL'))
+            candidates = (
+                ('join', recipes.filter(tags__id__in=tag_ids)),
+                ('join distinct',
+                 recipes.filter(tags__id__in=tag_ids).distinct()),
+                ('exists any', filters.filter_related(
+                    recipes, 'tags', tag_ids, filters.MATCH_ANY)),
+                ('grouped all', filters.filter_related(
+                    recipes, 'tags', tag_ids, filters.MATCH_ALL)),
+            )
+            for label, queryset in candidates:
+                queryset = queryset.order_by('-id').values_list(
+                    'id', flat=True
+                )
+                rows = len(queryset)
+                self.stdout.write(benchmark.format_timings(
+                    f'{label} ({rows} rows)',
+                    benchmark.measure(lambda: list(queryset.all()), repeat)
+                ))
+
+            self.stdout.write(self.style.MIGRATE_HEADING('List endpoint'))
+            tags = ','.join(str(pk) for pk in tag_ids)
+            for match in filters.MATCH_CHOICES:
+                self.request_list(user, {'tags': tags, 'match': match},
+                                  repeat)
+
+    def request_list(self, user, params, repeat):
+        """Report queries and latency of a filtered list request"""
+        view = views.RecipeViewset.as_view({'get': 'list'})
+        factory = APIRequestFactory(SERVER_NAME='localhost')
+
+        def request():
+            req = factory.get('/', params)
+            force_authenticate(req, user=user)
+            response = view(req)
+            assert response.status_code == 200, response.data
+            return response
+
+        with CaptureQueriesContext(connection) as queries:
+            request()
+        self.stdout.write(benchmark.format_timings(
+            f'match={params["match"]} ({len(queries)} queries)',
+            benchmark.measure(request, repeat)
+        ))
@@ -0,0 +1,102 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core import benchmark
+from core.models import Recipe, Tag, Ingredient
+
+
+# Indexes on the auto-created M2M tables, added by migration 0007
+THROUGH_INDEXES = (
+    ('core_recipe_tags_tag_recipe_idx',
+     'core_recipe_tags (tag_id, recipe_id)'),
+    ('core_recipe_ingredients_ingredient_recipe_idx',
+     'core_recipe_ingredients (ingredient_id, recipe_id)'),
+)
+
+
+class Command(BaseCommand):
+    """Django command to compare the hot queries with and without indexes"""
+    help = 'Print EXPLAIN plans and timings of the per-user queries ' \
+           'before and after the composite indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--recipes', type=int, default=5000,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=100,
+                            help='Tags and ingredients per user')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--no-explain', action='store_true')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Seeding dataset...')
+        with benchmark.rollback():
+            users = benchmark.seed_dataset(
+                users=options['users'],
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['tags']
+            )
+            queries = self.get_queries(users[len(users) // 2])
+
+            self.drop_indexes()
+            benchmark.analyze()
+            self.report('before', queries, options)
+
+            self.create_indexes()
+            benchmark.analyze()
+            self.report('after', queries, options)
+
+    def get_queries(self, user):
+        """Return the labelled querysets the API runs for user"""
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)[:2]
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(user=user).values_list(
+                'id', flat=True
+            )[:2]
+        )
+        recipes = Recipe.objects.filter(user=user)
+
+        return (
+            ('tags by name', Tag.objects.filter(
+                user=user).order_by('-name', 'id')[:100]),
+            ('ingredients by name', Ingredient.objects.filter(
+                user=user).order_by('-name', 'id')[:100]),
+            ('recipes by id', recipes.order_by('-id')[:100]),
+            ('recipes by tags', recipes.filter(
+                tags__id__in=tag_ids).order_by('-id')[:100]),
+            ('recipes by ingredients', recipes.filter(
+                ingredients__id__in=ingredient_ids).order_by('-id')[:100]),
+        )
+
+    def report(self, stage, queries, options):
+        """Print the plan and timings of every query"""
+        self.stdout.write(self.style.MIGRATE_HEADING(f'== {stage} =='))
+        for label, queryset in queries:
+            if not options['no_explain']:
+                self.stdout.write(queryset.explain())
+            self.stdout.write(benchmark.format_timings(
+                f'{label} [{stage}]',
+                benchmark.measure(lambda: list(queryset.all()),
+                                  options['repeat'])
+            ))
+
+    def drop_indexes(self):
+        """Drop the indexes added by migration 0007"""
+        with connection.schema_editor() as editor:
+            for model in (Tag, Ingredient, Recipe):
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+            for name, _ in THROUGH_INDEXES:
+                editor.execute(f'DROP INDEX {name}')
+
+    def create_indexes(self):
+        """Recreate the indexes added by migration 0007"""
+        with connection.schema_editor() as editor:
+            for model in (Tag, Ingredient, Recipe):
+                for index in model._meta.indexes:
+                    editor.add_index(model, index)
+            for name, target in THROUGH_INDEXES:
+                editor.execute(f'CREATE INDEX {name} ON {target}')
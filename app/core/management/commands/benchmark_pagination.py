@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core import benchmark
+from core.models import Recipe
+
+from recipe.pagination import KeysetPagination, encode_position
+
+
+class Command(BaseCommand):
+    """Django command to compare keyset and offset pagination"""
+    help = 'Time paging through recipes with keyset and offset pagination'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[10000, 100000],
+            help='Dataset sizes to benchmark'
+        )
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        for rows in options['rows']:
+            self.stdout.write(f'Seeding {rows} recipes...')
+            with benchmark.rollback():
+                user = benchmark.seed_user()
+                benchmark.seed_recipes(user, rows)
+                benchmark.analyze()
+                queryset = Recipe.objects.filter(user=user)
+                ids = list(
+                    queryset.order_by('-id').values_list('id', flat=True)
+                )
+
+                for depth in (0, 0.5, 1):
+                    offset = int(max(rows - page_size, 0) * depth)
+                    self.compare(queryset, ids, offset, page_size, options)
+
+    def compare(self, queryset, ids, offset, page_size, options):
+        """Time fetching the page at offset with both paginators"""
+        factory = APIRequestFactory(SERVER_NAME='localhost')
+        offset_request = Request(factory.get('/', {
+            'limit': page_size,
+            'offset': offset,
+        }))
+        params = {'page_size': page_size}
+        if offset:
+            params['cursor'] = encode_position([ids[offset - 1]])
+        keyset_request = Request(factory.get('/', params))
+
+        def offset_page():
+            list(LimitOffsetPagination().paginate_queryset(
+                queryset.order_by('-id'), offset_request
+            ))
+
+        def keyset_page():
+            list(KeysetPagination().paginate_queryset(
+                queryset, keyset_request
+            ))
+
+        label = f'{len(ids)} rows, offset {offset}'
+        self.stdout.write(benchmark.format_timings(
+            f'{label} [offset]',
+            benchmark.measure(offset_page, options['repeat'])
+        ))
+        self.stdout.write(benchmark.format_timings(
+            f'{label} [keyset]',
+            benchmark.measure(keyset_page, options['repeat'])
+        ))
@@ -0,0 +1,91 @@
+import io
+import itertools
+
+from django.core.management.base import BaseCommand
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import benchmark
+from core.models import Recipe
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+from recipe import fastpath, querysets, serializers
+
+
+class Command(BaseCommand):
+    """Django command to compare the DRF and the fast JSON renderers"""
+    help = 'Time rendering and parsing recipe list payloads with the DRF ' \
+           'JSON renderer and parser and with the ones in core'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        recipes = options['recipes']
+        repeat = options['repeat']
+        with benchmark.rollback():
+            self.stdout.write('Seeding dataset...')
+            user, = benchmark.seed_dataset(
+                recipes=recipes,
+                tags=100,
+                ingredients=100
+            )
+            serializer = serializers.RecipeSerializer()
+            rows = list(fastpath.rows(
+                querysets.recipe_list(Recipe.objects.filter(user=user)),
+                serializer
+            ))
+
+        data = fastpath.serialize(serializer, rows)
+        drf, fast = JSONRenderer(), FastJSONRenderer()
+        content = drf.render(data)
+        assert fast.render(data) == content
+        self.stdout.write(
+            f'{recipes} recipes, {len(content) / 1024:.0f} KiB of JSON, '
+            f'fast renderer using {fast.backend}'
+        )
+
+        self.stdout.write(self.style.MIGRATE_HEADING('render'))
+        self.report(recipes, repeat, (
+            ('DRF renderer', lambda: drf.render(data)),
+            ('fast renderer', lambda: fast.render(data)),
+            ('fast renderer, first chunk', lambda: list(itertools.islice(
+                fast.iter_render(data, options['chunk_size']), 2
+            ))),
+            ('fast renderer, chunked', lambda: list(fast.iter_render(
+                data, options['chunk_size']
+            ))),
+        ))
+
+        self.stdout.write(self.style.MIGRATE_HEADING('parse'))
+        self.report(recipes, repeat, (
+            ('DRF parser', lambda: JSONParser().parse(io.BytesIO(content))),
+            ('fast parser', lambda: FastJSONParser().parse(
+                io.BytesIO(content)
+            )),
+        ))
+
+        field = serializer.fields['price']
+        prices = [row['price'] for row in rows]
+        self.stdout.write(self.style.MIGRATE_HEADING('prices'))
+        self.report(recipes, repeat, (
+            ('to_representation', lambda: [
+                field.to_representation(price) for price in prices
+            ]),
+            ('row serializing', lambda: fastpath.serialize(
+                serializer, rows
+            )),
+        ))
+
+    def report(self, count, repeat, candidates):
+        """Write the timings of each candidate and its rate"""
+        for label, func in candidates:
+            timings = benchmark.measure(func, repeat)
+            per_second = count / timings['p50'] * 1000
+            self.stdout.write(benchmark.format_timings(
+                f'{label} ({per_second:,.0f}/s)', timings
+            ))
@@ -0,0 +1,129 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core import benchmark
+from core.models import Tag
+
+from recipe import views
+from recipe.caching import response_cache
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the recipe list response cache"""
+    help = 'Replay a read heavy mix of list requests with some writes ' \
+           'and report latency, hit ratio and memory of the response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--write-ratio', type=float, default=0.02,
+                            help='Fraction of requests that create a tag')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory(SERVER_NAME='localhost')
+        self.views = {
+            'recipes': views.RecipeViewset.as_view({'get': 'list'}),
+            'tags': views.TagViewSet.as_view({'get': 'list'}),
+            'create tag': views.TagViewSet.as_view({'post': 'create'}),
+        }
+        rng = random.Random(options['seed'])
+
+        with benchmark.rollback():
+            self.stdout.write('Seeding dataset...')
+            users = benchmark.seed_dataset(
+                users=options['users'],
+                recipes=options['recipes']
+            )
+            benchmark.analyze()
+            workload = self.workload(users, options, rng)
+
+            for enabled in (False, True):
+                response_cache.clear()
+                response_cache.enabled = enabled
+                label = 'cached' if enabled else 'uncached'
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.replay(workload)
+                if enabled:
+                    self.report(response_cache.stats())
+
+    def workload(self, users, options, rng):
+        """Return the (view, user, params) requests to replay"""
+        tag_ids = {
+            user.pk: list(Tag.objects.filter(user=user).values_list(
+                'id', flat=True
+            ))
+            for user in users
+        }
+        requests = []
+        for index in range(options['requests']):
+            user = rng.choice(users)
+            if rng.random() < options['write_ratio']:
+                requests.append(
+                    ('create tag', user, {'name': f'Benchmark tag {index}'})
+                )
+            elif rng.random() < 0.3:
+                requests.append(('tags', user, {}))
+            else:
+                tags = rng.sample(tag_ids[user.pk][:5], 2)
+                params = rng.choice((
+                    {},
+                    {'tags': f'{tags[0]},{tags[1]}'},
+                    {'tags': f'{tags[1]},{tags[0]}'},
+                ))
+                requests.append(('recipes', user, params))
+
+        return requests
+
+    def replay(self, workload):
+        """Send every request of the workload and report the latencies"""
+        latencies = {}
+        for name, user, params in workload:
+            if name == 'create tag':
+                request = self.factory.post('/', params)
+            else:
+                request = self.factory.get('/', params)
+            force_authenticate(request, user=user)
+
+            start = time.perf_counter()
+            response = self.views[name](request)
+            if hasattr(response, 'render'):
+                response.render()
+            elapsed = (time.perf_counter() - start) * 1000
+            assert response.status_code < 400, response.status_code
+            latencies.setdefault(name, []).append(elapsed)
+
+        for name, timings in sorted(latencies.items()):
+            timings.sort()
+            self.stdout.write(benchmark.format_timings(
+                f'{name} ({len(timings)} requests)',
+                {
+                    'min': timings[0],
+                    'p50': benchmark.percentile(timings, 50),
+                    'p95': benchmark.percentile(timings, 95),
+                    'max': timings[-1],
+                }
+            ))
+
+    def report(self, stats):
+        """Write the hit ratio and memory use of the cache"""
+        self.stdout.write(
+            f'hit ratio {stats["hit_ratio"]:.1%} '
+            f'({stats["hits"]} hits, {stats["misses"]} misses)'
+        )
+        if 'bytes' in stats:
+            self.stdout.write(
+                f'{stats["size"]} entries using '
+                f'{stats["bytes"] / 1024:.1f} KiB, '
+                f'{stats["evictions"]} evictions'
+            )
+        else:
+            self.stdout.write(
+                f'{stats["bytes_written"] / 1024:.1f} KiB written to '
+                f'the {stats["alias"]} cache'
+            )
@@ -0,0 +1,103 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from core import benchmark, search
+from core.models import Recipe, Tag, Ingredient
+
+
+WORDS = (
+    'apple', 'basil', 'butter', 'carrot', 'cheese', 'chicken', 'chili',
+    'coconut', 'garlic', 'ginger', 'honey', 'lemon', 'lentil', 'mango',
+    'mushroom', 'noodle', 'onion', 'pasta', 'pepper', 'potato', 'rice',
+    'salmon', 'spinach', 'tofu', 'tomato', 'walnut',
+)
+DISHES = ('soup', 'salad', 'curry', 'stew', 'pie', 'bake', 'roast', 'bowl')
+
+
+class Command(BaseCommand):
+    """Django command to benchmark full text search of recipes"""
+    help = 'Seed recipes with varied names, build their search vectors ' \
+           'and time searches against a case insensitive LIKE scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        with benchmark.rollback():
+            self.stdout.write('Seeding dataset...')
+            user, = benchmark.seed_dataset(
+                recipes=options['recipes'],
+                tags=len(DISHES),
+                ingredients=len(WORDS),
+                tags_per_recipe=2,
+                ingredients_per_recipe=3,
+                batch_size=options['batch_size']
+            )
+            self.rename(user)
+
+            start = time.perf_counter()
+            search.rebuild_search_vectors(
+                Recipe.objects.filter(user=user),
+                batch_size=options['batch_size']
+            )
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'Indexed {options["recipes"]} recipes in {elapsed:.1f}s '
+                f'({options["recipes"] / elapsed:.0f} recipes/s)'
+            )
+            benchmark.analyze()
+
+            recipes = Recipe.objects.filter(user=user)
+            for text in ('tomato', 'garlic curry', 'spinach lentil soup'):
+                self.stdout.write(self.style.MIGRATE_HEADING(text))
+                ranked = search.search(recipes, text).order_by(
+                    '-search_rank', '-id'
+                ).values_list('id', flat=True)[:100]
+                scan = recipes.filter(self.like(text)).order_by(
+                    '-id'
+                ).values_list('id', flat=True)[:100]
+                for label, queryset in (('search vector', ranked),
+                                        ('icontains scan', scan)):
+                    self.stdout.write(benchmark.format_timings(
+                        label,
+                        benchmark.measure(lambda: list(queryset.all()),
+                                          repeat)
+                    ))
+
+    def rename(self, user):
+        """Give the seeded recipes, tags and ingredients real words"""
+        updates = (
+            (Tag, 'name', self.pick(DISHES, 'id')),
+            (Ingredient, 'name', self.pick(WORDS, 'id')),
+            (Recipe, 'title', self.pick(WORDS, 'id / 7') + " || ' ' || " +
+             self.pick(DISHES, 'id / 3')),
+        )
+        with connection.cursor() as cursor:
+            for model, column, value in updates:
+                cursor.execute(
+                    f'UPDATE {model._meta.db_table} SET {column} = {value} '
+                    f'WHERE user_id = %s',
+                    [user.pk]
+                )
+
+    def pick(self, words, expression):
+        """Return SQL choosing one of words from an integer expression"""
+        array = ', '.join(f"'{word}'" for word in words)
+        return f'(ARRAY[{array}])[1 + mod({expression}, {len(words)})]'
+
+    def like(self, text):
+        """Return the filter a client side search would amount to"""
+        condition = Q()
+        for word in text.split():
+            condition &= (
+                Q(title__icontains=word) |
+                Q(tags__name__icontains=word) |
+                Q(ingredients__name__icontains=word)
+            )
+        return condition
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+
+from rest_framework.renderers import JSONRenderer
+
+from core import benchmark
+from core.models import Recipe, Tag, Ingredient
+
+from recipe import fastpath, querysets, serializers
+
+
+class Command(BaseCommand):
+    """Django command to compare the serializers and the fast list path"""
+    help = 'Report objects serialized per second by the DRF serializers ' \
+           'and by the values() fast path, with and without the query'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with benchmark.rollback():
+            self.stdout.write('Seeding dataset...')
+            user, = benchmark.seed_dataset(
+                recipes=rows,
+                tags=rows,
+                ingredients=rows
+            )
+            benchmark.analyze()
+
+            cases = (
+                ('recipes', serializers.RecipeSerializer,
+                 querysets.recipe_list(Recipe.objects.filter(user=user))),
+                ('tags', serializers.TagSerializer,
+                 Tag.objects.filter(user=user)),
+                ('ingredients', serializers.IngredientSerializer,
+                 Ingredient.objects.filter(user=user)),
+            )
+            for label, serializer_class, queryset in cases:
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.compare(serializer_class, queryset.order_by('-id'),
+                             options['repeat'])
+
+    def compare(self, serializer_class, queryset, repeat):
+        """Time both paths serializing then also querying the rows"""
+        serializer = serializer_class()
+        rows = fastpath.rows(queryset, serializer, ('-id',))
+        instances = list(queryset)
+        values = list(rows)
+        renderer = JSONRenderer()
+        assert renderer.render(
+            serializer_class(instances, many=True).data
+        ) == renderer.render(fastpath.serialize(serializer, values))
+
+        candidates = (
+            ('serializer', lambda: serializer_class(
+                instances, many=True
+            ).data),
+            ('fast path', lambda: fastpath.serialize(serializer, values)),
+            ('serializer + query', lambda: serializer_class(
+                list(queryset.all()), many=True
+            ).data),
+            ('fast path + query', lambda: fastpath.serialize(
+                serializer, list(rows.all())
+            )),
+        )
+        for label, func in candidates:
+            timings = benchmark.measure(func, repeat)
+            per_second = len(instances) / timings['p50'] * 1000
+            self.stdout.write(benchmark.format_timings(
+                f'{label} ({per_second:,.0f}/s)', timings
+            ))
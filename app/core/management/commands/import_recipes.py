@@ -0,0 +1,269 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import bulk, rollups, signals
+from core.models import Recipe, Tag, Ingredient, ImportCheckpoint
+
+
+# Recipe columns read from each record
+RECIPE_FIELDS = ('title', 'time_minutes', 'price', 'link')
+# Record keys listing the names of linked objects, with their model
+RELATIONS = (
+    ('tags', Tag),
+    ('ingredients', Ingredient),
+)
+# Separates names inside a CSV cell
+CSV_NAME_SEPARATOR = ';'
+
+
+def read_ndjson(file):
+    """Yield the stripped lines of file, parsed by parse_ndjson later"""
+    for line in file:
+        yield line.strip()
+
+
+def parse_ndjson(line):
+    """Return the record encoded on a line"""
+    return json.loads(line)
+
+
+def parse_csv(row):
+    """Return a CSV row as a record, splitting its lists of names"""
+    record = dict(row)
+    for key, _ in RELATIONS:
+        record[key] = (row.get(key) or '').split(CSV_NAME_SEPARATOR)
+    return record
+
+
+# Each format is read into raw records, skipped ones are never parsed
+FORMATS = {
+    'ndjson': (read_ndjson, parse_ndjson),
+    'csv': (csv.DictReader, parse_csv),
+}
+
+
+class Command(BaseCommand):
+    """Django command to import recipes from an NDJSON or CSV file"""
+    help = 'Stream recipes from an NDJSON or CSV file into the database ' \
+           'in batches, creating missing tags and ingredients, and resume ' \
+           'from the last batch written when run again'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--user',
+            help='Email of the owner of records without a "user" key'
+        )
+        parser.add_argument('--format', choices=sorted(FORMATS))
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Name the progress is recorded under in the database, '
+                 'defaults to the absolute path of PATH'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore the checkpoint and import from the first record'
+        )
+        parser.add_argument(
+            '--no-copy', dest='use_copy', action='store_false',
+            help='Insert with bulk_create even where COPY is available'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(
+            path
+        )[1].lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Unknown format "{file_format}", pass --format'
+            )
+        read, self.parse = FORMATS[file_format]
+        self.use_copy = options['use_copy']
+        self.users = {}
+        self.names = {}
+        self.default_user = None
+        if options['user']:
+            self.default_user = self.get_user_id(options['user'])
+
+        checkpoint = options['checkpoint'] or os.path.abspath(path)
+        done = 0 if options['restart'] else self.read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f'Resuming after record {done}')
+
+        start = time.perf_counter()
+        imported = 0
+        with open(path, newline='', encoding='utf-8') as file:
+            records = islice(
+                enumerate(read(file), start=1), done, None
+            )
+            while True:
+                chunk = list(islice(records, options['batch_size']))
+                if not chunk:
+                    break
+                # Blank lines are counted as records but hold no recipe
+                batch = [(number, record) for number, record in chunk
+                         if record]
+                done = chunk[-1][0]
+                # The checkpoint commits with the batch, or neither does
+                with transaction.atomic():
+                    self.import_batch(batch)
+                    self.write_checkpoint(checkpoint, done)
+
+                imported += len(batch)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'Imported {imported} recipes, up to record {done} '
+                    f'({imported / elapsed:.0f} rows/s)'
+                )
+
+        ImportCheckpoint.objects.filter(source=checkpoint).delete()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes in {elapsed:.1f}s '
+            f'({imported / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
+
+    def read_checkpoint(self, checkpoint):
+        """Return the number of records already imported"""
+        return ImportCheckpoint.objects.filter(source=checkpoint).values_list(
+            'records', flat=True
+        ).first() or 0
+
+    def write_checkpoint(self, checkpoint, records):
+        """Record that the first records of the file are imported"""
+        ImportCheckpoint.objects.update_or_create(
+            source=checkpoint,
+            defaults={'records': records}
+        )
+
+    def get_user_id(self, email):
+        """Return the id of the user with email, looked up once"""
+        if email not in self.users:
+            try:
+                self.users[email] = get_user_model().objects.values_list(
+                    'pk', flat=True
+                ).get(email=email)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'No user with email "{email}"')
+        return self.users[email]
+
+    def clean(self, number, record):
+        """Return (user id, recipe fields, {relation: names}) of a record
+
+        Raises CommandError naming the record when it is invalid.
+        """
+        try:
+            record = self.parse(record)
+            if not isinstance(record, dict):
+                raise ValidationError('expected an object')
+            user = record.get('user')
+            user_id = self.get_user_id(user) if user else self.default_user
+            if user_id is None:
+                raise ValidationError('no "user" and no --user given')
+
+            fields = {}
+            for name in RECIPE_FIELDS:
+                field = Recipe._meta.get_field(name)
+                value = record.get(name)
+                if value is None and field.blank:
+                    value = ''
+                fields[name] = field.clean(value, None)
+
+            related = {}
+            for key, model in RELATIONS:
+                field = model._meta.get_field('name')
+                related[key] = list(dict.fromkeys(
+                    field.clean(self.get_name(value), None)
+                    for value in record.get(key) or ()
+                    if self.get_name(value)
+                ))
+        except (CommandError, ValidationError, TypeError, ValueError) as exc:
+            message = '; '.join(getattr(exc, 'messages', [str(exc)]))
+            raise CommandError(f'Record {number}: {message}')
+
+        return user_id, fields, related
+
+    def get_name(self, value):
+        """Return the name of a linked object, given as a string or dict"""
+        if isinstance(value, dict):
+            value = value.get('name')
+        return value.strip() if isinstance(value, str) else value
+
+    def resolve_names(self, model, wanted):
+        """Return {(user id, name): id}, creating the missing objects
+
+        Names of each user are loaded the first time one is needed and
+        kept for the rest of the import.
+        """
+        missing = []
+        for user_id, name in wanted:
+            names = self.names.get((model, user_id))
+            if names is None:
+                names = self.names[(model, user_id)] = dict(
+                    model.objects.filter(user_id=user_id).values_list(
+                        'name', 'id'
+                    )
+                )
+            if name not in names:
+                names[name] = None
+                missing.append(model(user_id=user_id, name=name))
+
+        for obj in bulk.bulk_insert(model, missing, use_copy=self.use_copy):
+            self.names[(model, obj.user_id)][obj.name] = obj.pk
+
+        return {
+            (user_id, name): self.names[(model, user_id)][name]
+            for user_id, name in wanted
+        }
+
+    def import_batch(self, batch):
+        """Write the recipes of batch with their links"""
+        if not batch:
+            return
+        cleaned = [self.clean(number, record) for number, record in batch]
+        recipes = bulk.bulk_insert(
+            Recipe,
+            [Recipe(user_id=user_id, **fields)
+             for user_id, fields, _ in cleaned],
+            use_copy=self.use_copy
+        )
+
+        with signals.batch_collection_changes():
+            for key, model in RELATIONS:
+                ids = self.resolve_names(model, {
+                    (user_id, name)
+                    for user_id, _, related in cleaned
+                    for name in related[key]
+                })
+                field = Recipe._meta.get_field(key)
+                bulk.bulk_insert_values(
+                    field.remote_field.through,
+                    (field.m2m_column_name(), field.m2m_reverse_name()),
+                    [
+                        (recipe.pk, ids[(recipe.user_id, name)])
+                        for recipe, (_, _, related) in zip(recipes, cleaned)
+                        for name in related[key]
+                    ],
+                    use_copy=self.use_copy
+                )
+
+            for user_id in {recipe.user_id for recipe in recipes}:
+                signals.collection_changed(user_id)
+            # No post_save is sent for the inserted rows, their links
+            # reach the stats rollups through the summaries
+            for recipe in recipes:
+                signals.rollup_changed(recipe.user_id, rollups.recipe_change({
+                    name: getattr(recipe, name)
+                    for name in rollups.RECIPE_FIELDS
+                }))
+            signals.links_changed_for(recipe.pk for recipe in recipes)
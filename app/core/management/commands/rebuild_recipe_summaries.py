@@ -0,0 +1,61 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import summaries
+from core.models import Recipe
+
+
+# Stale recipe ids listed by --verify
+SHOW_STALE = 10
+
+
+class Command(BaseCommand):
+    """Django command to rebuild or verify the recipe summary columns"""
+    help = 'Recompute the tag and ingredient ids and counts denormalized ' \
+           'on recipes from the M2M tables, or with --verify only report ' \
+           'the recipes whose summaries are out of date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of the only user to do')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Check the summaries without writing, fails if any is stale'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.all()
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'No user "{options["user"]}"')
+            queryset = queryset.filter(user=user)
+
+        if options['verify']:
+            self.verify(queryset)
+            return
+
+        start = time.perf_counter()
+        count = summaries.rebuild_summaries(queryset, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the summaries of {count} recipes in '
+            f'{time.perf_counter() - start:.1f}s'
+        ))
+
+    def verify(self, queryset):
+        """Report the stale summaries of queryset"""
+        stale = summaries.stale_summaries(queryset).order_by('pk')
+        count = stale.count()
+        if count:
+            ids = ', '.join(
+                str(pk) for pk in stale.values_list('pk', flat=True)[
+                    :SHOW_STALE
+                ]
+            )
+            raise CommandError(
+                f'{count} recipes have stale summaries, such as {ids}'
+            )
+        self.stdout.write(self.style.SUCCESS('All summaries are up to date'))
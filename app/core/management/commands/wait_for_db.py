@@ -1,21 +1,55 @@
 import time
 
-from django.db import connections
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+
+from core import db
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
+    help = 'Wait until the database accepts queries, retrying with ' \
+           'exponential backoff, and report the time it took'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--timeout', type=float, default=60,
+                            help='Seconds to wait before giving up')
+        parser.add_argument('--max-delay', type=float, default=5,
+                            help='Longest wait in seconds between attempts')
+        parser.add_argument('--warm', action='store_true',
+                            help='Then check that every configured database '
+                                 'accepts connections and queries')
 
     def handle(self, *args, **options):
         self.stdout.write('waiting for database...')
-        db_conn = None
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
-
-        self.stdout.write(self.style.SUCCESS('Database available'))
+        start = time.monotonic()
+        try:
+            attempts, _ = db.wait_for_connection(
+                options['database'],
+                timeout=options['timeout'],
+                max_delay=options['max_delay'],
+                on_retry=self.retrying
+            )
+        except OperationalError as error:
+            raise CommandError(
+                f'Database unavailable after {options["timeout"]:g} '
+                f'seconds: {error}'
+            )
+
+        if options['warm']:
+            for alias, elapsed in db.warm_connections().items():
+                self.stdout.write(f'Database {alias} reachable in '
+                                  f'{elapsed:.1f}ms')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Database available after {attempts} attempt(s) in '
+            f'{time.monotonic() - start:.2f}s'
+        ))
+
+    def retrying(self, attempt, delay, error):
+        """Report a failed attempt"""
+        self.stdout.write(
+            f'Database unavailable, waiting {delay:.1f} seconds...'
+        )
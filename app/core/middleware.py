@@ -0,0 +1,99 @@
+import logging
+
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import instrumentation, querycheck
+
+
+logger = logging.getLogger('core.performance')
+query_logger = logging.getLogger('core.querycheck')
+
+
+class PerformanceMiddleware:
+    """Time every request and break it down into SQL, auth, view and render
+
+    The breakdown is sent back in a Server-Timing header, logged, and
+    added to the rolling stats of the endpoint that served the request,
+    see core.instrumentation. Goes first in MIDDLEWARE so the total
+    covers the other middleware too.
+    """
+
+    def __init__(self, get_response):
+        config = instrumentation.get_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = config['SERVER_TIMING']
+        self.slow_request_ms = config['SLOW_REQUEST_MS']
+
+    def __call__(self, request):
+        with instrumentation.recording() as recorder:
+            response = self.get_response(request)
+        timings = recorder.finish()
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = None
+        if match is not None:
+            endpoint = f'{request.method} {match.view_name}'
+            instrumentation.endpoint_stats.record(endpoint, timings)
+
+        if self.server_timing:
+            response['Server-Timing'] = instrumentation.server_timing(
+                timings
+            )
+        self.log(request, response, endpoint, timings)
+
+        return response
+
+    def log(self, request, response, endpoint, timings):
+        """Log one line per request, a warning when it was slow"""
+        level = logging.INFO
+        if timings['total'] >= self.slow_request_ms:
+            level = logging.WARNING
+        if not logger.isEnabledFor(level):
+            return
+
+        logger.log(
+            level,
+            '%s %s %s %.1fms queries=%d sql=%.1fms auth=%.1fms '
+            'view=%.1fms render=%.1fms',
+            request.method, request.get_full_path(), response.status_code,
+            timings['total'], timings['queries'], timings['sql'],
+            timings['auth'], timings['view'], timings['render'],
+            extra={
+                'endpoint': endpoint,
+                'status_code': response.status_code,
+                'timings': timings,
+            }
+        )
+
+
+class QueryCheckMiddleware:
+    """Log requests that run one query shape over and over
+
+    Meant for staging, where it points at N+1 queries with the line
+    and serializer field they come from, see core.querycheck.
+    """
+
+    def __init__(self, get_response):
+        config = querycheck.get_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = config['THRESHOLD']
+
+    def __call__(self, request):
+        detector = querycheck.QueryDetector(self.threshold)
+        with detector.capture():
+            response = self.get_response(request)
+
+        repeated = detector.repeated()
+        if repeated:
+            query_logger.warning(
+                '%s %s repeated queries:\n%s',
+                request.method, request.get_full_path(),
+                querycheck.format_report(repeated),
+                extra={'repeated_queries': repeated}
+            )
+
+        return response
@@ -0,0 +1,46 @@
+# Generated by Django 2.1.15 on 2026-10-18 16:57
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Fill in the vectors of existing recipes the way core.search computes them
+BACKFILL_SQL = '''
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector('english'::regconfig, title), 'A') ||
+    setweight(to_tsvector('english'::regconfig, COALESCE((
+        SELECT string_agg(core_tag.name, ' ')
+        FROM core_tag
+        INNER JOIN core_recipe_tags
+            ON core_recipe_tags.tag_id = core_tag.id
+        WHERE core_recipe_tags.recipe_id = core_recipe.id
+    ), '')), 'B') ||
+    setweight(to_tsvector('english'::regconfig, COALESCE((
+        SELECT string_agg(core_ingredient.name, ' ')
+        FROM core_ingredient
+        INNER JOIN core_recipe_ingredients
+            ON core_recipe_ingredients.ingredient_id = core_ingredient.id
+        WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+    ), '')), 'C')
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_collection_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
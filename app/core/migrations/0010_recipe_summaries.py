@@ -0,0 +1,57 @@
+# Generated by Django 2.1.15 on 2026-10-18 17:27
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+# Fill in the summaries of existing recipes the way core.summaries does
+BACKFILL_SQL = [
+    '''
+    UPDATE core_recipe SET
+        tag_ids = ARRAY(
+            SELECT tag_id FROM core_recipe_tags
+            WHERE core_recipe_tags.recipe_id = core_recipe.id
+            ORDER BY tag_id
+        ),
+        ingredient_ids = ARRAY(
+            SELECT ingredient_id FROM core_recipe_ingredients
+            WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+            ORDER BY ingredient_id
+        )
+    ''',
+    '''
+    UPDATE core_recipe SET
+        tag_count = CARDINALITY(tag_ids),
+        ingredient_count = CARDINALITY(ingredient_ids)
+    ''',
+]
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, editable=False, size=None),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
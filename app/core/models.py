@@ -2,11 +2,15 @@
 import uuid
 import os
 
-from django.db import models
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
 
 from django.conf import settings
+from django.utils import timezone
 
 
 def recipe_image_file_path(instance, filename):
@@ -65,6 +69,16 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Serves the per-user listing ordered by ('-name', 'id')
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+        ]
 
     def __str__(self):
         """return the string representation of the tag"""
@@ -78,6 +92,15 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_ingredient_user_name_idx'
+            ),
+        ]
 
     def __str__(self):
         """String representation"""
@@ -86,6 +109,15 @@ class Ingredient(models.Model):
 
 class Recipe(models.Model):
     """Recipe object"""
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -97,7 +129,133 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Progress of the resized variants generated by recipe.images
+    image_status = models.CharField(
+        max_length=10,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Title, tag and ingredient names kept up to date by core.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Sorted ids and number of the linked tags and ingredients, kept up
+    # to date by core.signals, see core.summaries
+    tag_ids = ArrayField(models.IntegerField(), default=list,
+                         editable=False)
+    tag_count = models.PositiveIntegerField(default=0, editable=False)
+    ingredient_ids = ArrayField(models.IntegerField(), default=list,
+                                editable=False)
+    ingredient_count = models.PositiveIntegerField(default=0,
+                                                   editable=False)
+
+    class Meta:
+        indexes = [
+            # Serves the per-user listing ordered by '-id'
+            models.Index(
+                fields=['user', 'id'],
+                name='core_recipe_user_id_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx'
+            ),
+        ]
 
     def __str__(self):
         """String representation of the recipe"""
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        recipe = super().from_db(db, field_names, values)
+        # The row as loaded, for core.rollups to tell what a save changes
+        recipe._loaded_values = dict(zip(field_names, values))
+        return recipe
+
+
+class CollectionVersionManager(models.Manager):
+
+    def for_user(self, user):
+        """Return the collection version of user, creating it if needed"""
+        version, _ = self.get_or_create(user=user)
+        return version
+
+    def bump(self, *user_ids):
+        """Advance the collection version of the given users
+
+        Returns the new version of each user bumped, {user id: version}.
+        Users without a version row are skipped, the row is created with
+        the user and otherwise on first read, so nothing has been cached
+        against it yet.
+        """
+        if not user_ids:
+            return {}
+        # UPDATE ... RETURNING, which the ORM does not offer for updates
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {self.model._meta.db_table} '
+                'SET version = version + 1, updated_at = %s '
+                'WHERE user_id = ANY(%s) RETURNING user_id, version',
+                [timezone.now(), list(user_ids)]
+            )
+            return dict(cursor.fetchall())
+
+
+class CollectionVersion(models.Model):
+    """Per user counter of changes to their recipes, tags and ingredients"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='collection_version'
+    )
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CollectionVersionManager()
+
+    def __str__(self):
+        """String representation of the version"""
+        return f'{self.user_id}:{self.version}'
+
+
+class RecipeStats(models.Model):
+    """Per user rollup of the figures behind the recipe stats endpoint
+
+    Kept up to date by core.signals while the RECIPE_STATS 'ROLLUP'
+    setting is on, see core.rollups.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recipe_stats'
+    )
+    recipe_count = models.PositiveIntegerField(default=0)
+    total_time_minutes = models.BigIntegerField(default=0)
+    total_price = models.DecimalField(max_digits=14, decimal_places=2,
+                                      default=0)
+    # Number of recipes per price, tag id and ingredient id, all as strings
+    price_counts = JSONField(default=dict)
+    tag_counts = JSONField(default=dict)
+    ingredient_counts = JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """String representation of the rollup"""
+        return f'{self.user_id}:{self.recipe_count}'
+
+
+class ImportCheckpoint(models.Model):
+    """Records of a source file already imported by import_recipes
+
+    Written in the transaction of each batch, so a resumed import never
+    writes a batch twice.
+    """
+    source = models.CharField(max_length=1024, unique=True)
+    records = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """String representation of the checkpoint"""
+        return f'{self.source}:{self.records}'
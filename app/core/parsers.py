@@ -0,0 +1,31 @@
+from django.conf import settings
+
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import json
+
+from core.renderers import orjson
+
+
+class FastJSONParser(parsers.JSONParser):
+    """Parse JSON request bodies with orjson when installed, else the stdlib
+
+    The body is read in one go and decoded without the incremental
+    reader DRF wraps around the stream.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON and return the data"""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        content = stream.read()
+
+        try:
+            if orjson is not None and self.strict and \
+                    encoding.lower().replace('-', '') == 'utf8':
+                return orjson.loads(content)
+            parse_constant = json.strict_constant if self.strict else None
+            return json.loads(content.decode(encoding),
+                              parse_constant=parse_constant)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from collections import deque
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became free within the pool timeout"""
+
+
+class _Entry:
+    """A pooled connection and its bookkeeping"""
+    __slots__ = ('connection', 'created_at', 'released_at', 'generation')
+
+    def __init__(self, connection, generation):
+        self.connection = connection
+        self.created_at = self.released_at = time.monotonic()
+        self.generation = generation
+
+
+class ConnectionPool:
+    """Thread safe pool of reusable connections bounded per process
+
+    At most 'max_size' connections are open at once, acquire() waits up
+    to 'timeout' seconds for one to be released when all are in use.
+    Connections are closed instead of reused once older than 'max_age'
+    seconds, and idle ones are validated with check() when they were
+    last released more than 'check_interval' seconds ago.
+
+    connect() opens a connection, close(connection) closes it and
+    check(connection) returns whether it still works.
+    """
+
+    def __init__(self, connect, close, check=None, max_size=10, timeout=30,
+                 max_age=None, check_interval=30):
+        self.connect = connect
+        self.close = close
+        self.check = check
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._generation = 0
+        self._cond = threading.Condition()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.failed_checks = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    def acquire(self):
+        """Return a connection, opening one if the pool is not full"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                entry = self._take_idle(deadline)
+            if entry is None:
+                return self._open()
+            if self._usable(entry):
+                with self._cond:
+                    self._in_use[id(entry.connection)] = entry
+                    self.reused += 1
+                return entry.connection
+            self._discard(entry)
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, or close it if discard is set"""
+        with self._cond:
+            entry = self._in_use.pop(id(connection))
+            entry.released_at = time.monotonic()
+            if not discard and not self._expired(entry):
+                self._idle.append(entry)
+                self._cond.notify()
+                return
+        self._discard(entry)
+
+    def close_all(self):
+        """Close idle connections and in use ones once released"""
+        with self._cond:
+            self._generation += 1
+            idle = list(self._idle)
+            self._idle.clear()
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self):
+        """Return the size of the pool and its usage counters"""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'created': self.created,
+                'reused': self.reused,
+                'discarded': self.discarded,
+                'failed_checks': self.failed_checks,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+            }
+
+    def _take_idle(self, deadline):
+        """Pop an idle entry, or reserve room for a new connection
+
+        Returns None once a slot is reserved. Must hold the lock.
+        """
+        waited = False
+        while True:
+            if self._idle:
+                # Most recently used first, keeping the rest idle long
+                # enough to expire when traffic drops
+                return self._idle.pop()
+            if self._size < self.max_size:
+                self._size += 1
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.timeouts += 1
+                raise PoolTimeout(
+                    f'No connection free after {self.timeout} seconds, '
+                    f'all {self.max_size} are in use'
+                )
+            if not waited:
+                self.waits += 1
+                waited = True
+            self._cond.wait(remaining)
+
+    def _open(self):
+        """Open a connection in a slot reserved by _take_idle()"""
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._in_use[id(connection)] = _Entry(
+                connection, self._generation
+            )
+            self.created += 1
+
+        return connection
+
+    def _expired(self, entry):
+        """Return whether entry must be closed rather than reused"""
+        if entry.generation != self._generation:
+            return True
+        return (
+            self.max_age is not None and
+            time.monotonic() - entry.created_at >= self.max_age
+        )
+
+    def _usable(self, entry):
+        """Return whether an idle entry can be handed out"""
+        if self._expired(entry):
+            return False
+        if (self.check is None or
+                time.monotonic() - entry.released_at < self.check_interval):
+            return True
+        try:
+            usable = self.check(entry.connection)
+        except Exception:
+            usable = False
+        if not usable:
+            with self._cond:
+                self.failed_checks += 1
+
+        return usable
+
+    def _discard(self, entry):
+        """Close the connection of entry and free its slot"""
+        try:
+            self.close(entry.connection)
+        except Exception:
+            logger.warning('Closing a pooled connection failed',
+                           exc_info=True)
+        with self._cond:
+            self._size -= 1
+            self.discarded += 1
+            self._cond.notify()
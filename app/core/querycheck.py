@@ -0,0 +1,194 @@
+import os
+import re
+import sys
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+from rest_framework import serializers
+
+
+DEFAULTS = {
+    'ENABLED': False,
+    'THRESHOLD': 3,
+}
+
+# Literals and placeholder lists that vary between queries of one shape
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+# Calls through which serializer fields read or write their values
+FIELD_METHODS = ('to_representation', 'to_internal_value', 'get_attribute',
+                 'run_validation')
+
+RepeatedQuery = namedtuple(
+    'RepeatedQuery', ('sql', 'count', 'duplicates', 'origin', 'field')
+)
+
+
+def get_config():
+    """Return the QUERY_CHECK setting with its defaults"""
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'QUERY_CHECK', {}))
+    return config
+
+
+def fingerprint(sql):
+    """Return the shape of sql, without its literals or IN list lengths"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def find_origin(frame):
+    """Return (origin, field) of the query executed below frame
+
+    origin is the innermost project line on the stack and field the
+    innermost serializer field, as 'Serializer.field', if any.
+    """
+    origin = field = None
+    while frame is not None and (origin is None or field is None):
+        code = frame.f_code
+        if field is None and code.co_name in FIELD_METHODS:
+            obj = frame.f_locals.get('self')
+            parent = getattr(obj, 'parent', None)
+            if (isinstance(obj, serializers.Field) and
+                    isinstance(parent, serializers.Serializer)):
+                field = f'{type(parent).__name__}.{obj.field_name}'
+        filename = code.co_filename
+        if (origin is None and filename.startswith(settings.BASE_DIR) and
+                filename != __file__ and 'site-packages' not in filename):
+            origin = (f'{os.path.relpath(filename, settings.BASE_DIR)}:'
+                      f'{frame.f_lineno} in {code.co_name}')
+        frame = frame.f_back
+
+    return origin, field
+
+
+class QueryDetector:
+    """Count the queries of each shape run while it is started
+
+    Shapes run threshold times or more are reported as repeated, which
+    is what an N+1 looks like. Where each repeated shape comes from is
+    looked up on its second run only, to keep the overhead down.
+    """
+
+    def __init__(self, threshold=3):
+        self.threshold = threshold
+        self.shapes = {}
+        self._connections = []
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = fingerprint(sql)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            entry = self.shapes[shape] = {
+                'count': 0,
+                'statements': Counter(),
+                'origin': None,
+                'field': None,
+            }
+        entry['count'] += 1
+        entry['statements'][(sql, repr(params))] += 1
+        if entry['count'] == 2:
+            entry['origin'], entry['field'] = find_origin(sys._getframe(1))
+
+        return execute(sql, params, many, context)
+
+    def start(self):
+        """Start counting the queries of every database connection"""
+        self._connections = list(connections.all())
+        for connection in self._connections:
+            connection.execute_wrappers.append(self)
+
+    def stop(self):
+        """Stop counting queries"""
+        for connection in self._connections:
+            connection.execute_wrappers.remove(self)
+        self._connections = []
+
+    @contextmanager
+    def capture(self):
+        """Count the queries run in the block"""
+        self.start()
+        try:
+            yield self
+        finally:
+            self.stop()
+
+    def repeated(self):
+        """Return a RepeatedQuery for each shape run threshold times"""
+        return [
+            RepeatedQuery(
+                sql=shape,
+                count=entry['count'],
+                duplicates=max(entry['statements'].values()),
+                origin=entry['origin'],
+                field=entry['field'],
+            )
+            for shape, entry in self.shapes.items()
+            if entry['count'] >= self.threshold
+        ]
+
+
+def format_report(repeated):
+    """Return a readable report of repeated queries"""
+    lines = []
+    for query in repeated:
+        lines.append(
+            f'{query.count} queries of one shape, {query.duplicates} '
+            f'identical, from {query.origin or "unknown"}'
+            + (f' (serializing {query.field})' if query.field else '')
+            + f': {query.sql}'
+        )
+    return '\n'.join(lines)
+
+
+class QueryCheckMixin:
+    """Test case mixin failing every request that repeats a query shape
+
+    Queries run by the test itself, such as creating sample objects, are
+    not counted, only those between the start and the end of each
+    request made through the test client.
+    """
+    query_check_threshold = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        request_started.connect(cls._start_query_check, weak=False,
+                                dispatch_uid=cls)
+        request_finished.connect(cls._finish_query_check, weak=False,
+                                 dispatch_uid=cls)
+
+    @classmethod
+    def tearDownClass(cls):
+        request_started.disconnect(dispatch_uid=cls)
+        request_finished.disconnect(dispatch_uid=cls)
+        super().tearDownClass()
+
+    @classmethod
+    def _start_query_check(cls, sender, **kwargs):
+        cls._query_detector = QueryDetector(
+            cls.query_check_threshold or get_config()['THRESHOLD']
+        )
+        cls._query_detector.start()
+
+    @classmethod
+    def _finish_query_check(cls, sender, **kwargs):
+        detector = getattr(cls, '_query_detector', None)
+        if detector is None:
+            return
+        detector.stop()
+        cls._query_detector = None
+        repeated = detector.repeated()
+        if repeated:
+            raise cls.failureException(
+                'Request repeated queries:\n' + format_report(repeated)
+            )
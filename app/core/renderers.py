@@ -0,0 +1,122 @@
+from itertools import islice
+
+from rest_framework import renderers
+from rest_framework.compat import SHORT_SEPARATORS
+
+from core import instrumentation
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# orjson hands these to the encoder's default() so dates, times and UUIDs
+# come out exactly as the stdlib renderer writes them
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+) if orjson is not None else 0
+
+# Line and paragraph separators are valid JSON but not valid JavaScript
+UNSAFE_CHARACTERS = (
+    ('\u2028', '\\u2028'),
+    ('\u2029', '\\u2029'),
+)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """Render compact JSON with orjson when installed, else the stdlib
+
+    The output is the same bytes the DRF renderer gives, which is still
+    used when the client asks for indented JSON.
+    """
+    backend = 'orjson' if orjson is not None else 'json'
+
+    def __init__(self):
+        self.encoder = self.encoder_class(
+            ensure_ascii=self.ensure_ascii,
+            allow_nan=not self.strict,
+            separators=SHORT_SEPARATORS
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON, returning a bytestring"""
+        if data is None:
+            return bytes()
+
+        renderer_context = renderer_context or {}
+        with instrumentation.timed('render'):
+            if not self.compact or self.get_indent(accepted_media_type,
+                                                   renderer_context):
+                return super().render(data, accepted_media_type,
+                                      renderer_context)
+
+            return self.encode(data)
+
+    def encode(self, data):
+        """Return data as compact JSON bytes"""
+        if orjson is not None and not self.ensure_ascii:
+            ret = orjson.dumps(data, default=self.encoder.default,
+                               option=ORJSON_OPTIONS)
+            for character, escaped in UNSAFE_CHARACTERS:
+                character = character.encode('utf-8')
+                if character in ret:
+                    ret = ret.replace(character, escaped.encode('utf-8'))
+            return ret
+
+        # Replacing is free on text without any character beyond latin-1,
+        # so unlike scanning the bytes it costs nothing in the common case
+        ret = self.encoder.encode(data)
+        for character, escaped in UNSAFE_CHARACTERS:
+            ret = ret.replace(character, escaped)
+        return ret.encode('utf-8')
+
+    def iter_render(self, data, chunk_size=1000):
+        """Yield the JSON of data in pieces of up to chunk_size items
+
+        Lists are encoded a slice at a time so the whole document is never
+        held in memory at once, anything else is rendered in one piece.
+        """
+        if not isinstance(data, list):
+            yield self.render(data)
+            return
+
+        yield b'['
+        for start in range(0, len(data), chunk_size):
+            chunk = self.encode(data[start:start + chunk_size])
+            yield (b',' if start else b'') + chunk[1:-1]
+        yield b']'
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """Render a list as newline delimited JSON, one item per line
+
+    Anything else, like an error, is rendered as a single line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into NDJSON, returning a bytestring"""
+        if data is None:
+            return bytes()
+
+        return b''.join(self.iter_render(data))
+
+    def iter_render(self, data, chunk_size=1000):
+        """Yield the lines of data, chunk_size at a time
+
+        data may be any iterable of items, such as a generator, which is
+        consumed as the lines are written.
+        """
+        if isinstance(data, dict):
+            yield self.encode(data) + b'\n'
+            return
+
+        data = iter(data)
+        while True:
+            lines = [self.encode(item) + b'\n'
+                     for item in islice(data, chunk_size)]
+            if not lines:
+                return
+            yield b''.join(lines)
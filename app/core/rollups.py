@@ -0,0 +1,241 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+
+from core.models import (
+    CollectionVersion,
+    Ingredient,
+    Recipe,
+    RecipeStats,
+    Tag,
+)
+from core.summaries import SUMMARY_FIELDS
+
+
+DEFAULTS = {
+    'ROLLUP': False,
+    'TOP': 10,
+}
+CENTS = Decimal('0.01')
+
+# Recipe fields the rollup adds up, and the summary columns its counts
+# of recipes per tag and ingredient follow
+RECIPE_FIELDS = ('time_minutes', 'price')
+LINK_FIELDS = tuple(ids for ids, _ in SUMMARY_FIELDS.values())
+# Rollup totals, and counts of recipes keyed by price, tag or ingredient
+TOTALS = ('recipe_count', 'total_time_minutes', 'total_price')
+COUNTS = ('price_counts', 'tag_counts', 'ingredient_counts')
+# Counts of recipes per related object, with the M2M and the model of
+# the objects they count
+RELATED_COUNTS = {
+    'tag_counts': ('tags', Tag),
+    'ingredient_counts': ('ingredients', Ingredient),
+}
+
+
+def get_config():
+    """Return the RECIPE_STATS setting with its defaults"""
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'RECIPE_STATS', {}))
+    return config
+
+
+def to_price(value):
+    """Return value as a price, a Decimal with two places"""
+    return Recipe._meta.get_field('price').to_python(value).quantize(CENTS)
+
+
+def empty():
+    """Return the rollup values of no recipes, also an empty change"""
+    values = dict.fromkeys(TOTALS, 0)
+    values.update((name, {}) for name in COUNTS)
+    return values
+
+
+def merge(values, change):
+    """Add change to values in place, dropping counts that reach zero"""
+    for name in TOTALS:
+        values[name] += change[name]
+    for name in COUNTS:
+        for key, count in change[name].items():
+            merge_count(values[name], key, count)
+
+    return values
+
+
+def merge_count(counts, key, count):
+    """Add count to counts[key], dropping it when it reaches zero"""
+    counts[key] = counts.get(key, 0) + count
+    if not counts[key]:
+        del counts[key]
+
+
+def recipe_change(values, sign=1):
+    """Return the change of adding, or with sign -1 removing, a recipe
+
+    values holds the recipe's RECIPE_FIELDS, and its LINK_FIELDS when its
+    links are counted as well.
+    """
+    price = to_price(values['price'])
+    change = empty()
+    change['recipe_count'] = sign
+    change['total_time_minutes'] = sign * values['time_minutes']
+    change['total_price'] = sign * price
+    change['price_counts']['{:f}'.format(price)] = sign
+    for name, (relation, _) in RELATED_COUNTS.items():
+        for pk in values.get(SUMMARY_FIELDS[relation][0], ()):
+            merge_count(change[name], str(pk), sign)
+
+    return change
+
+
+def links_change(old, new):
+    """Return the change of a recipe's summaries going from old to new"""
+    change = empty()
+    for name, (relation, _) in RELATED_COUNTS.items():
+        ids = SUMMARY_FIELDS[relation][0]
+        for pk in old[ids]:
+            merge_count(change[name], str(pk), -1)
+        for pk in new[ids]:
+            merge_count(change[name], str(pk), 1)
+
+    return change
+
+
+def collect(queryset):
+    """Return the rollup values of the recipes in queryset
+
+    The totals take one aggregate query and each of the counts one
+    query grouping the recipes, or their links, by what they count.
+    """
+    ids = queryset.order_by().values('pk')
+    recipes = Recipe.objects.filter(pk__in=ids).order_by()
+    values = recipes.aggregate(
+        recipe_count=Count('pk'),
+        total_time_minutes=Sum('time_minutes'),
+        total_price=Sum('price')
+    )
+    values['total_time_minutes'] = values['total_time_minutes'] or 0
+    values['total_price'] = values['total_price'] or Decimal(0)
+    values['price_counts'] = {
+        '{:f}'.format(price): count
+        for price, count in recipes.values_list('price').annotate(
+            count=Count('pk')
+        )
+    }
+    for name, (relation, _) in RELATED_COUNTS.items():
+        field = Recipe._meta.get_field(relation)
+        target = f'{field.m2m_reverse_field_name()}_id'
+        links = field.remote_field.through.objects.filter(**{
+            f'{field.m2m_field_name()}_id__in': ids
+        }).order_by().values_list(target).annotate(count=Count('pk'))
+        values[name] = {str(pk): count for pk, count in links}
+
+    return values
+
+
+def apply(changes):
+    """Apply changes, {user id: change}, to the users' rollups
+
+    A change of None drops the rollup, it is collected again on the next
+    read. Users without a rollup are skipped for the same reason.
+    """
+    with transaction.atomic():
+        stale = [user_id for user_id, change in changes.items()
+                 if change is None]
+        if stale:
+            RecipeStats.objects.filter(user_id__in=stale).delete()
+        rollups = RecipeStats.objects.select_for_update().filter(
+            user_id__in=[user_id for user_id, change in changes.items()
+                         if change is not None]
+        ).order_by('pk')
+        for rollup in rollups:
+            values = merge(
+                {name: getattr(rollup, name) for name in TOTALS + COUNTS},
+                changes[rollup.user_id]
+            )
+            for name, value in values.items():
+                setattr(rollup, name, value)
+            rollup.save()
+
+
+def user_values(user):
+    """Return the rollup values of user, collecting them on first use
+
+    The collection version row is locked first. Writers bump it before
+    they apply their changes, so the rollup either sees a write or gets
+    the change applied on top, never neither.
+    """
+    rollup = RecipeStats.objects.filter(user=user).values(
+        *TOTALS, *COUNTS
+    ).first()
+    if rollup is not None:
+        return rollup
+
+    CollectionVersion.objects.for_user(user)
+    with transaction.atomic():
+        CollectionVersion.objects.select_for_update().get(user=user)
+        values = collect(Recipe.objects.filter(user=user))
+        try:
+            with transaction.atomic():
+                RecipeStats.objects.create(user=user, **values)
+        except IntegrityError:
+            # Collected by a concurrent request in the meantime
+            pass
+
+    return values
+
+
+def median(price_counts):
+    """Return the median price of the recipes counted in price_counts"""
+    total = sum(price_counts.values())
+    if not total:
+        return None
+    middle = [(total - 1) // 2, total // 2]
+    found = []
+    seen = 0
+    for price, count in sorted(
+            (Decimal(price), count) for price, count in price_counts.items()):
+        while middle and middle[0] < seen + count:
+            found.append(price)
+            middle.pop(0)
+        seen += count
+
+    return sum(found) / 2
+
+
+def top(model, counts, limit):
+    """Return the limit objects of model counted most, with their counts"""
+    ranked = sorted(
+        counts.items(),
+        key=lambda item: (-item[1], int(item[0]))
+    )[:limit]
+    names = dict(model.objects.filter(
+        pk__in=[int(pk) for pk, _ in ranked]
+    ).values_list('pk', 'name'))
+
+    return [
+        {'id': int(pk), 'name': names[int(pk)], 'recipe_count': count}
+        for pk, count in ranked
+        if int(pk) in names
+    ]
+
+
+def stats(values, limit=None):
+    """Return the stats of the recipes whose rollup values are given"""
+    limit = get_config()['TOP'] if limit is None else limit
+    count = values['recipe_count']
+    result = {
+        'recipe_count': count,
+        'average_time_minutes': (
+            values['total_time_minutes'] / count if count else None
+        ),
+        'total_price': values['total_price'],
+        'median_price': median(values['price_counts']),
+    }
+    for name, (relation, model) in RELATED_COUNTS.items():
+        result[f'top_{relation}'] = top(model, values[name], limit)
+
+    return result
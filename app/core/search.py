@@ -0,0 +1,90 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db.models import (
+    CharField,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+)
+from django.db.models.functions import Cast
+
+from core.models import Recipe, Tag, Ingredient
+
+
+# Text search configuration, matching the one used by migration 0009
+SEARCH_CONFIG = 'english'
+
+
+def _names(model):
+    """Return a subquery of the names of model linked to the outer recipe"""
+    return Subquery(
+        model.objects.filter(recipe=OuterRef('pk')).order_by().values(
+            'recipe'
+        ).annotate(
+            names=StringAgg('name', ' ')
+        ).values('names'),
+        output_field=CharField()
+    )
+
+
+def search_vector():
+    """Return the expression computing the search vector of a recipe
+
+    Titles weigh most, then tag names, then ingredient names.
+    """
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector(_names(Tag), weight='B', config=SEARCH_CONFIG) +
+        SearchVector(_names(Ingredient), weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """Recompute the search vector of the given recipes in one UPDATE"""
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            search_vector=search_vector()
+        )
+
+
+def rebuild_search_vectors(queryset=None, batch_size=10000):
+    """Recompute the search vectors of queryset in batches of ids"""
+    queryset = Recipe.objects.all() if queryset is None else queryset
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    batch = []
+    for pk in ids.iterator(chunk_size=batch_size):
+        batch.append(pk)
+        if len(batch) == batch_size:
+            update_search_vectors(batch)
+            batch = []
+    update_search_vectors(batch)
+
+
+def linked_recipe_ids(model, pks):
+    """Return the ids of recipes linked to the given tags or ingredients"""
+    return set(
+        Recipe.objects.filter(**{
+            f'{model._meta.model_name}s__in': pks
+        }).values_list('pk', flat=True)
+    )
+
+
+def search(queryset, text):
+    """Filter recipes matching text, annotated with their search_rank
+
+    The rank is kept in millionths as an integer, a float would not
+    survive the round trip through a pagination cursor exactly.
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG)
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=Cast(
+            SearchRank(F('search_vector'), query) * 1000000,
+            IntegerField()
+        )
+    )
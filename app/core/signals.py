@@ -0,0 +1,290 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core import rollups, search, similarity, summaries
+from core.models import CollectionVersion, Recipe, Tag, Ingredient
+
+
+_batch = threading.local()
+
+
+def collection_changed(user_id):
+    """Record that the recipes, tags or ingredients of a user changed
+
+    Inside batch_collection_changes() the bump is held back until the
+    batch ends, otherwise the user's version is bumped straight away.
+    """
+    pending = getattr(_batch, 'pending', None)
+    if pending is not None:
+        pending.add(user_id)
+    else:
+        _bump(user_id)
+
+
+def _bump(*user_ids):
+    """Bump the versions of users, journaled for the similarity indexes"""
+    similarity.versions_bumped(CollectionVersion.objects.bump(*user_ids))
+
+
+def search_changed(recipe_ids):
+    """Record that the search vectors of the given recipes are stale
+
+    Inside batch_collection_changes() they are recomputed together when
+    the batch ends, otherwise straight away.
+    """
+    stale = getattr(_batch, 'search', None)
+    if stale is not None:
+        stale.update(recipe_ids)
+    else:
+        search.update_search_vectors(recipe_ids)
+
+
+def summaries_changed(recipe_ids, instances=()):
+    """Record that the tag and ingredient summaries of recipes are stale
+
+    instances are the recipes among them loaded in memory, which get
+    the new summaries too. Inside batch_collection_changes() they are
+    recomputed together when the batch ends, otherwise straight away.
+    """
+    stale = getattr(_batch, 'summaries', None)
+    if stale is not None:
+        stale.update(recipe_ids)
+        _batch.summary_instances.extend(instances)
+    else:
+        # The stats rollups follow the links, see the end of the batch
+        with batch_collection_changes():
+            summaries_changed(recipe_ids, instances)
+
+
+def rollup_changed(user_id, change):
+    """Record a change to the recipe stats rollup of a user
+
+    change is one built by core.rollups, or None when the rollup can no
+    longer be kept up to date and has to be collected again. Inside
+    batch_collection_changes() the changes of each user are added up
+    and applied when the batch ends, otherwise straight away. Does
+    nothing unless the RECIPE_STATS 'ROLLUP' setting is on.
+    """
+    if not rollups.get_config()['ROLLUP']:
+        return
+    pending = getattr(_batch, 'rollups', None)
+    if pending is not None:
+        _add_rollup_change(pending, user_id, change)
+    else:
+        rollups.apply({user_id: change})
+
+
+def _add_rollup_change(pending, user_id, change):
+    """Add change to the ones pending for user_id, None wins"""
+    if user_id not in pending or change is None:
+        pending[user_id] = change
+    elif pending[user_id] is not None:
+        rollups.merge(pending[user_id], change)
+
+
+def links_changed_for(recipe_ids, instances=()):
+    """Record that the tags or ingredients of the given recipes changed"""
+    recipe_ids = set(recipe_ids)
+    similarity.recipes_touched(recipe_ids)
+    search_changed(recipe_ids)
+    summaries_changed(recipe_ids, instances)
+
+
+@contextmanager
+def batch_collection_changes():
+    """Bump each changed user's version and reindex recipes once
+
+    The work recorded by collection_changed(), search_changed(),
+    summaries_changed() and rollup_changed() in the block is done in one
+    query each when it ends. Versions are bumped before the rollups are
+    changed, see core.rollups.user_values(), and after the recipes
+    touched by the block are recorded, see core.similarity.
+    """
+    if getattr(_batch, 'pending', None) is not None:
+        # Already batching, the outermost block does the work
+        yield
+        return
+
+    _batch.pending = set()
+    _batch.search = set()
+    _batch.summaries = set()
+    _batch.summary_instances = []
+    _batch.rollups = {}
+    try:
+        yield
+        pending = _batch.pending
+        stale = _batch.search
+        stale_summaries = _batch.summaries
+        summary_instances = _batch.summary_instances
+        pending_rollups = _batch.rollups
+    finally:
+        _batch.pending = None
+        _batch.search = None
+        _batch.summaries = None
+        _batch.summary_instances = None
+        _batch.rollups = None
+    if stale_summaries:
+        changes = summaries.update_summaries(
+            stale_summaries,
+            summary_instances,
+            changes=rollups.get_config()['ROLLUP']
+        )
+        for user_id, old, new in changes:
+            _add_rollup_change(
+                pending_rollups, user_id, rollups.links_change(old, new)
+            )
+    if pending:
+        _bump(*pending)
+    if pending_rollups:
+        rollups.apply(pending_rollups)
+    if stale:
+        search.update_search_vectors(stale)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    """Start a new user's collection version so reads never create it"""
+    if created and not raw:
+        CollectionVersion.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def object_changed(sender, instance, **kwargs):
+    """Bump the owner's version when a recipe, tag or ingredient changes"""
+    collection_changed(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_rolled_up(sender, instance, created, raw=False,
+                     update_fields=None, **kwargs):
+    """Add a created or edited recipe to its owner's stats rollup
+
+    What an edit changes is told from the values the recipe was loaded
+    with, a recipe missing them makes the rollup be collected again.
+    """
+    fields = ('user_id',) + rollups.RECIPE_FIELDS
+    if raw or not rollups.get_config()['ROLLUP'] or (
+            update_fields is not None and
+            not set(update_fields) & {'user', *rollups.RECIPE_FIELDS}):
+        return
+    if instance.get_deferred_fields() & set(fields):
+        rollup_changed(instance.user_id, None)
+        return
+
+    loaded = getattr(instance, '_loaded_values', {})
+    values = {name: getattr(instance, name) for name in fields}
+    instance._loaded_values = {**loaded, **values}
+    if created:
+        rollup_changed(instance.user_id, rollups.recipe_change(values))
+    elif any(name not in loaded for name in fields) or (
+            loaded['user_id'] != instance.user_id):
+        rollup_changed(instance.user_id, None)
+        rollup_changed(loaded.get('user_id', instance.user_id), None)
+    elif (loaded['time_minutes'] != values['time_minutes'] or
+          rollups.to_price(loaded['price']) !=
+          rollups.to_price(values['price'])):
+        rollup_changed(instance.user_id, rollups.merge(
+            rollups.recipe_change(
+                {name: loaded[name] for name in rollups.RECIPE_FIELDS}, -1
+            ),
+            rollups.recipe_change(values)
+        ))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_unrolled(sender, instance, **kwargs):
+    """Take a deleted recipe, with its links, out of its owner's rollup"""
+    if not rollups.get_config()['ROLLUP']:
+        return
+    fields = rollups.RECIPE_FIELDS + rollups.LINK_FIELDS
+    if instance.get_deferred_fields() & set(fields):
+        rollup_changed(instance.user_id, None)
+    else:
+        rollup_changed(instance.user_id, rollups.recipe_change(
+            {name: getattr(instance, name) for name in fields}, -1
+        ))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields=None, **kwargs):
+    """Index a recipe when its title may have changed"""
+    if update_fields is None or 'title' in update_fields:
+        search_changed([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def name_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Reindex the recipes of a renamed tag or ingredient"""
+    if created or (update_fields is not None and
+                   'name' not in update_fields):
+        return
+    search_changed(search.linked_recipe_ids(sender, [instance.pk]))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """Record a recipe about to be deleted before its owner is bumped"""
+    similarity.recipes_touched([instance.pk])
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def name_deleting(sender, instance, **kwargs):
+    """Remember the recipes of a tag or ingredient about to be deleted
+
+    They are recorded as touched as well, the owner's version is bumped
+    before they are resummarized.
+    """
+    instance._linked_recipe_ids = search.linked_recipe_ids(
+        sender, [instance.pk]
+    )
+    similarity.recipes_touched(instance._linked_recipe_ids)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def name_deleted(sender, instance, **kwargs):
+    """Reindex and resummarize the recipes that lost a tag or ingredient"""
+    links_changed_for(getattr(instance, '_linked_recipe_ids', ()))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Bump, reindex and resummarize when recipe links change
+
+    instance is the recipe, or the tag or ingredient for reverse
+    changes, all of which belong to the same user. The owner's version
+    is bumped once the recipes are resummarized.
+    """
+    if reverse and action == 'pre_clear':
+        # pk_set is not given for clear, find the recipes losing the link
+        instance._linked_recipe_ids = search.linked_recipe_ids(
+            type(instance), [instance.pk]
+        )
+    if not action.startswith('post_'):
+        return
+
+    with batch_collection_changes():
+        collection_changed(instance.user_id)
+        if not reverse:
+            links_changed_for([instance.pk], [instance])
+        elif action == 'post_clear':
+            links_changed_for(getattr(instance, '_linked_recipe_ids', ()))
+        else:
+            links_changed_for(pk_set)
@@ -0,0 +1,332 @@
+import threading
+from array import array
+from collections import Counter
+from functools import partial
+from heapq import nsmallest
+from itertools import chain
+from math import sqrt
+
+from django.conf import settings
+from django.db import transaction
+
+from core.cache import LRUCache
+from core.models import Recipe
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+DEFAULTS = {
+    'MAX_USERS': 100,
+    'TTL': 3600,
+    'LIMIT': 10,
+    'MAX_LIMIT': 100,
+    'MAX_JOURNAL': 1000,
+}
+JACCARD = 'jaccard'
+COSINE = 'cosine'
+METRICS = (JACCARD, COSINE)
+
+
+def get_config():
+    """Return the RECIPE_SIMILARITY setting with its defaults"""
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'RECIPE_SIMILARITY', {}))
+    return config
+
+
+def features(tag_ids, ingredient_ids):
+    """Return the sorted feature keys of a recipe's tags and ingredients
+
+    Tags and ingredients share one key space, tags on the even keys and
+    ingredients on the odd ones.
+    """
+    return tuple(sorted(
+        [pk * 2 for pk in tag_ids] + [pk * 2 + 1 for pk in ingredient_ids]
+    ))
+
+
+def score(metric, shared, size, other_size):
+    """Return the similarity of two recipes sharing shared features"""
+    if metric == COSINE:
+        return shared / sqrt(size * other_size)
+    return shared / (size + other_size - shared)
+
+
+class SimilarityIndex:
+    """Inverted index of the tags and ingredients of one user's recipes
+
+    Every recipe with a tag or an ingredient has a row holding its
+    features, and every feature a posting array of the rows holding it.
+    The overlap of a recipe with all the others is counted from the
+    postings of its own features only, and rows are changed in place
+    as recipes are relinked or deleted. version is the collection
+    version of the user the index reflects.
+    """
+
+    def __init__(self, version, rows=()):
+        self.version = version
+        self.lock = threading.Lock()
+        self.positions = {}
+        self.pks = array('i')
+        self.sizes = array('i')
+        self.features = []
+        self.free = []
+        self.postings = {}
+        self._load(rows)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _load(self, rows):
+        """Add rows of (pk, tag ids, ingredient ids) to an empty index"""
+        for pk, tag_ids, ingredient_ids in rows:
+            keys = features(tag_ids, ingredient_ids)
+            if keys:
+                self.positions[pk] = len(self.pks)
+                self.pks.append(pk)
+                self.sizes.append(len(keys))
+                self.features.append(keys)
+        if not self.features:
+            return
+        if numpy is None:
+            for position, keys in enumerate(self.features):
+                for key in keys:
+                    self.postings.setdefault(key, array('i')).append(
+                        position
+                    )
+            return
+
+        # Sort the (feature, row) pairs of all recipes by feature at once
+        # and cut the rows into one posting per feature
+        sizes = numpy.frombuffer(self.sizes, dtype=numpy.intc)
+        keys = numpy.fromiter(
+            chain.from_iterable(self.features),
+            dtype=numpy.int64,
+            count=int(sizes.sum())
+        )
+        positions = numpy.repeat(
+            numpy.arange(len(self.features), dtype=numpy.intc), sizes
+        )
+        order = numpy.argsort(keys, kind='stable')
+        keys, positions = keys[order], positions[order]
+        unique, starts = numpy.unique(keys, return_index=True)
+        for key, posting in zip(unique.tolist(),
+                                numpy.split(positions, starts[1:])):
+            self.postings[key] = array('i', posting.tobytes())
+
+    def update(self, pk, keys):
+        """Set the features of recipe pk, dropping it when there are none"""
+        position = self.positions.get(pk)
+        old = self.features[position] if position is not None else ()
+        if old == keys:
+            return
+        for key in set(old) - set(keys):
+            posting = self.postings[key]
+            posting.remove(position)
+            if not posting:
+                del self.postings[key]
+
+        if not keys:
+            del self.positions[pk]
+            self.pks[position] = 0
+            self.sizes[position] = 0
+            self.features[position] = ()
+            self.free.append(position)
+            return
+        if position is None:
+            if self.free:
+                position = self.free.pop()
+                self.pks[position] = pk
+            else:
+                position = len(self.pks)
+                self.pks.append(pk)
+                self.sizes.append(0)
+                self.features.append(())
+            self.positions[pk] = position
+        for key in set(keys) - set(old):
+            self.postings.setdefault(key, array('i')).append(position)
+        self.sizes[position] = len(keys)
+        self.features[position] = keys
+
+    def similar(self, pk, limit, metric=JACCARD):
+        """Return the limit (pk, score) pairs of the recipes closest to pk
+
+        Best scores first, ties broken by pk. Recipes sharing nothing
+        with pk are left out.
+        """
+        position = self.positions.get(pk)
+        if position is None or limit <= 0:
+            return []
+        keys = self.features[position]
+        if numpy is None:
+            return self._similar_python(position, keys, limit, metric)
+
+        hits = numpy.concatenate([
+            numpy.frombuffer(self.postings[key], dtype=numpy.intc)
+            for key in keys
+        ])
+        counts = numpy.bincount(hits, minlength=len(self.pks))
+        counts[position] = 0
+        rows = numpy.flatnonzero(counts)
+        shared = counts[rows]
+        sizes = numpy.frombuffer(self.sizes, dtype=numpy.intc)[rows]
+        if metric == COSINE:
+            scores = shared / numpy.sqrt(len(keys) * sizes)
+        else:
+            scores = shared / (len(keys) + sizes - shared)
+        pks = numpy.frombuffer(self.pks, dtype=numpy.intc)[rows]
+        if len(rows) > limit:
+            # Keep the rows scoring at least the limit-th best, ties at
+            # the cut included, before sorting
+            cut = len(scores) - limit
+            keep = scores >= numpy.partition(scores, cut)[cut]
+            scores, pks = scores[keep], pks[keep]
+        order = numpy.lexsort((pks, -scores))[:limit]
+
+        return list(zip(pks[order].tolist(), scores[order].tolist()))
+
+    def _similar_python(self, position, keys, limit, metric):
+        """similar() without numpy, counting the overlaps in a Counter"""
+        counts = Counter(chain.from_iterable(
+            self.postings[key] for key in keys
+        ))
+        del counts[position]
+        best = nsmallest(limit, (
+            (-score(metric, shared, len(keys), self.sizes[row]),
+             self.pks[row])
+            for row, shared in counts.items()
+        ))
+
+        return [(pk, -negated) for negated, pk in best]
+
+
+def build(user, version):
+    """Return a new index of the recipes of user at version
+
+    Features are read from the tag and ingredient ids denormalized on
+    the recipes, see core.summaries, in a single scan of their rows.
+    """
+    rows = Recipe.objects.filter(user=user).exclude(
+        tag_count=0,
+        ingredient_count=0
+    ).values_list('pk', 'tag_ids', 'ingredient_ids')
+    index = SimilarityIndex(version, rows.iterator())
+    with _journal_lock:
+        bumps = _journal.get(user.pk, {})
+        for seen in [seen for seen in bumps if seen <= version]:
+            del bumps[seen]
+
+    return index
+
+
+def similar_recipes(user, version, recipe_id, limit, metric=JACCARD):
+    """Return the (pk, score) of the limit recipes of user closest to one
+
+    The user's index is taken from the cache and caught up with the
+    bumps journaled since its version, or built again when another
+    process changed the user's recipes in the meantime. version is the
+    user's current collection version.
+    """
+    index = index_cache.get(user.pk)
+    if index is not None:
+        with index.lock:
+            if index.version >= version or _catch_up(index, user, version):
+                return index.similar(recipe_id, limit, metric)
+
+    index = build(user, version)
+    index_cache.set(user.pk, index)
+    with index.lock:
+        return index.similar(recipe_id, limit, metric)
+
+
+def _catch_up(index, user, version):
+    """Bring index to version from the journal, if it covers every bump
+
+    Returns False when a bump is missing, made by another process or
+    not committed yet, and the index has to be built again.
+    """
+    with _journal_lock:
+        bumps = _journal.get(user.pk, {})
+        missing = range(index.version + 1, version + 1)
+        if any(seen not in bumps for seen in missing):
+            return False
+        recipe_ids = set().union(*(bumps.pop(seen) for seen in missing))
+        for seen in [seen for seen in bumps if seen < version]:
+            del bumps[seen]
+
+    found = set()
+    if recipe_ids:
+        rows = Recipe.objects.filter(pk__in=recipe_ids).values_list(
+            'pk', 'user_id', 'tag_ids', 'ingredient_ids'
+        )
+        for pk, user_id, tag_ids, ingredient_ids in rows:
+            if user_id == user.pk:
+                index.update(pk, features(tag_ids, ingredient_ids))
+                found.add(pk)
+    for pk in recipe_ids - found:
+        index.update(pk, ())
+    index.version = version
+
+    return True
+
+
+def recipes_touched(recipe_ids):
+    """Record recipes whose links this thread is changing
+
+    They are journaled with the next version bump of the thread, which
+    stands for their change, see versions_bumped().
+    """
+    touched = getattr(_touched, 'recipe_ids', None)
+    if touched is None:
+        touched = _touched.recipe_ids = set()
+    touched.update(recipe_ids)
+
+
+def versions_bumped(versions):
+    """Journal bumps of collection versions once their transaction commits
+
+    versions maps user ids to their new version. The recipes touched by
+    the thread since its last bump are what the bumps stand for, only
+    bumps of users with an index in the cache are kept, up to
+    MAX_JOURNAL per user before the index is dropped instead.
+    """
+    recipe_ids = frozenset(getattr(_touched, 'recipe_ids', None) or ())
+    _touched.recipe_ids = set()
+    transaction.on_commit(partial(_journal_bumps, versions, recipe_ids))
+
+
+def _journal_bumps(versions, recipe_ids):
+    max_journal = get_config()['MAX_JOURNAL']
+    with _journal_lock:
+        for user_id, version in versions.items():
+            if user_id not in index_cache:
+                _journal.pop(user_id, None)
+                continue
+            bumps = _journal.setdefault(user_id, {})
+            bumps[version] = recipe_ids
+            if len(bumps) > max_journal:
+                # Rebuilding beats replaying that many bumps
+                del _journal[user_id]
+                index_cache.delete(user_id)
+
+
+def clear():
+    """Drop every index and the journal"""
+    index_cache.clear()
+    with _journal_lock:
+        _journal.clear()
+
+
+# Indexes of the users that asked for similar recipes lately, each kept
+# up to date by this process from {user id: {version: recipe ids}}, the
+# bumps it committed itself
+index_cache = LRUCache(
+    max_size=get_config()['MAX_USERS'],
+    ttl=get_config()['TTL']
+)
+_journal = {}
+_journal_lock = threading.Lock()
+_touched = threading.local()
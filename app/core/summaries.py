@@ -0,0 +1,130 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import F, Func, IntegerField, OuterRef, Q, Subquery
+
+from core.models import Recipe
+
+
+# Recipe columns denormalizing each M2M relation, the sorted ids of the
+# linked objects and how many there are, kept up to date by core.signals
+SUMMARY_FIELDS = {
+    'tags': ('tag_ids', 'tag_count'),
+    'ingredients': ('ingredient_ids', 'ingredient_count'),
+}
+SUMMARY_COLUMNS = tuple(
+    column for columns in SUMMARY_FIELDS.values() for column in columns
+)
+
+
+class ArraySubquery(Subquery):
+    """Subquery collecting its single column into a Postgres array"""
+    template = 'ARRAY(%(subquery)s)'
+
+
+def related_ids(model, name):
+    """Return the sorted ids linked to the outer row through M2M name"""
+    field = model._meta.get_field(name)
+    through = field.remote_field.through
+    target = f'{field.m2m_reverse_field_name()}_id'
+    return ArraySubquery(
+        through.objects.filter(**{
+            f'{field.m2m_field_name()}_id': OuterRef('pk')
+        }).order_by(target).values(target),
+        output_field=ArrayField(IntegerField())
+    )
+
+
+def denormalized_ids(model, name):
+    """Return the column holding the ids of M2M name of model, if any"""
+    if model is Recipe and name in SUMMARY_FIELDS:
+        return F(SUMMARY_FIELDS[name][0])
+    return None
+
+
+def summary_values():
+    """Return the expressions computing each summary column of a recipe"""
+    values = {}
+    for name, (ids, count) in SUMMARY_FIELDS.items():
+        values[ids] = related_ids(Recipe, name)
+        values[count] = Func(
+            related_ids(Recipe, name),
+            function='CARDINALITY',
+            output_field=IntegerField()
+        )
+    return values
+
+
+def update_summaries(recipe_ids, instances=(), changes=False):
+    """Recompute the summaries of the given recipes in one UPDATE
+
+    instances are recipes loaded in memory whose summaries should follow,
+    such as one being saved by a serializer, they are refreshed with a
+    single extra query. With changes, a list of (user id, old, new) is
+    returned for the recipes, old and new holding their ids columns
+    before and after, at the cost of one more query.
+    """
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return []
+    ids_columns = [ids for ids, _ in SUMMARY_FIELDS.values()]
+    before = {}
+    if changes:
+        before = {
+            row['pk']: row for row in Recipe.objects.filter(
+                pk__in=recipe_ids
+            ).values('pk', *ids_columns)
+        }
+    Recipe.objects.filter(pk__in=recipe_ids).update(**summary_values())
+
+    refresh = set(before)
+    refresh.update(instance.pk for instance in instances
+                   if instance.pk in recipe_ids)
+    if not refresh:
+        return []
+    after = {
+        row['pk']: row for row in Recipe.objects.filter(
+            pk__in=refresh
+        ).values('pk', 'user_id', *SUMMARY_COLUMNS)
+    }
+    for instance in instances:
+        if instance.pk in after:
+            for column in SUMMARY_COLUMNS:
+                setattr(instance, column, after[instance.pk][column])
+
+    return [
+        (after[pk]['user_id'], old, after[pk])
+        for pk, old in before.items()
+        if pk in after
+    ]
+
+
+def rebuild_summaries(queryset=None, batch_size=10000):
+    """Recompute the summaries of queryset in batches of ids
+
+    Returns the number of recipes updated.
+    """
+    queryset = Recipe.objects.all() if queryset is None else queryset
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    count = 0
+    batch = []
+    for pk in ids.iterator(chunk_size=batch_size):
+        batch.append(pk)
+        if len(batch) == batch_size:
+            update_summaries(batch)
+            count += len(batch)
+            batch = []
+    update_summaries(batch)
+
+    return count + len(batch)
+
+
+def stale_summaries(queryset=None):
+    """Return the recipes of queryset whose summaries are out of date"""
+    queryset = Recipe.objects.all() if queryset is None else queryset
+    values = summary_values()
+    stale = Q()
+    for column in values:
+        stale |= ~Q(**{column: F(f'_{column}')})
+
+    return queryset.annotate(**{
+        f'_{column}': expression for column, expression in values.items()
+    }).filter(stale)
@@ -0,0 +1,98 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from core import benchmark
+
+
+def sample_result(p50=10.0, p95=20.0, queries=2.0):
+    """Return the results of a scenario"""
+    return {'p50': p50, 'p95': p95, 'queries': queries}
+
+
+class CompareTests(SimpleTestCase):
+
+    def test_summarize(self):
+        """Test timings are summarized by their percentiles"""
+        result = benchmark.summarize([float(i) for i in range(100, 0, -1)])
+
+        self.assertEqual(result['min'], 1)
+        self.assertEqual(result['p50'], 51)
+        self.assertEqual(result['p99'], 99)
+        self.assertEqual(result['max'], 100)
+
+    def test_within_tolerance(self):
+        """Test latencies up to the tolerance above baseline pass"""
+        regressions = benchmark.compare(
+            {'me': sample_result(p50=11.9, p95=23.9)},
+            {'me': sample_result()},
+            tolerance=0.2
+        )
+
+        self.assertEqual(regressions, [])
+
+    def test_slower_latency_regresses(self):
+        """Test latencies beyond the tolerance are regressions"""
+        regressions = benchmark.compare(
+            {'me': sample_result(p95=30.0)},
+            {'me': sample_result()},
+            tolerance=0.2
+        )
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('me: p95', regressions[0])
+
+    def test_extra_queries_regress(self):
+        """Test any extra query per request is a regression"""
+        regressions = benchmark.compare(
+            {'me': sample_result(queries=3.0)},
+            {'me': sample_result()}
+        )
+
+        self.assertEqual(regressions,
+                         ['me: 3 queries per request, baseline 2'])
+
+    def test_new_scenarios_skipped(self):
+        """Test scenarios missing from the baseline are not compared"""
+        self.assertEqual(
+            benchmark.compare({'me': sample_result(queries=9.0)}, {}), []
+        )
+
+
+class BenchmarkApiCommandTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'baseline.json')
+
+    def call(self, **options):
+        call_command('benchmark_api', users=1, recipes=5, tags=2,
+                     ingredients=2, requests=2, scenario=['me', 'recipes'],
+                     stdout=io.StringIO(), **options)
+
+    def test_records_baseline(self):
+        """Test the results of each scenario are written as JSON"""
+        self.call(output=self.path)
+
+        with open(self.path) as file:
+            results = json.load(file)
+        self.assertEqual(results['scale']['requests'], 2)
+        self.assertEqual(set(results['scenarios']), {'me', 'recipes'})
+        self.assertEqual(results['scenarios']['recipes']['queries'], 2)
+
+    def test_regressions_fail(self):
+        """Test a run slower than its baseline raises CommandError"""
+        with open(self.path, 'w') as file:
+            json.dump({
+                'scale': {},
+                'scenarios': {'me': sample_result(0, 0, 0)},
+            }, file)
+
+        with self.assertRaisesRegex(CommandError, 'me: p50'):
+            self.call(baseline=self.path)
@@ -0,0 +1,83 @@
+from django.test import SimpleTestCase
+
+from core.cache import LRUCache
+from core.tests.utils import FakeTimer
+
+
+class LRUCacheTests(SimpleTestCase):
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest unused entry is evicted when full"""
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_entries_expire_after_ttl(self):
+        """Test that entries are missing once the TTL has passed"""
+        timer = FakeTimer()
+        cache = LRUCache(ttl=10, timer=timer)
+        cache.set('a', 1)
+
+        timer.now = 9
+        self.assertEqual(cache.get('a'), 1)
+        timer.now = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_contains_ignores_expired(self):
+        """Test an expired entry is not held and gets dropped"""
+        timer = FakeTimer()
+        cache = LRUCache(ttl=10, timer=timer)
+        cache.set('a', 1)
+
+        self.assertIn('a', cache)
+        timer.now = 10
+        self.assertNotIn('a', cache)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.misses, 0)
+
+    def test_stats_count_hits_and_misses(self):
+        """Test the hit and miss counters"""
+        cache = LRUCache()
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('a')
+        cache.get('b')
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertAlmostEqual(stats['hit_ratio'], 2 / 3)
+
+    def test_evicts_beyond_max_bytes(self):
+        """Test that old entries are evicted to stay within max_bytes"""
+        cache = LRUCache(max_bytes=10, sizeof=lambda key, value: len(value))
+        cache.set('a', b'12345')
+        cache.set('b', b'12345')
+        cache.set('c', b'123')
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), b'12345')
+        self.assertEqual(cache.bytes, 8)
+        cache.set('b', b'1')
+        self.assertEqual(cache.stats()['bytes'], 4)
+
+    def test_delete_matching(self):
+        """Test removing every entry whose key matches a predicate"""
+        cache = LRUCache(sizeof=lambda key, value: value)
+        cache.set((1, 'a'), 2)
+        cache.set((1, 'b'), 3)
+        cache.set((2, 'a'), 4)
+
+        removed = cache.delete_matching(lambda key: key[0] == 1)
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.bytes, 4)
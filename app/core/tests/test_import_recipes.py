@@ -0,0 +1,213 @@
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from core import rollups, search
+from core.management.commands.import_recipes import Command
+from core.models import (
+    Recipe, Tag, Ingredient, CollectionVersion, ImportCheckpoint
+)
+
+
+class ImportRecipesTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            name='Test Name',
+            password='testpass'
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        """Write content to a file in the test directory, return its path"""
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def write_ndjson(self, records, name='recipes.ndjson'):
+        return self.write(name, ''.join(
+            json.dumps(record) + '\n' for record in records
+        ))
+
+    def call(self, path, **options):
+        """Run the import for the test user and return its output"""
+        out = io.StringIO()
+        call_command('import_recipes', path, user=self.user.email,
+                     stdout=out, **options)
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        """Test recipes are created with their tags and ingredients"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        version = CollectionVersion.objects.for_user(self.user).version
+        path = self.write_ndjson([
+            {'title': 'Tomato soup', 'time_minutes': 20, 'price': '4.50',
+             'tags': ['Vegan', 'Soup'],
+             'ingredients': [{'id': 99, 'name': 'Tomato'}, 'Salt']},
+            {'title': 'Salt bread', 'time_minutes': 60, 'price': 2,
+             'link': 'https://example.com', 'ingredients': ['Salt']},
+        ])
+
+        out = self.call(path)
+
+        self.assertIn('Imported 2 recipes', out)
+        soup = Recipe.objects.get(title='Tomato soup')
+        self.assertEqual(soup.user, self.user)
+        self.assertEqual(soup.price, Decimal('4.50'))
+        self.assertEqual(set(soup.tags.all()),
+                         {vegan, Tag.objects.get(name='Soup')})
+        self.assertEqual(
+            sorted(soup.ingredients.values_list('name', flat=True)),
+            ['Salt', 'Tomato']
+        )
+        bread = Recipe.objects.get(title='Salt bread')
+        self.assertEqual(bread.link, 'https://example.com')
+        self.assertEqual(list(bread.ingredients.all()),
+                         list(soup.ingredients.filter(name='Salt')))
+        self.assertEqual(Ingredient.objects.filter(name='Salt').count(), 1)
+        self.assertEqual(
+            list(search.search(Recipe.objects.all(), 'soup')), [soup]
+        )
+        self.assertGreater(
+            CollectionVersion.objects.for_user(self.user).version, version
+        )
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_import_csv(self):
+        """Test CSV rows with ; separated names are imported"""
+        path = self.write(
+            'recipes.csv',
+            'title,time_minutes,price,link,tags,ingredients\n'
+            'Curry,30,7.25,,Spicy;Dinner,Rice\n'
+        )
+
+        self.call(path)
+
+        curry = Recipe.objects.get(title='Curry')
+        self.assertEqual(curry.price, Decimal('7.25'))
+        self.assertEqual(
+            sorted(curry.tags.values_list('name', flat=True)),
+            ['Dinner', 'Spicy']
+        )
+
+    def test_import_without_copy(self):
+        """Test bulk_create gives the same result as COPY"""
+        path = self.write_ndjson([
+            {'title': 'Stew', 'time_minutes': 90, 'price': '8.00',
+             'tags': ['Winter']},
+        ])
+
+        self.call(path, use_copy=False)
+
+        stew = Recipe.objects.get(title='Stew')
+        self.assertEqual(list(stew.tags.values_list('name', flat=True)),
+                         ['Winter'])
+
+    def test_records_name_their_user(self):
+        """Test records can be owned by users other than --user"""
+        other = get_user_model().objects.create_user(
+            email='other@mail.com',
+            name='Other',
+            password='testpass'
+        )
+        path = self.write_ndjson([
+            {'user': 'other@mail.com', 'title': 'Pie', 'time_minutes': 40,
+             'price': '3.00', 'tags': ['Dessert']},
+        ])
+
+        self.call(path)
+
+        pie = Recipe.objects.get(title='Pie')
+        self.assertEqual(pie.user, other)
+        self.assertEqual(pie.tags.get().user, other)
+
+    def test_invalid_record_stops_import(self):
+        """Test an invalid record is reported, earlier batches are kept"""
+        path = self.write_ndjson([
+            {'title': 'Fine', 'time_minutes': 5, 'price': '1.00'},
+            {'title': 'Broken', 'time_minutes': 'soon', 'price': '1.00'},
+        ])
+
+        with self.assertRaisesRegex(CommandError, 'Record 2'):
+            self.call(path, batch_size=1)
+
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['Fine']
+        )
+        self.assertEqual(
+            ImportCheckpoint.objects.get(source=path).records, 1
+        )
+
+    def test_resume_from_checkpoint(self):
+        """Test records before the checkpoint are not imported again"""
+        path = self.write(
+            'recipes.ndjson',
+            '{"title": "First", "time_minutes": 5, "price": "1.00"}\n'
+            '\n'
+            '{"title": "Second", "time_minutes": 5, "price": "1.00"}\n'
+        )
+        ImportCheckpoint.objects.create(source=path, records=1)
+
+        out = self.call(path)
+
+        self.assertIn('Resuming after record 1', out)
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['Second']
+        )
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+    def test_batch_rolled_back_without_checkpoint(self):
+        """Test a batch whose checkpoint fails is not kept either"""
+        path = self.write_ndjson([
+            {'title': 'Soup', 'time_minutes': 5, 'price': '1.00'},
+        ])
+
+        with patch.object(Command, 'write_checkpoint',
+                          side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.call(path)
+
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_unknown_user_rejected(self):
+        """Test records of users that do not exist are reported"""
+        path = self.write_ndjson([
+            {'user': 'nobody@mail.com', 'title': 'Pie', 'time_minutes': 4,
+             'price': '3.00'},
+        ])
+
+        with self.assertRaisesRegex(CommandError, 'nobody@mail.com'):
+            self.call(path)
+
+    @override_settings(RECIPE_STATS={'ROLLUP': True})
+    def test_import_updates_stats_rollup(self):
+        """Test imported recipes are added to their owner's stats rollup"""
+        Recipe.objects.create(user=self.user, title='Toast',
+                              time_minutes=5, price='1.50')
+        rollups.user_values(self.user)
+        path = self.write_ndjson([
+            {'title': 'Stew', 'time_minutes': 90, 'price': '8.00',
+             'tags': ['Winter'], 'ingredients': ['Beef']},
+            {'title': 'Salad', 'time_minutes': 10, 'price': '4.25',
+             'tags': ['Winter', 'Vegan']},
+        ])
+
+        self.call(path)
+
+        self.assertEqual(
+            rollups.user_values(self.user),
+            rollups.collect(Recipe.objects.filter(user=self.user))
+        )
+        self.assertEqual(rollups.user_values(self.user)['recipe_count'], 3)
@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.instrumentation import EndpointStats, endpoint_stats
+
+from recipe.caching import response_cache
+
+
+PERFORMANCE_URL = reverse('performance')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_timings(total, queries=1):
+    """Return the timings of one request"""
+    return {'sql': 1.0, 'auth': 0.5, 'view': total - 1.0, 'render': 0.5,
+            'total': total, 'queries': queries}
+
+
+class EndpointStatsTests(SimpleTestCase):
+
+    def test_stats_per_endpoint(self):
+        """Test percentiles, histogram and means are kept per endpoint"""
+        stats = EndpointStats()
+        for total in (3, 7, 40, 6000):
+            stats.record('GET recipe:recipe-list', sample_timings(total))
+        stats.record('GET user:me', sample_timings(2, queries=0))
+
+        result = stats.stats()
+
+        recipes = result['GET recipe:recipe-list']
+        self.assertEqual(recipes['count'], 4)
+        self.assertEqual(recipes['latency']['max'], 6000)
+        self.assertEqual(recipes['histogram']['le_5'], 1)
+        self.assertEqual(recipes['histogram']['le_10'], 1)
+        self.assertEqual(recipes['histogram']['le_50'], 1)
+        self.assertEqual(recipes['histogram']['inf'], 1)
+        self.assertEqual(recipes['mean']['queries'], 1)
+        self.assertEqual(result['GET user:me']['mean']['queries'], 0)
+
+    def test_window_rolls(self):
+        """Test only the last window requests of an endpoint are kept"""
+        stats = EndpointStats(window=2)
+        for total in (100, 1, 2):
+            stats.record('GET user:me', sample_timings(total))
+
+        self.assertEqual(stats.stats()['GET user:me']['latency']['max'], 2)
+
+
+class PerformanceMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        endpoint_stats.clear()
+        response_cache.clear()
+
+    def test_server_timing_header(self):
+        """Test responses carry the breakdown of the request"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        metrics = [metric.split(';')[0]
+                   for metric in res['Server-Timing'].split(', ')]
+        self.assertEqual(metrics, ['sql', 'auth', 'view', 'render', 'total'])
+        self.assertIn('queries"', res['Server-Timing'])
+
+    def test_requests_logged(self):
+        """Test a line is logged for each request"""
+        with self.assertLogs('core.performance', 'INFO') as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertEqual(record.endpoint, 'GET recipe:recipe-list')
+        self.assertEqual(record.status_code, 200)
+        self.assertGreater(record.timings['queries'], 0)
+        self.assertGreater(record.timings['auth'], 0)
+
+    @override_settings(PERFORMANCE_INSTRUMENTATION={'SLOW_REQUEST_MS': 0})
+    def test_slow_requests_warned(self):
+        """Test requests over the threshold are logged as warnings"""
+        with self.assertLogs('core.performance', 'WARNING'):
+            APIClient().get(RECIPES_URL)
+
+    @override_settings(PERFORMANCE_INSTRUMENTATION={'ENABLED': False})
+    def test_disabled(self):
+        """Test nothing is added once the instrumentation is disabled"""
+        res = APIClient().get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        self.assertEqual(endpoint_stats.stats(), {})
+
+    def test_stats_require_staff(self):
+        """Test the stats endpoint is limited to staff"""
+        self.assertEqual(APIClient().get(PERFORMANCE_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(PERFORMANCE_URL).status_code,
+                         status.HTTP_403_FORBIDDEN)
+
+    def test_stats_for_staff(self):
+        """Test staff read and reset the stats of each endpoint"""
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(PERFORMANCE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['GET recipe:recipe-list']['count'], 2)
+
+        res = self.client.delete(PERFORMANCE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertNotIn('GET recipe:recipe-list', endpoint_stats.stats())
@@ -0,0 +1,156 @@
+import threading
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.backends.postgresql_pool.base import DatabaseWrapper
+from core.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    """Stand-in connection recording whether it was closed"""
+
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+def sample_pool(**kwargs):
+    """Return a pool of fake connections"""
+    return ConnectionPool(
+        connect=FakeConnection,
+        close=lambda conn: conn.close(),
+        check=lambda conn: conn.healthy,
+        **kwargs
+    )
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_released_connection_reused(self):
+        """Test a released connection is handed out again"""
+        pool = sample_pool()
+        first = pool.acquire()
+        pool.release(first)
+
+        self.assertIs(pool.acquire(), first)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['reused']), (1, 1))
+
+    def test_size_capped(self):
+        """Test acquire gives up once max_size connections are in use"""
+        pool = sample_pool(max_size=2, timeout=0.01)
+        pool.acquire()
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waits_for_release(self):
+        """Test acquire blocks until another thread releases"""
+        pool = sample_pool(max_size=1, timeout=5)
+        held = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, [held])
+        timer.start()
+
+        self.assertIs(pool.acquire(), held)
+        timer.join()
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_discarded_connection_closed(self):
+        """Test releasing with discard closes and frees the slot"""
+        pool = sample_pool(max_size=1)
+        conn = pool.acquire()
+        pool.release(conn, discard=True)
+
+        self.assertTrue(conn.closed)
+        self.assertIsNot(pool.acquire(), conn)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_unhealthy_connection_replaced(self):
+        """Test idle connections failing the check are not handed out"""
+        pool = sample_pool(check_interval=0)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.healthy = False
+
+        self.assertIsNot(pool.acquire(), conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['failed_checks'], 1)
+
+    def test_old_connection_recycled(self):
+        """Test connections older than max_age are closed on release"""
+        pool = sample_pool(max_age=10)
+        with patch('core.pool.time.monotonic', return_value=0):
+            conn = pool.acquire()
+        with patch('core.pool.time.monotonic', return_value=10):
+            pool.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['idle'], 0)
+
+    def test_close_all(self):
+        """Test idle connections close at once and busy ones on release"""
+        pool = sample_pool()
+        idle = pool.acquire()
+        busy = pool.acquire()
+        pool.release(idle)
+
+        pool.close_all()
+        self.assertTrue(idle.closed)
+        self.assertFalse(busy.closed)
+        pool.release(busy)
+        self.assertTrue(busy.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+class PooledBackendTests(TestCase):
+
+    def setUp(self):
+        settings_dict = dict(connection.settings_dict)
+        settings_dict['CONN_MAX_AGE'] = 0
+        # Distinct connection params get a pool of their own
+        settings_dict['OPTIONS'] = dict(
+            settings_dict['OPTIONS'],
+            application_name='pool-test'
+        )
+        self.wrapper = DatabaseWrapper(settings_dict, connection.alias)
+
+    def tearDown(self):
+        self.wrapper.close()
+        self.wrapper._pool.close_all()
+
+    def query(self):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            return cursor.fetchone()[0]
+
+    def test_connection_returned_to_pool(self):
+        """Test closing the wrapper keeps the connection for reuse"""
+        self.query()
+        raw = self.wrapper.connection
+        self.wrapper.close()
+
+        self.assertEqual(self.query(), 1)
+        self.assertIs(self.wrapper.connection, raw)
+        stats = self.wrapper._pool.stats()
+        self.assertEqual((stats['created'], stats['reused']), (1, 1))
+
+    def test_failed_transaction_rolled_back(self):
+        """Test a connection left in a failed transaction is reset"""
+        self.wrapper.set_autocommit(False)
+        try:
+            self.query()
+            self.wrapper.cursor().execute('SELECT 1 / 0')
+        except Exception:
+            pass
+        raw = self.wrapper.connection
+        self.wrapper.close()
+
+        self.assertFalse(raw.closed)
+        self.assertEqual(self.query(), 1)
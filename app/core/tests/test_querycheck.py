@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import querycheck
+from core.models import Recipe, Tag
+
+from recipe.serializers import RecipeDetailSerializer
+
+
+class FingerprintTests(SimpleTestCase):
+
+    def test_literals_ignored(self):
+        """Test queries differing only in literals share a shape"""
+        self.assertEqual(
+            querycheck.fingerprint(
+                "SELECT * FROM t WHERE a = 1 AND b = 'x' LIMIT 21"
+            ),
+            querycheck.fingerprint(
+                "SELECT *  FROM t WHERE a = 25 AND b = 'it''s'\nLIMIT 1"
+            )
+        )
+
+    def test_in_list_lengths_ignored(self):
+        """Test IN lists of any length share a shape"""
+        self.assertEqual(
+            querycheck.fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            'SELECT * FROM t WHERE id IN (...)'
+        )
+
+
+class QueryDetectorTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Soup {i}',
+                time_minutes=5,
+                price=5.00
+            )
+            recipe.tags.add(tag)
+
+    def test_n_plus_one_reported(self):
+        """Test a query run per serialized object points at its field"""
+        detector = querycheck.QueryDetector(threshold=3)
+        with detector.capture():
+            RecipeDetailSerializer(
+                Recipe.objects.order_by('id'), many=True
+            ).data
+
+        repeated = {query.field: query for query in detector.repeated()}
+        self.assertEqual(set(repeated), {'RecipeDetailSerializer.tags',
+                                         'RecipeDetailSerializer.ingredients'})
+        tags = repeated['RecipeDetailSerializer.tags']
+        self.assertEqual(tags.count, 3)
+        self.assertEqual(tags.duplicates, 1)
+        self.assertTrue(tags.origin.startswith(
+            'core/tests/test_querycheck.py:'
+        ))
+
+    def test_prefetched_not_reported(self):
+        """Test serializing with the relations prefetched passes"""
+        detector = querycheck.QueryDetector(threshold=3)
+        with detector.capture():
+            RecipeDetailSerializer(
+                Recipe.objects.prefetch_related('tags', 'ingredients'),
+                many=True
+            ).data
+
+        self.assertEqual(detector.repeated(), [])
+
+    @override_settings(QUERY_CHECK={'ENABLED': True, 'THRESHOLD': 2})
+    def test_middleware_logs_repeated_queries(self):
+        """Test the middleware logs requests repeating a query shape"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+
+        # Each recipe of a bulk create validates its own tags
+        with self.assertLogs('core.querycheck', 'WARNING') as logs:
+            client.post(reverse('recipe:recipe-bulk'), [
+                {
+                    'title': title,
+                    'time_minutes': 30,
+                    'price': '5.00',
+                    'tags': [tag.id],
+                    'ingredients': [],
+                }
+                for title in ('Cake', 'Pie')
+            ], format='json')
+
+        self.assertIn('RecipeSerializer.tags', logs.output[0])
+
+    def test_mixin_fails_requests_repeating_queries(self):
+        """Test the test case mixin raises at the end of such a request"""
+        class Checked(querycheck.QueryCheckMixin, SimpleTestCase):
+            pass
+
+        Checked._start_query_check(sender=None)
+        RecipeDetailSerializer(Recipe.objects.all(), many=True).data
+
+        with self.assertRaisesRegex(AssertionError, 'repeated queries'):
+            Checked._finish_query_check(sender=None)
@@ -0,0 +1,121 @@
+import io
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, NDJSONRenderer
+
+
+SAMPLE = [
+    OrderedDict([
+        ('id', 1),
+        ('title', 'Crème brûlée\u2028'),
+        ('price', Decimal('5.50')),
+        ('created', datetime(2020, 1, 2, 3, 4, 5, 678901)),
+        ('uuid', uuid.UUID(int=1)),
+        ('tags', [1, 2]),
+        ('link', None),
+    ]),
+    {'id': 2, 'ratio': 0.25, 'vegan': True},
+]
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_matches_drf_renderer(self):
+        """Test the output is byte identical to the DRF renderer"""
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE),
+            JSONRenderer().render(SAMPLE)
+        )
+
+    def test_indent_matches_drf_renderer(self):
+        """Test indented JSON is still rendered when asked for"""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE, media_type),
+            JSONRenderer().render(SAMPLE, media_type)
+        )
+
+    def test_none_renders_empty(self):
+        """Test no data renders an empty body"""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_iter_render_chunks_lists(self):
+        """Test lists are rendered in pieces making up the whole"""
+        renderer = FastJSONRenderer()
+        data = [{'id': i} for i in range(5)]
+
+        chunks = list(renderer.iter_render(data, chunk_size=2))
+
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(b''.join(chunks), renderer.render(data))
+        self.assertEqual(b''.join(renderer.iter_render([])), b'[]')
+
+    def test_iter_render_other_data_whole(self):
+        """Test data other than lists is rendered in one piece"""
+        renderer = FastJSONRenderer()
+
+        chunks = list(renderer.iter_render({'results': SAMPLE}))
+
+        self.assertEqual(chunks, [renderer.render({'results': SAMPLE})])
+
+
+class NDJSONRendererTests(SimpleTestCase):
+
+    def test_one_line_per_item(self):
+        """Test each item of an iterable is rendered on its own line"""
+        renderer = NDJSONRenderer()
+        items = ({'id': i} for i in range(5))
+
+        chunks = list(renderer.iter_render(items, chunk_size=2))
+
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(
+            b''.join(chunks),
+            b''.join(b'{"id":%d}\n' % i for i in range(5))
+        )
+
+    def test_dict_rendered_as_one_line(self):
+        """Test a single object, such as an error, is one line"""
+        self.assertEqual(
+            NDJSONRenderer().render({'detail': 'Not found.'}),
+            b'{"detail":"Not found."}\n'
+        )
+
+
+class FastJSONParserTests(SimpleTestCase):
+
+    def parse(self, content, encoding='utf-8'):
+        return FastJSONParser().parse(io.BytesIO(content), None,
+                                      {'encoding': encoding})
+
+    def test_matches_drf_parser(self):
+        """Test bodies parse to what the DRF parser gives"""
+        content = FastJSONRenderer().render(SAMPLE)
+
+        self.assertEqual(
+            self.parse(content),
+            JSONParser().parse(io.BytesIO(content))
+        )
+
+    def test_request_encoding_used(self):
+        """Test bodies in other charsets are decoded first"""
+        content = '{"title": "Crème"}'.encode('latin-1')
+
+        self.assertEqual(self.parse(content, 'latin-1'), {'title': 'Crème'})
+
+    def test_invalid_json_rejected(self):
+        """Test malformed bodies and non finite numbers raise ParseError"""
+        for content in (b'{"title": ', b'{"price": NaN}', b'\xff'):
+            with self.assertRaises(ParseError):
+                self.parse(content)
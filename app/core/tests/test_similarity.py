@@ -0,0 +1,136 @@
+import random
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from core import similarity
+from core.cache import LRUCache
+from core.tests.utils import FakeTimer
+
+
+def sample_rows(count, seed=0):
+    """Return rows of (pk, tag ids, ingredient ids) of random recipes"""
+    rng = random.Random(seed)
+    return [
+        (pk,
+         sorted(rng.sample(range(1, 20), rng.randint(0, 4))),
+         sorted(rng.sample(range(1, 40), rng.randint(0, 8))))
+        for pk in range(1, count + 1)
+    ]
+
+
+def brute_force(rows, pk, limit, metric):
+    """Return the ranking of similar() computed pair by pair"""
+    keys = {row[0]: set(similarity.features(*row[1:])) for row in rows}
+    ranked = []
+    for other, other_keys in keys.items():
+        shared = len(keys[pk] & other_keys)
+        if other != pk and shared:
+            ranked.append((-similarity.score(
+                metric, shared, len(keys[pk]), len(other_keys)
+            ), other))
+
+    return [(other, -score) for score, other in sorted(ranked)[:limit]]
+
+
+class SimilarityIndexTests(SimpleTestCase):
+    """Test the inverted index ranking recipes by shared features"""
+
+    def assertRanking(self, index, rows, limit=5):
+        """Assert index ranks every recipe as comparing all pairs does"""
+        for pk, tag_ids, ingredient_ids in rows:
+            if not tag_ids and not ingredient_ids:
+                continue
+            for metric in similarity.METRICS:
+                ranked = index.similar(pk, limit, metric)
+                expected = brute_force(rows, pk, limit, metric)
+                self.assertEqual([pk for pk, _ in ranked],
+                                 [pk for pk, _ in expected])
+                for (_, score), (_, best) in zip(ranked, expected):
+                    self.assertAlmostEqual(score, best)
+
+    def test_jaccard_and_cosine(self):
+        """Test the scores of recipes sharing some features"""
+        index = similarity.SimilarityIndex(1, [
+            (1, [1, 2], [1]),
+            (2, [1, 2], [2]),
+            (3, [], [1]),
+            (4, [3], []),
+        ])
+
+        self.assertEqual(index.similar(1, 10), [(2, 0.5), (3, 1 / 3)])
+        ranked = index.similar(1, 10, similarity.COSINE)
+        self.assertEqual([pk for pk, _ in ranked], [2, 3])
+        self.assertAlmostEqual(ranked[1][1], 1 / 3 ** 0.5)
+        self.assertEqual(index.similar(4, 10), [])
+        self.assertEqual(index.similar(99, 10), [])
+
+    def test_ranking_matches_pairwise(self):
+        """Test the ranking of many recipes, ties broken by id"""
+        rows = sample_rows(200)
+        self.assertRanking(similarity.SimilarityIndex(1, rows), rows)
+
+    def test_ranking_without_numpy(self):
+        """Test the pure Python path ranks recipes the same way"""
+        rows = sample_rows(200)
+        with patch('core.similarity.numpy', None):
+            self.assertRanking(similarity.SimilarityIndex(1, rows), rows)
+
+    def test_update(self):
+        """Test relinked, new and removed recipes are ranked as if rebuilt
+        """
+        rows = sample_rows(100)
+        index = similarity.SimilarityIndex(1, rows)
+        changed = sample_rows(130, seed=1)
+        for pk, tag_ids, ingredient_ids in changed[::2]:
+            index.update(pk, similarity.features(tag_ids, ingredient_ids))
+        rows = {row[0]: row for row in rows}
+        rows.update((row[0], row) for row in changed[::2])
+        for pk in range(1, 10):
+            index.update(pk, ())
+            rows.pop(pk, None)
+
+        self.assertEqual(len(index), len([
+            row for row in rows.values() if row[1] or row[2]
+        ]))
+        self.assertRanking(index, list(rows.values()))
+
+
+class SimilarityJournalTests(SimpleTestCase):
+    """Test the journal of committed bumps kept for cached indexes"""
+
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.index_cache = LRUCache(ttl=10, timer=self.timer)
+        self.journal = {}
+        patcher = patch.multiple(
+            'core.similarity',
+            index_cache=self.index_cache,
+            _journal=self.journal
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index_cache.set(1, similarity.SimilarityIndex(1))
+
+    def test_bumps_of_expired_index_dropped(self):
+        """Test no bumps are kept once the user's index expired"""
+        similarity._journal_bumps({1: 2}, frozenset([10]))
+        self.assertEqual(self.journal, {1: {2: frozenset([10])}})
+
+        self.timer.now = 10
+        for version in range(3, 100):
+            similarity._journal_bumps({1: version}, frozenset([10]))
+
+        self.assertEqual(self.journal, {})
+
+    @override_settings(RECIPE_SIMILARITY={'MAX_JOURNAL': 3})
+    def test_journal_overflow_drops_index(self):
+        """Test too many bumps drop the journal and index of the user"""
+        for version in range(2, 5):
+            similarity._journal_bumps({1: version}, frozenset([10]))
+        self.assertEqual(len(self.journal[1]), 3)
+
+        similarity._journal_bumps({1: 5}, frozenset([10]))
+
+        self.assertEqual(self.journal, {})
+        self.assertNotIn(1, self.index_cache)
@@ -0,0 +1,129 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import summaries
+from core.models import Recipe, Tag, Ingredient
+from core.tests.utils import sample_recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RecipeSummaryTests(TestCase):
+    """Test the tag and ingredient summaries denormalized on recipes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def summary(self, recipe):
+        """Return the summary columns of recipe as stored"""
+        return Recipe.objects.values(*summaries.SUMMARY_COLUMNS).get(
+            pk=recipe.pk
+        )
+
+    def test_links_update_summaries(self):
+        """Test adding and removing links keeps the summaries in step"""
+        recipe = sample_recipe(self.user)
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        recipe.tags.add(quick, vegan)
+        recipe.ingredients.add(salt)
+        recipe.tags.remove(quick)
+
+        self.assertEqual(self.summary(recipe), {
+            'tag_ids': [vegan.id],
+            'tag_count': 1,
+            'ingredient_ids': [salt.id],
+            'ingredient_count': 1,
+        })
+        self.assertEqual(recipe.tag_ids, [vegan.id])
+
+        recipe.tags.clear()
+
+        self.assertEqual(self.summary(recipe)['tag_ids'], [])
+        self.assertEqual(recipe.tag_count, 0)
+
+    def test_reverse_links_and_deletes_update_summaries(self):
+        """Test links changed from the tag side or by deletes are seen"""
+        recipe1 = sample_recipe(self.user, title='Curry')
+        recipe2 = sample_recipe(self.user, title='Stew')
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+
+        tag.recipe_set.add(recipe1, recipe2)
+
+        self.assertEqual(self.summary(recipe2)['tag_ids'], [tag.id])
+
+        tag.recipe_set.clear()
+
+        self.assertEqual(self.summary(recipe1)['tag_count'], 0)
+
+        recipe1.tags.add(tag)
+        tag.delete()
+
+        self.assertEqual(self.summary(recipe1)['tag_ids'], [])
+
+    def test_created_recipe_returns_counts(self):
+        """Test a recipe created through the API reports its counts"""
+        tags = [Tag.objects.create(user=self.user, name=name).id
+                for name in ('Vegan', 'Dessert')]
+
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Cake',
+            'time_minutes': 30,
+            'price': 5.00,
+            'tags': tags,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['tag_count'], 2)
+        self.assertEqual(res.data['ingredient_count'], 0)
+
+    def test_list_skips_through_tables(self):
+        """Test listing recipes reads the related ids from the summaries"""
+        recipe = sample_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'], [tag.id])
+        self.assertEqual(res.data['results'][0]['tag_count'], 1)
+        for query in queries:
+            self.assertNotIn('core_recipe_tags', query['sql'])
+            self.assertNotIn('core_recipe_ingredients', query['sql'])
+
+    def test_rebuild_command(self):
+        """Test stale summaries are reported and then rebuilt"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        Recipe.objects.update(tag_ids=[], tag_count=0)
+
+        with self.assertRaisesRegex(CommandError, '1 recipes have stale'):
+            call_command('rebuild_recipe_summaries', verify=True,
+                         stdout=StringIO())
+
+        out = StringIO()
+        call_command('rebuild_recipe_summaries', user='test@mail.com',
+                     stdout=out)
+
+        self.assertIn('Rebuilt the summaries of 1 recipes', out.getvalue())
+        self.assertEqual(self.summary(recipe)['tag_count'], 1)
+        self.assertFalse(summaries.stale_summaries().exists())
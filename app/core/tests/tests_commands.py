@@ -1,23 +1,64 @@
 from unittest.mock import patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core import db
+
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+        with patch('core.db.check_connection') as cc:
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+            self.assertEqual(cc.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for the db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+        with patch('core.db.check_connection') as cc:
+            cc.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+            self.assertEqual(cc.call_count, 6)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backs_off(self, ts):
+        """Test the delay between attempts doubles up to the maximum"""
+        with patch('core.db.check_connection') as cc:
+            cc.side_effect = [OperationalError] * 5 + [True]
+            call_command('wait_for_db', max_delay=1)
+
+        delays = [call[0][0] for call in ts.call_args_list]
+        self.assertEqual(delays, [0.1, 0.2, 0.4, 0.8, 1])
+
+    def test_wait_for_db_timeout(self):
+        """Test giving up once the timeout has passed"""
+        with patch('core.db.check_connection') as cc:
+            cc.side_effect = OperationalError('connection refused')
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0)
+
+    def test_wait_for_db_warm(self):
+        """Test the warm mode validates every configured connection"""
+        with patch('core.db.warm_connections') as wc:
+            wc.return_value = {'default': 1.0}
+            call_command('wait_for_db', warm=True)
+            self.assertEqual(wc.call_count, 1)
+
+    def test_warm_after_fork_only_in_workers(self):
+        """Test connections are warmed in forked workers, not before"""
+        with patch('os.register_at_fork') as register, \
+                patch('core.db.warm_connections') as wc:
+            db.warm_after_fork()
+            self.assertEqual(wc.call_count, 0)
+
+            register.call_args[1]['after_in_child']()
+            self.assertEqual(wc.call_count, 1)
+
+    def test_check_connection_queries_database(self):
+        """Test the check runs a real query"""
+        with self.assertNumQueries(1):
+            db.check_connection()
@@ -0,0 +1,26 @@
+from core.models import Recipe
+
+
+class FakeTimer:
+    """Clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def sample_recipe(user, tags=(), ingredients=(), **params):
+    """Create and return a sample recipe linked to tags and ingredients"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    recipe = Recipe.objects.create(user=user, **defaults)
+    recipe.tags.add(*tags)
+    recipe.ingredients.add(*ingredients)
+    return recipe
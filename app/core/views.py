@@ -0,0 +1,25 @@
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.instrumentation import endpoint_stats
+
+from user.authentication import CachedTokenAuthentication
+
+
+class PerformanceStatsView(APIView):
+    """Show the rolling request timings of each endpoint to staff"""
+    authentication_classes = (CachedTokenAuthentication,
+                              SessionAuthentication)
+    permission_classes = (IsAdminUser, )
+
+    def get(self, request):
+        """Return the stats of this process, keyed by method and view"""
+        return Response(endpoint_stats.stats())
+
+    def delete(self, request):
+        """Start the stats of this process over"""
+        endpoint_stats.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
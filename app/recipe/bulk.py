@@ -0,0 +1,165 @@
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.signals import m2m_changed, post_save
+
+from rest_framework import serializers
+
+from core.signals import batch_collection_changes
+
+
+def bulk_update(model, instances, fields_per_instance):
+    """Write the given fields of every instance in a single UPDATE
+
+    fields_per_instance lists, for each instance, the field names to
+    write, so partial updates of different fields can share a statement.
+    Each field becomes a CASE on the primary key that falls back to the
+    current column value for rows that do not set it.
+    """
+    whens = {}
+    for instance, fields in zip(instances, fields_per_instance):
+        for name in fields:
+            field = model._meta.get_field(name)
+            whens.setdefault(name, []).append(When(
+                pk=instance.pk,
+                then=Value(getattr(instance, field.attname),
+                           output_field=field)
+            ))
+    if not whens:
+        return
+
+    model._default_manager.filter(
+        pk__in=[instance.pk for instance in instances]
+    ).update(**{
+        name: Case(
+            *cases,
+            default=F(name),
+            output_field=model._meta.get_field(name)
+        )
+        for name, cases in whens.items()
+    })
+
+
+def set_many_related(model, instances, related, replace=True):
+    """Set the M2M links of instances with bulk inserts
+
+    related maps each M2M field name to a list, aligned with instances,
+    of the related objects to link, or None to leave a row untouched.
+    Existing links are deleted first unless replace is False, which is
+    only safe for freshly created instances. The post_clear and post_add
+    m2m_changed signals are sent for every instance, as Model.tags.set()
+    would, so receivers keeping derived data up to date still run.
+    """
+    for name, values in related.items():
+        field = getattr(model, name).field
+        through = field.remote_field.through
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+
+        changed = [
+            (instance, objects)
+            for instance, objects in zip(instances, values)
+            if objects is not None
+        ]
+        if replace:
+            through.objects.filter(**{
+                f'{source}__in': [instance.pk for instance, _ in changed]
+            }).delete()
+        through.objects.bulk_create(
+            through(**{f'{source}_id': instance.pk, f'{target}_id': obj.pk})
+            for instance, objects in changed
+            for obj in set(objects)
+        )
+
+        for instance, objects in changed:
+            signal = {
+                'sender': through,
+                'instance': instance,
+                'reverse': False,
+                'model': field.remote_field.model,
+                'using': instance._state.db,
+            }
+            if replace:
+                m2m_changed.send(action='post_clear', pk_set=None, **signal)
+            m2m_changed.send(
+                action='post_add',
+                pk_set={obj.pk for obj in objects},
+                **signal
+            )
+
+
+def send_post_save(model, instances, created, fields_per_instance=None):
+    """Send post_save for instances written without calling save()
+
+    Receivers keeping derived data, like collection versions and search
+    vectors, then treat bulk writes the same as single ones.
+    """
+    fields_per_instance = fields_per_instance or [None] * len(instances)
+    for instance, fields in zip(instances, fields_per_instance):
+        post_save.send(
+            sender=model,
+            instance=instance,
+            created=created,
+            update_fields=None if fields is None else frozenset(fields),
+            raw=False,
+            using=instance._state.db
+        )
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """List serializer persisting a whole batch with bulk queries
+
+    Creating N objects costs one INSERT for the rows plus one per M2M
+    field for the links, and updating them one UPDATE plus the same,
+    all inside a single transaction. post_save and m2m_changed are sent
+    for every object, and the work their receivers defer, bumping the
+    owners' collection versions and reindexing recipes, is done once
+    for the batch.
+    """
+
+    def _split_many_related(self, validated_data):
+        """Pop the M2M values out of each item of validated_data"""
+        model = self.child.Meta.model
+        related = {}
+        for field in model._meta.many_to_many:
+            if any(field.name in attrs for attrs in validated_data):
+                related[field.name] = [
+                    attrs.pop(field.name, None) for attrs in validated_data
+                ]
+
+        return related
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        with transaction.atomic(), batch_collection_changes():
+            related = self._split_many_related(validated_data)
+            instances = model._default_manager.bulk_create(
+                [model(**attrs) for attrs in validated_data]
+            )
+            send_post_save(model, instances, created=True)
+            set_many_related(model, instances, related, replace=False)
+
+        return instances
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        # Fields like updated_at are refreshed the way save() would
+        auto_now = [
+            field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        ]
+        with transaction.atomic(), batch_collection_changes():
+            related = self._split_many_related(validated_data)
+            for instance, attrs in zip(instances, validated_data):
+                for name, value in attrs.items():
+                    setattr(instance, name, value)
+                for field in auto_now:
+                    field.pre_save(instance, add=False)
+            fields_per_instance = [
+                list(attrs) + [field.name for field in auto_now]
+                for attrs in validated_data
+            ]
+            bulk_update(model, instances, fields_per_instance)
+            send_post_save(model, instances, False, fields_per_instance)
+            set_many_related(model, instances, related)
+
+        return instances
@@ -0,0 +1,199 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.cache import LRUCache
+
+
+class CachedResponse:
+    """Rendered body and content type of a cached response"""
+    __slots__ = ('content', 'content_type')
+
+    def __init__(self, content, content_type):
+        self.content = content
+        self.content_type = content_type
+
+    def __len__(self):
+        return len(self.content)
+
+
+class LocalResponseCache:
+    """Per process backend keeping responses in a byte bounded LRU
+
+    Keys are (user_id, key) pairs so a user's entries can be dropped
+    without touching anyone else's.
+    """
+
+    def __init__(self, max_size=1000, max_bytes=32 * 1024 * 1024, ttl=300):
+        self.lru = LRUCache(
+            max_size=max_size,
+            ttl=ttl,
+            max_bytes=max_bytes,
+            sizeof=lambda key, value: len(key[1]) + len(value)
+        )
+
+    def get(self, user_id, key):
+        return self.lru.get((user_id, key))
+
+    def set(self, user_id, key, response):
+        self.lru.set((user_id, key), response)
+
+    def invalidate(self, user_id):
+        self.lru.delete_matching(lambda key: key[0] == user_id)
+
+    def clear(self):
+        self.lru.clear()
+
+    def stats(self):
+        return self.lru.stats()
+
+
+class SharedResponseCache:
+    """Backend storing responses in a Django cache shared by workers
+
+    Any CACHES alias works, a file based cache shares responses between
+    the processes of one host and memcached or redis between hosts.
+    Entries can not be listed there, so each user has a generation
+    number in their keys and invalidating moves it on, leaving the old
+    entries to expire.
+    """
+    key_prefix = 'recipe-response:'
+
+    def __init__(self, alias, ttl=300):
+        self.alias = alias
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _generation_key(self, user_id):
+        return f'{self.key_prefix}generation:{user_id}'
+
+    def _key(self, user_id, key):
+        generation = self.cache.get(self._generation_key(user_id), 0)
+        return f'{self.key_prefix}{user_id}:{generation}:{key}'
+
+    def get(self, user_id, key):
+        response = self.cache.get(self._key(user_id, key))
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return response
+
+    def set(self, user_id, key, response):
+        self.cache.set(self._key(user_id, key), response, self.ttl)
+        with self._lock:
+            self.bytes_written += len(response)
+
+    def invalidate(self, user_id):
+        key = self._generation_key(user_id)
+        self.cache.add(key, 0, None)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            self.cache.set(key, 1, None)
+
+    def clear(self):
+        self.hits = self.misses = self.bytes_written = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'alias': self.alias,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'bytes_written': self.bytes_written,
+        }
+
+
+class ResponseCache:
+    """Cache of rendered list responses keyed by user and request
+
+    The key covers the endpoint, the scheme and host the absolute
+    pagination links are built from, the renderer, normalized query
+    params and the user's collection version, so a response is never
+    served once the user's data changed even if an invalidation was
+    missed. The views still invalidate on every write to free the stale
+    entries.
+    """
+
+    def __init__(self, backend, enabled=True):
+        self.backend = backend
+        self.enabled = enabled
+
+    @classmethod
+    def from_settings(cls):
+        """Build the cache from the RECIPE_RESPONSE_CACHE setting"""
+        config = getattr(settings, 'RECIPE_RESPONSE_CACHE', {})
+        ttl = config.get('TTL', 300)
+        if config.get('SHARED_CACHE'):
+            backend = SharedResponseCache(config['SHARED_CACHE'], ttl=ttl)
+        else:
+            backend = LocalResponseCache(
+                max_size=config.get('MAX_SIZE', 1000),
+                max_bytes=config.get('MAX_BYTES', 32 * 1024 * 1024),
+                ttl=ttl
+            )
+
+        return cls(backend, enabled=config.get('ENABLED', True))
+
+    @staticmethod
+    def make_key(endpoint, origin, renderer, version, params,
+                 list_params=()):
+        """Return the cache key of a request
+
+        Params are sorted, and the comma separated ID lists named in
+        list_params sorted and deduplicated, so equivalent requests
+        share an entry.
+        """
+        normalized = []
+        for name in sorted(params):
+            values = params.getlist(name)
+            if name in list_params:
+                values = [','.join(sorted({
+                    item.strip()
+                    for value in values
+                    for item in value.split(',')
+                    if item.strip()
+                }, key=lambda item: (len(item), item)))]
+            normalized.append(f'{name}={"&".join(sorted(values))}')
+        key = '|'.join(
+            [endpoint, origin, renderer, str(version)] + normalized
+        )
+
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def get(self, user_id, key):
+        if not self.enabled:
+            return None
+        return self.backend.get(user_id, key)
+
+    def set(self, user_id, key, response):
+        if self.enabled:
+            self.backend.set(user_id, key, response)
+
+    def invalidate(self, user_id):
+        """Drop every cached response of the user"""
+        self.backend.invalidate(user_id)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """Return the hit ratio and memory use of the backend"""
+        return self.backend.stats()
+
+
+response_cache = ResponseCache.from_settings()
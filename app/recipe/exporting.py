@@ -0,0 +1,55 @@
+from itertools import islice
+
+from recipe import fastpath, querysets, serializers
+
+
+# Columns written for each exported recipe, its tags and ingredients are
+# inlined as {id, name} objects
+EXPORT_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link')
+
+
+def _related(model, name, recipe_ids):
+    """Return {recipe id: [{id, name}]} for M2M name of the given recipes"""
+    field = model._meta.get_field(name)
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    links = field.remote_field.through.objects.filter(**{
+        f'{source}_id__in': recipe_ids
+    }).order_by(f'{target}_id').values_list(
+        f'{source}_id', f'{target}_id', f'{target}__name'
+    )
+
+    related = {}
+    for recipe_id, pk, related_name in links:
+        related.setdefault(recipe_id, []).append(
+            {'id': pk, 'name': related_name}
+        )
+    return related
+
+
+def iter_recipes(queryset, ordering=(), chunk_size=1000):
+    """Yield the recipes of queryset with their tags and ingredients inlined
+
+    Rows are read through a server side cursor chunk_size at a time and
+    each chunk looks up its relations in one query per relation, so the
+    memory used does not grow with the size of the queryset.
+    """
+    serializer = serializers.RecipeSerializer(
+        context={'fields': EXPORT_FIELDS}
+    )
+    rows = fastpath.rows(queryset, serializer, ordering).iterator(
+        chunk_size=chunk_size
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        related = {
+            name: _related(queryset.model, name, ids)
+            for name in querysets.RECIPE_RELATIONS
+        }
+        for recipe in fastpath.serialize(serializer, chunk):
+            for name, links in related.items():
+                recipe[name] = links.get(recipe['id'], [])
+            yield recipe
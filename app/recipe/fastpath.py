@@ -0,0 +1,114 @@
+from rest_framework import fields, relations
+from rest_framework.settings import api_settings
+
+from core.summaries import denormalized_ids, related_ids
+
+
+# Fields whose to_representation() leaves database values unchanged
+IDENTITY_FIELDS = (
+    fields.IntegerField,
+    fields.CharField,
+    fields.BooleanField,
+)
+# Fields whose to_representation() only needs the column value
+VALUE_FIELDS = IDENTITY_FIELDS + (
+    fields.DecimalField,
+    fields.FloatField,
+    fields.DateTimeField,
+    fields.DateField,
+)
+
+
+def _decimal_string(field, model):
+    """Return a cheaper stand in for field's to_representation, if any
+
+    A column already stored with the field's decimal places needs no
+    quantizing, formatting its value gives the same string.
+    """
+    coerce_to_string = getattr(field, 'coerce_to_string',
+                               api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or model is None:
+        return None
+    column = model._meta.get_field(field.source)
+    if column.decimal_places != field.decimal_places or (
+            field.max_digits is not None and
+            column.max_digits > field.max_digits):
+        return None
+
+    return '{:f}'.format
+
+
+def _plan(serializer):
+    """Return (name, key, convert, m2m) for each field of serializer
+
+    key is the values() key holding the field's value and convert turns
+    it into the representation, or None when it already is one. m2m is
+    the relation whose ids the key aggregates, if any. Returns None if
+    a field can not be built from a row.
+    """
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, relations.ManyRelatedField) and isinstance(
+                field.child_relation, relations.PrimaryKeyRelatedField):
+            plan.append((name, f'_{field.source}_ids', None, field.source))
+        elif isinstance(field, VALUE_FIELDS) and '.' not in field.source:
+            convert = None
+            if isinstance(field, fields.DecimalField):
+                convert = _decimal_string(field, model)
+            if convert is None and not isinstance(field, IDENTITY_FIELDS):
+                convert = field.to_representation
+            plan.append((name, field.source, convert, None))
+        else:
+            return None
+
+    return plan
+
+
+def supports(serializer):
+    """Return whether rows can stand in for instances of serializer"""
+    return _plan(serializer) is not None
+
+
+def rows(queryset, serializer, ordering=()):
+    """Return queryset as values() rows carrying what serializer emits
+
+    M2M primary keys are read from the array columns denormalizing them,
+    see core.summaries, or else aggregated into sorted arrays by
+    subqueries. The columns named in ordering are kept for pagination
+    cursors.
+    """
+    model = queryset.model
+    columns = []
+    arrays = {}
+    for name, key, _, m2m in _plan(serializer):
+        if m2m is not None:
+            arrays[key] = denormalized_ids(model, m2m)
+            if arrays[key] is None:
+                arrays[key] = related_ids(model, m2m)
+        else:
+            columns.append(key)
+    for field in ordering:
+        name = field.lstrip('-')
+        if name not in columns:
+            columns.append(name)
+
+    return queryset.prefetch_related(None).values(*columns, **arrays)
+
+
+def serialize(serializer, rows):
+    """Return the representation of rows, as serializer would give it"""
+    plan = _plan(serializer)
+    data = []
+    for row in rows:
+        item = {}
+        for name, key, convert, _ in plan:
+            value = row[key]
+            if convert is not None and value is not None:
+                value = convert(value)
+            item[name] = value
+        data.append(item)
+
+    return data
@@ -0,0 +1,122 @@
+from django.db.models import Count, Exists, OuterRef
+
+from rest_framework.exceptions import ValidationError
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (MATCH_ANY, MATCH_ALL)
+FLAG_CHOICES = {'1': True, 'true': True, '0': False, 'false': False}
+
+
+def parse_match(value):
+    """Return the match mode of a '?match=' query param"""
+    match = (value or MATCH_ANY).lower()
+    if match not in MATCH_CHOICES:
+        raise ValidationError(
+            {'match': [f'Expected one of: {", ".join(MATCH_CHOICES)}.']}
+        )
+
+    return match
+
+
+def parse_flag(value, param):
+    """Return the boolean of a '?param=1' style query param"""
+    flag = (value or '0').lower()
+    if flag not in FLAG_CHOICES:
+        raise ValidationError(
+            {param: [f'Expected one of: {", ".join(FLAG_CHOICES)}.']}
+        )
+
+    return FLAG_CHOICES[flag]
+
+
+def parse_choice(value, choices, param):
+    """Return the one of choices named by a query param, the first if none
+    """
+    choice = (value or choices[0]).lower()
+    if choice not in choices:
+        raise ValidationError(
+            {param: [f'Expected one of: {", ".join(choices)}.']}
+        )
+
+    return choice
+
+
+def parse_limit(value, default, maximum):
+    """Return the number of results asked for by a '?limit=' query param"""
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= maximum:
+        raise ValidationError(
+            {'limit': [f'Expected a number from 1 to {maximum}.']}
+        )
+
+    return limit
+
+
+def parse_ordering(value, orderings, default):
+    """Return the ordering picked by a '?ordering=' query param
+
+    orderings maps the names clients may pass to the order_by() fields
+    they stand for, default is used when the param is missing.
+    """
+    if not value:
+        return default
+    if value not in orderings:
+        raise ValidationError(
+            {'ordering': [f'Expected one of: {", ".join(orderings)}.']}
+        )
+
+    return orderings[value]
+
+
+def filter_related(queryset, name, ids, match=MATCH_ANY):
+    """Filter queryset to rows linked to any or all of ids through name
+
+    Both modes run as subqueries against the M2M table instead of
+    joining it, so a row linked to several of the ids is still returned
+    once: 'any' is an EXISTS semi-join and 'all' a grouped count of the
+    matching links.
+    """
+    field = queryset.model._meta.get_field(name)
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    links = through.objects.filter(**{f'{target}_id__in': ids})
+
+    if match == MATCH_ALL:
+        matching = links.values(f'{source}_id').annotate(
+            matched=Count(f'{target}_id', distinct=True)
+        ).filter(matched=len(set(ids))).values(f'{source}_id')
+        return queryset.filter(pk__in=matching)
+
+    alias = f'_has_{name}'
+    return queryset.annotate(**{
+        alias: Exists(links.filter(**{f'{source}_id': OuterRef('pk')}))
+    }).filter(**{alias: True})
+
+
+def parse_fields(value, choices, param):
+    """Return the names listed in a comma separated query param
+
+    Returns None when the param is missing or empty and raises a
+    ValidationError naming the valid choices for unknown names.
+    """
+    names = [name.strip() for name in (value or '').split(',')]
+    names = list(dict.fromkeys(name for name in names if name))
+    if not names:
+        return None
+
+    unknown = [name for name in names if name not in choices]
+    if unknown:
+        raise ValidationError({param: [
+            f'Unknown field(s): {", ".join(unknown)}. '
+            f'Expected any of: {", ".join(choices)}.'
+        ]})
+
+    return names
@@ -0,0 +1,155 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+
+from core.models import Recipe, recipe_image_file_path
+from core.signals import collection_changed
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WORKERS': 2,
+    # Process uploads in the request thread instead of the pool
+    'EAGER': False,
+    'VARIANTS': {
+        'thumbnail': (150, 150),
+        'medium': (600, 600),
+    },
+    'QUALITY': 80,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_config():
+    """Return RECIPE_IMAGE_PIPELINE merged over the defaults"""
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'RECIPE_IMAGE_PIPELINE', {}))
+    return config
+
+
+def get_executor():
+    """Return the process wide worker pool, starting it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_config()['WORKERS'],
+                thread_name_prefix='recipe-images'
+            )
+
+    return _executor
+
+
+def variant_format():
+    """Return the (format, extension) variants are encoded with
+
+    WebP is much smaller than JPEG at the same quality but depends on
+    Pillow being built against libwebp.
+    """
+    Image.init()
+    if 'WEBP' in Image.SAVE:
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def variant_name(name, variant):
+    """Return the storage name of a variant of the image called name"""
+    root = os.path.splitext(name)[0]
+    return f'{root}_{variant}.{variant_format()[1]}'
+
+
+def variant_urls(recipe):
+    """Return {variant: url} for a recipe whose variants are ready"""
+    if not recipe.image or recipe.image_status != Recipe.IMAGE_READY:
+        return {}
+
+    return {
+        variant: default_storage.url(variant_name(recipe.image.name, variant))
+        for variant in get_config()['VARIANTS']
+    }
+
+
+def schedule(recipe, upload):
+    """Queue an uploaded image for storage and resizing
+
+    The recipe is pointed at the final image name and marked pending
+    straight away, the worker writes the original and its variants and
+    then marks it ready or failed. Returns a Future for the job.
+    """
+    name = recipe_image_file_path(recipe, upload.name)
+    upload.seek(0)
+    content = upload.read()
+
+    recipe.image.name = name
+    recipe.image_status = Recipe.IMAGE_PENDING
+    recipe.save(update_fields=['image', 'image_status', 'updated_at'])
+
+    args = (recipe.pk, recipe.user_id, name, content)
+    if get_config()['EAGER']:
+        future = Future()
+        future.set_result(process(*args))
+        return future
+
+    return get_executor().submit(_process_in_worker, *args)
+
+
+def process(recipe_id, user_id, name, content):
+    """Store an original image and its variants, then record the outcome"""
+    config = get_config()
+    image_format, _ = variant_format()
+    saved_name = name
+    status = Recipe.IMAGE_FAILED
+    try:
+        saved_name = default_storage.save(name, ContentFile(content))
+        with Image.open(io.BytesIO(content)) as image:
+            image = image.convert('RGB')
+            for variant, size in config['VARIANTS'].items():
+                resized = image.copy()
+                resized.thumbnail(size, Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(
+                    buffer,
+                    format=image_format,
+                    quality=config['QUALITY'],
+                    optimize=True
+                )
+                default_storage.save(
+                    variant_name(saved_name, variant),
+                    ContentFile(buffer.getvalue())
+                )
+        status = Recipe.IMAGE_READY
+    except Exception:
+        logger.exception('Processing image %s of recipe %s failed',
+                         name, recipe_id)
+
+    # Leave the recipe alone if another upload replaced this image
+    updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image=saved_name,
+        image_status=status,
+        updated_at=timezone.now()
+    )
+    if updated:
+        collection_changed(user_id)
+
+    return status
+
+
+def _process_in_worker(*args):
+    """Run process() in a pool thread, which owns its DB connections"""
+    try:
+        return process(*args)
+    finally:
+        connections.close_all()
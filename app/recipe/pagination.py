@@ -0,0 +1,205 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Paginate by seeking past the ordering key of the last row seen
+
+    The cursor is an opaque token holding the ordering values of the row
+    at the page boundary, so every page is a single indexed range query
+    of 'page_size + 1' rows no matter how deep the client pages.
+    The view's 'ordering' must end with a unique field.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('-id',)
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of results, or None if disabled"""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(view)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [_invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            position = self.coerce_position(queryset, self.position)
+            queryset = queryset.filter(self._seek(ordering, position))
+
+        # Fetch one extra row to find out if there is a following page
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client, within bounds"""
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+
+        return self.page_size
+
+    def get_ordering(self, view):
+        """Return the ordering declared on the view"""
+        ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        assert ordering[-1].lstrip('-') in ('id', 'pk'), (
+            'Keyset pagination needs an ordering ending in a unique field, '
+            'got %r' % (ordering,)
+        )
+
+        return tuple(ordering)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        row = self.page[-1] if self.page else None
+
+        return self.encode_cursor(row, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        row = self.page[0] if self.page else None
+
+        return self.encode_cursor(row, reverse=True)
+
+    def decode_cursor(self, request):
+        """Return the (position, reverse) pair held in the request cursor"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            cursor = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii'))
+            )
+            position = cursor['p']
+            reverse = bool(cursor['r'])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def coerce_position(self, queryset, position):
+        """Return the cursor position converted to the ordering's types
+
+        Raises NotFound for values the ordering fields can not hold,
+        which only a tampered cursor carries.
+        """
+        coerced = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            if name in queryset.query.annotations:
+                model_field = queryset.query.annotations[name].output_field
+            elif name == 'pk':
+                model_field = queryset.model._meta.pk
+            else:
+                model_field = queryset.model._meta.get_field(name)
+            try:
+                if value is None or isinstance(value, (list, dict)):
+                    raise ValueError(value)
+                coerced.append(model_field.to_python(value))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return coerced
+
+    def encode_cursor(self, row, reverse):
+        """Return the URL of the page either side of the given row"""
+        if row is None:
+            # An empty page keeps the position it was requested with
+            position = self.position
+        else:
+            # Rows are model instances or values() dicts
+            get = row.get if isinstance(row, dict) else row.__getattribute__
+            position = [get(field.lstrip('-')) for field in self.ordering]
+        if position is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            encode_position(position, reverse)
+        )
+
+    def _seek(self, ordering, position):
+        """Return a filter matching rows after position in ordering
+
+        For ordering (a, b, c) this expands the row comparison to
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z), with
+        '<' in place of '>' for descending fields.
+        """
+        condition = Q()
+        for index, field in enumerate(ordering):
+            clause = Q()
+            for previous, value in zip(ordering[:index], position):
+                clause &= Q(**{previous.lstrip('-'): value})
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clause &= Q(**{f'{field.lstrip("-")}__{lookup}': position[index]})
+            condition |= clause
+
+        return condition
+
+
+def encode_position(position, reverse=False):
+    """Return the opaque cursor token for an ordering position"""
+    data = json.dumps(
+        {'p': position, 'r': int(reverse)},
+        cls=DjangoJSONEncoder,
+        separators=(',', ':')
+    )
+
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+
+def _invert(field):
+    """Flip the direction of an ordering field"""
+    return field[1:] if field.startswith('-') else f'-{field}'
@@ -0,0 +1,97 @@
+from django.db.models import Prefetch
+
+from core.models import Tag, Ingredient
+
+
+RECIPE_LIST_FIELDS = ('id', 'title', 'ingredients', 'tags', 'time_minutes',
+                      'price', 'link', 'ingredient_count', 'tag_count')
+RECIPE_DETAIL_FIELDS = RECIPE_LIST_FIELDS + (
+    'image', 'image_status', 'image_variants'
+)
+RECIPE_IMAGE_FIELDS = ('id', 'user', 'image', 'image_status')
+
+# Serializer fields backed by M2M relations rather than columns
+RECIPE_RELATIONS = {
+    'ingredients': Ingredient,
+    'tags': Tag,
+}
+# Columns read by serializer fields not named after one
+RECIPE_FIELD_COLUMNS = {
+    'image_variants': ('image', 'image_status'),
+}
+
+
+def recipe_fields(queryset, fields, nested=()):
+    """Load only what serializing the given recipe fields needs
+
+    Columns outside fields are deferred and relations outside fields
+    are not prefetched at all, the others are ordered by id. Relations
+    in nested are serialized as objects, so their names are loaded
+    along with their ids.
+    """
+    columns = {'id'}
+    prefetches = []
+    for name in fields:
+        if name in RECIPE_RELATIONS:
+            related = ('id', 'name') if name in nested else ('id',)
+            prefetches.append(Prefetch(
+                name,
+                queryset=RECIPE_RELATIONS[name].objects.only(
+                    *related
+                ).order_by('id')
+            ))
+        else:
+            columns.update(RECIPE_FIELD_COLUMNS.get(name, (name,)))
+
+    return queryset.only(*columns).prefetch_related(*prefetches)
+
+
+def recipe_list(queryset, fields=None, expand=()):
+    """Load recipes with just the related ids the list serializer emits"""
+    return recipe_fields(
+        queryset,
+        fields or RECIPE_LIST_FIELDS,
+        expand or ()
+    )
+
+
+def recipe_detail(queryset, fields=None, expand=()):
+    """Load recipes with the related objects nested in the detail view"""
+    return recipe_fields(
+        queryset,
+        fields or RECIPE_DETAIL_FIELDS,
+        tuple(RECIPE_RELATIONS)
+    )
+
+
+def recipe_image(queryset, fields=None, expand=()):
+    """Load only the columns needed to replace a recipe image"""
+    return queryset.only(*RECIPE_IMAGE_FIELDS)
+
+
+def recipe_key(queryset, fields=None, expand=()):
+    """Load only the primary key of recipes looked up by it"""
+    return queryset.only('id')
+
+
+ACTION_QUERYSETS = {
+    'list': recipe_list,
+    'retrieve': recipe_detail,
+    'upload_image': recipe_image,
+    'similar': recipe_key,
+}
+
+
+def for_action(queryset, action, fields=None, expand=()):
+    """Return queryset shaped for the serializer used by action
+
+    Every related field is prefetched in one query so serializing N
+    recipes costs a constant number of queries. fields and expand are
+    the sparse fieldset picked by the client, if any. Actions without
+    an entry, like the writes, get the queryset unchanged.
+    """
+    build = ACTION_QUERYSETS.get(action)
+    if build is None:
+        return queryset
+
+    return build(queryset, fields, expand)
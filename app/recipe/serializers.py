@@ -1,7 +1,113 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 from core.models import Recipe, Tag, Ingredient
 
+from recipe import images
+from recipe.bulk import BulkListSerializer
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URLs of the resized variants of a recipe image"""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        urls = images.variant_urls(recipe)
+        request = self.context.get('request')
+        if request is not None:
+            urls = {
+                variant: request.build_absolute_uri(url)
+                for variant, url in urls.items()
+            }
+
+        return urls
+
+
+class UserManyRelatedField(serializers.ManyRelatedField):
+    """List of primary keys validated together in a single query"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        return self.child_relation.to_internal_values(data)
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key of an object owned by the requesting user
+
+    Keys of other users' objects are rejected the same way as keys of
+    objects that do not exist, so neither can be told apart. With
+    many=True every key submitted is checked by one 'id IN' query
+    rather than one query per key.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return UserManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        request = self.context.get('request')
+        if request is None:
+            return self.queryset.none()
+        return self.queryset.filter(user=request.user)
+
+    def to_internal_values(self, data):
+        """Return the objects of the keys in data, in the same order"""
+        queryset = self.get_queryset()
+        pk = queryset.model._meta.pk
+        keys = []
+        for value in data:
+            if self.pk_field is not None:
+                value = self.pk_field.to_internal_value(value)
+            try:
+                keys.append(pk.to_python(value))
+            except DjangoValidationError:
+                self.fail('incorrect_type', data_type=type(value).__name__)
+        if not keys:
+            return []
+
+        objects = queryset.in_bulk(set(keys))
+        for key in keys:
+            if key not in objects:
+                self.fail('does_not_exist', pk_value=key)
+
+        return [objects[key] for key in keys]
+
+
+class SparseFieldsMixin:
+    """Serializer emitting only the fields the request picked
+
+    The view passes 'fields', the names to keep, and 'expand', the
+    relations to nest as objects using 'expandable_fields', in the
+    serializer context.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in self.context.get('expand') or ():
+            if name in self.fields:
+                self.fields[name] = self.expandable_fields[name](
+                    many=True,
+                    read_only=True
+                )
+
 
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for Tag objects"""
@@ -10,6 +116,7 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -19,16 +126,37 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
+
+
+class TagUsageSerializer(TagSerializer):
+    """Serializer for tags annotated with the number of their recipes"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('recipe_count',)
+
+
+class IngredientUsageSerializer(IngredientSerializer):
+    """Serializer for ingredients annotated with the number of recipes"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ('recipe_count',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serialize a recipe"""
+    expandable_fields = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
 
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -36,21 +164,62 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes',
-                  'price', 'link'
+                  'price', 'link', 'ingredient_count', 'tag_count'
                   )
-        read_only_fields = ('id',)
+        read_only_fields = ('id', 'ingredient_count', 'tag_count')
+        list_serializer_class = BulkListSerializer
 
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    image_variants = ImageVariantsField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + (
+            'image', 'image_status', 'image_variants'
+        )
+        read_only_fields = ('id', 'image', 'image_status')
+
+
+class SimilarRecipeSerializer(RecipeSerializer):
+    """Serialize a recipe with its similarity to the one asked about"""
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('similarity',)
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status', 'image_variants')
+        read_only_fields = ('id', 'image_status')
+        extra_kwargs = {
+            'image': {'required': True, 'allow_null': False}
+        }
+
+
+class RecipeStatsItemSerializer(serializers.Serializer):
+    """A tag or ingredient with the number of recipes linked to it"""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    recipe_count = serializers.IntegerField()
+
+
+class RecipeStatsSerializer(serializers.Serializer):
+    """Aggregate figures of a user's recipes"""
+    recipe_count = serializers.IntegerField()
+    average_time_minutes = serializers.FloatField(allow_null=True)
+    total_price = serializers.DecimalField(max_digits=14, decimal_places=2)
+    median_price = serializers.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        allow_null=True
+    )
+    top_tags = RecipeStatsItemSerializer(many=True)
+    top_ingredients = RecipeStatsItemSerializer(many=True)
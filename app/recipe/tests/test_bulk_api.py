@@ -0,0 +1,161 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.tests.utils import sample_recipe
+
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class BulkApiTests(TestCase):
+    """Test creating and updating objects in batches"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        """Test creating a list of tags in one request"""
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [tag['name'] for tag in res.data],
+            ['Vegan', 'Dessert']
+        )
+        tags = Tag.objects.filter(user=self.user)
+        self.assertEqual(tags.count(), 2)
+        self.assertEqual(
+            {tag['id'] for tag in res.data},
+            set(tags.values_list('id', flat=True))
+        )
+
+    def test_bulk_create_ingredients(self):
+        """Test creating a list of ingredients in one request"""
+        payload = [{'name': 'Salt'}, {'name': 'Pepper'}]
+
+        res = self.client.post(INGREDIENTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """Test that invalid items are reported and nothing is created"""
+        payload = [{'name': 'Vegan'}, {'name': ''}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_create_requires_list(self):
+        """Test that a payload which is not a list is rejected"""
+        res = self.client.post(TAGS_BULK_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_recipes_with_relations(self):
+        """Test creating recipes with their tags and ingredients"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        payload = [
+            {
+                'title': 'Curry',
+                'tags': [tag.id],
+                'ingredients': [ingredient.id],
+                'time_minutes': 30,
+                'price': '10.00'
+            },
+            {
+                'title': 'Toast',
+                'tags': [],
+                'ingredients': [],
+                'time_minutes': 5,
+                'price': '1.50'
+            },
+        ]
+
+        # Validating the related ids, one INSERT for the recipes and one
+        # per M2M table plus updating and reading back the summaries, the
+        # version bump and the reindex in a savepoint, then reloading the
+        # recipes with their relations for the response
+        with self.assertNumQueries(14):
+            res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        curry = Recipe.objects.get(id=res.data[0]['id'])
+        self.assertEqual(list(curry.tags.all()), [tag])
+        self.assertEqual(list(curry.ingredients.all()), [ingredient])
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+        self.assertEqual(res.data[1]['tags'], [])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_partial_update_recipes(self):
+        """Test patching several recipes in one request"""
+        recipe1 = sample_recipe(self.user, title='Curry')
+        recipe2 = sample_recipe(self.user, title='Toast')
+        tag = Tag.objects.create(user=self.user, name='Quick')
+        recipe1.tags.add(Tag.objects.create(user=self.user, name='Slow'))
+        payload = [
+            {'id': recipe1.id, 'tags': [tag.id]},
+            {'id': recipe2.id, 'title': 'French Toast', 'time_minutes': 7},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.title, 'Curry')
+        self.assertEqual(list(recipe1.tags.all()), [tag])
+        self.assertEqual(recipe2.title, 'French Toast')
+        self.assertEqual(recipe2.time_minutes, 7)
+
+    def test_bulk_update_other_users_objects_rejected(self):
+        """Test that objects of another user cannot be updated"""
+        user2 = get_user_model().objects.create_user(
+            email='other@mail.com',
+            password='testpass',
+            name='Other Name'
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        other = Tag.objects.create(user=user2, name='Fruity')
+        payload = [
+            {'id': tag.id, 'name': 'Vegetarian'},
+            {'id': other.id, 'name': 'Mine now'},
+        ]
+
+        res = self.client.put(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        other.refresh_from_db()
+        self.assertEqual(other.name, 'Fruity')
+
+    def test_bulk_update_boolean_ids_rejected(self):
+        """Test that true and false are not taken for the ids 1 and 0"""
+        tag = Tag.objects.create(pk=1, user=self.user, name='Vegan')
+        payload = [{'id': True, 'name': 'Vegetarian'}]
+
+        res = self.client.put(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {'id': ['Object not found.']})
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
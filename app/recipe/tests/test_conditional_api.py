@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import CollectionVersion, Tag
+from core.tests.utils import sample_recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalRequestTests(TestCase):
+    """Test conditional GETs of recipes, tags and ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_sets_validators(self):
+        """Test list responses carry an ETag and Last-Modified"""
+        sample_recipe(self.user)
+        version = CollectionVersion.objects.for_user(self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertEqual(
+            res['Last-Modified'],
+            http_date(int(version.updated_at.timestamp()))
+        )
+        self.assertIn('Authorization', res['Vary'])
+
+    def test_matching_etag_not_modified(self):
+        """Test a matching If-None-Match skips the recipe queries"""
+        sample_recipe(self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertFalse(res.content)
+
+    def test_etag_changes_after_write(self):
+        """Test creating, updating or linking objects changes the ETag"""
+        recipe = sample_recipe(self.user)
+        etags = [self.client.get(RECIPES_URL)['ETag']]
+
+        recipe.title = 'Renamed'
+        recipe.save()
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+
+        self.assertEqual(len(set(etags)), 3)
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_other_users_writes_keep_etag(self):
+        """Test changes by another user do not invalidate the ETag"""
+        etag = self.client.get(TAGS_URL)['ETag']
+        other = get_user_model().objects.create_user(
+            'other@mail.com',
+            'testpass'
+        )
+        Tag.objects.create(user=other, name='Dessert')
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_depends_on_query(self):
+        """Test different query params get different ETags"""
+        first = self.client.get(RECIPES_URL)['ETag']
+        second = self.client.get(RECIPES_URL, {'tags': '1'})['ETag']
+
+        self.assertNotEqual(first, second)
+
+    def test_if_modified_since(self):
+        """Test an up to date If-Modified-Since gets a 304"""
+        recipe = sample_recipe(self.user)
+        last_modified = self.client.get(detail_url(recipe.id))[
+            'Last-Modified'
+        ]
+
+        res = self.client.get(
+            detail_url(recipe.id),
+            HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_recipe_has_no_etag(self):
+        """Test errors are not given validators"""
+        res = self.client.get(detail_url(1234))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(res.has_header('ETag'))
@@ -0,0 +1,123 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from core.tests.utils import sample_recipe
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class PublicExportApiTests(TestCase):
+    """Test unauthenticated recipe export access"""
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportApiTests(TestCase):
+    """Test the NDJSON recipe export"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@mail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def export(self, params=None):
+        """Return the response of an export and its decoded lines"""
+        res = self.client.get(EXPORT_URL, params)
+        content = b''.join(res.streaming_content)
+        return res, [json.loads(line) for line in content.splitlines()]
+
+    def test_export_recipes(self):
+        """Test every recipe is streamed with its tags and ingredients"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        pepper = Ingredient.objects.create(user=self.user, name='Pepper')
+        recipe1 = sample_recipe(self.user, title='Soup', price=5.5)
+        recipe1.tags.add(vegan)
+        recipe1.ingredients.add(pepper, salt)
+        recipe2 = sample_recipe(self.user, link='https://example.com')
+        other = get_user_model().objects.create_user('other@mail.com', 'pass')
+        sample_recipe(other)
+
+        res, lines = self.export()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertIn('attachment', res['Content-Disposition'])
+        self.assertEqual(lines, [
+            {
+                'id': recipe2.id,
+                'title': 'Sample recipe',
+                'time_minutes': 10,
+                'price': '5.00',
+                'link': 'https://example.com',
+                'ingredients': [],
+                'tags': [],
+            },
+            {
+                'id': recipe1.id,
+                'title': 'Soup',
+                'time_minutes': 10,
+                'price': '5.50',
+                'link': '',
+                'ingredients': [
+                    {'id': salt.id, 'name': 'Salt'},
+                    {'id': pepper.id, 'name': 'Pepper'},
+                ],
+                'tags': [{'id': vegan.id, 'name': 'Vegan'}],
+            },
+        ])
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_reads_in_chunks(self):
+        """Test relations are loaded with one query per chunk"""
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+        recipes = [sample_recipe(self.user, title=f'Cake {i}')
+                   for i in range(5)]
+        for recipe in recipes[::2]:
+            recipe.tags.add(tag)
+
+        # The recipe rows, then tags and ingredients for each of 3 chunks
+        with self.assertNumQueries(7):
+            res, lines = self.export()
+
+        self.assertEqual([line['id'] for line in lines],
+                         [recipe.id for recipe in reversed(recipes)])
+        self.assertEqual(
+            [line['tags'] for line in lines],
+            [[{'id': tag.id, 'name': 'Dessert'}], [],
+             [{'id': tag.id, 'name': 'Dessert'}], [],
+             [{'id': tag.id, 'name': 'Dessert'}]]
+        )
+
+    def test_export_filtered(self):
+        """Test the list filters narrow down the export"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+        sample_recipe(self.user)
+
+        res, lines = self.export({'tags': str(tag.id)})
+
+        self.assertEqual([line['id'] for line in lines], [recipe.id])
+
+    def test_export_empty(self):
+        """Test a user without recipes gets an empty body"""
+        res, lines = self.export()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(lines, [])
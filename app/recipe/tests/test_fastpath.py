@@ -0,0 +1,112 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import serializers as drf_serializers, status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe import fastpath, serializers
+from recipe.caching import response_cache
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class FastListTests(TestCase):
+    """Test the values() list path renders what the serializers do"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('Vegan', 'Dessert', 'Spicy')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ('Salt', 'Pepper')]
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Soup {i}',
+                time_minutes=i + 1,
+                price=i + 0.5,
+                link='https://example.com' if i % 2 else ''
+            )
+            # Linked out of id order on purpose
+            recipe.tags.add(*reversed(tags[:i % 3 + 1]))
+            recipe.ingredients.add(*ingredients[i % 2:])
+
+    def get_content(self, url, params, fast):
+        """Return the raw body of a GET with the fast path on or off"""
+        response_cache.clear()
+        with override_settings(RECIPE_FAST_LIST=fast):
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.content
+
+    def assertSameContent(self, url, params=None):
+        """Assert both paths render byte identical responses"""
+        self.assertEqual(
+            self.get_content(url, params, fast=True),
+            self.get_content(url, params, fast=False)
+        )
+
+    def test_recipes_identical(self):
+        """Test recipe lists match with and without the fast path"""
+        tag = Tag.objects.get(name='Dessert')
+        for params in ({}, {'page_size': 2}, {'fields': 'title,price'},
+                       {'tags': tag.id}, {'search': 'soup'}):
+            self.assertSameContent(RECIPES_URL, params)
+
+    def test_next_page_identical(self):
+        """Test the cursor links of both paths lead to the same pages"""
+        fast = self.client.get(RECIPES_URL, {'page_size': 2}).data['next']
+
+        self.assertSameContent(fast)
+
+    def test_tags_and_ingredients_identical(self):
+        """Test tag and ingredient lists match"""
+        self.assertSameContent(TAGS_URL)
+        self.assertSameContent(INGREDIENTS_URL)
+
+    def test_nested_serializers_not_supported(self):
+        """Test serializers nesting objects use the regular path"""
+        self.assertTrue(fastpath.supports(serializers.RecipeSerializer()))
+        self.assertFalse(
+            fastpath.supports(serializers.RecipeDetailSerializer())
+        )
+
+    def test_prices_formatted_as_the_serializer_does(self):
+        """Test prices read from rows keep the serializer's format"""
+        serializer = serializers.RecipeSerializer(
+            context={'fields': ('price',)}
+        )
+        prices = (Decimal('5.50'), Decimal('0.00'), Decimal('-1.25'),
+                  Decimal('999.99'))
+
+        data = fastpath.serialize(serializer, [{'price': price}
+                                               for price in prices])
+
+        field = serializer.fields['price']
+        self.assertEqual(data, [{'price': field.to_representation(price)}
+                                for price in prices])
+
+    def test_other_decimal_places_quantized(self):
+        """Test prices are rounded when the field has other places"""
+        class PriceSerializer(serializers.RecipeSerializer):
+            price = drf_serializers.DecimalField(max_digits=5,
+                                                 decimal_places=1)
+
+        serializer = PriceSerializer(context={'fields': ('price',)})
+        data = fastpath.serialize(serializer, [{'price': Decimal('5.50')}])
+
+        self.assertEqual(data, [{'price': '5.5'}])
@@ -1,13 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django.urls import reverse
 from django.test import TestCase
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Ingredient
+from core.models import Ingredient, Recipe
 
-from recipe.serializers import IngredientSerializer
+from recipe.serializers import IngredientUsageSerializer
 
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
@@ -45,11 +46,13 @@ class PrivateIngredientsApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL)
 
-        ingredients = Ingredient.objects.all().order_by('-name')
-        serializer = IngredientSerializer(ingredients, many=True)
+        ingredients = Ingredient.objects.annotate(
+            recipe_count=Count('recipe')
+        ).order_by('-name')
+        serializer = IngredientUsageSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test that the ingredients for the authenticated user are returned"""
@@ -64,8 +67,8 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_successful(self):
         """Test create a new ingredient"""
@@ -85,3 +88,21 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.post(INGREDIENTS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_ingredients_assigned_only(self):
+        """Test filtering ingredients by those assigned to recipes"""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        Ingredient.objects.create(user=self.user, name='Kale')
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Eggs on toast',
+            time_minutes=5,
+            price=1.00
+        )
+        recipe.ingredients.add(salt)
+
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.data['results'], [
+            {'id': salt.id, 'name': 'Salt', 'recipe_count': 1}
+        ])
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+from recipe.pagination import encode_position
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class KeysetPaginationTests(TestCase):
+    """Test paging through list endpoints with an opaque cursor"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+
+    def collect_pages(self, url, params):
+        """Follow 'next' links and return every page of results"""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+            if not res.data['next']:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_tags_paged_in_name_order_with_ties(self):
+        """Test paging tags by name, using the id to break ties"""
+        for name in ['Apple', 'Dessert', 'Dessert', 'Dessert', 'Vegan']:
+            Tag.objects.create(user=self.user, name=name)
+
+        pages = self.collect_pages(TAGS_URL, {'page_size': 2})
+
+        expected = list(
+            Tag.objects.order_by('-name', 'id').values_list('id', flat=True)
+        )
+        ids = [tag['id'] for page in pages for tag in page]
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(ids, expected)
+
+    def test_recipes_paged_newest_first(self):
+        """Test paging recipes with the newest first"""
+        for i in range(5):
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=5.00
+            )
+
+        pages = self.collect_pages(RECIPES_URL, {'page_size': 3})
+
+        expected = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)
+        )
+        ids = [recipe['id'] for page in pages for recipe in page]
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_prior_page(self):
+        """Test that following 'previous' returns the page before"""
+        for name in ['A', 'B', 'C', 'D']:
+            Tag.objects.create(user=self.user, name=name)
+
+        first = self.client.get(TAGS_URL, {'page_size': 2})
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        self.assertIsNone(second.data['next'])
+        res = self.client.get(second.data['previous'])
+
+        self.assertEqual(res.data['results'], first.data['results'])
+        self.assertIsNone(res.data['previous'])
+        self.assertIsNotNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor returns 404"""
+        res = self.client.get(TAGS_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_invalid_values(self):
+        """Test a well formed cursor holding bad values returns 404"""
+        Recipe.objects.create(user=self.user, title='Soup',
+                              time_minutes=5, price=1.00)
+
+        for position in (['abc'], [[1]], [None], [{'id': 1}]):
+            res = self.client.get(
+                RECIPES_URL,
+                {'cursor': encode_position(position)}
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = self.client.get(
+            TAGS_URL,
+            {'cursor': encode_position(['Vegan', 'abc'])}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -5,14 +5,20 @@ import os
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from core.querycheck import QueryCheckMixin
+from core.tests.utils import sample_recipe
 
+from recipe import images
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPES_URL = reverse('recipe:recipe-list')
@@ -38,19 +44,7 @@ def sample_ingredient(user, name='Cinnamon'):
     return Ingredient.objects.create(user=user, name=name)
 
 
-def sample_recipe(user, **params):
-    """create and return a sample recipe"""
-    defaults = {
-        'title': 'Sample recipe',
-        'time_minutes': 10,
-        'price': 5.00
-    }
-    defaults.update(params)
-
-    return Recipe.objects.create(user=user, **defaults)
-
-
-class PublicRecipeApiTest(TestCase):
+class PublicRecipeApiTest(QueryCheckMixin, TestCase):
     """Test unauthenticated recipe api access"""
 
     def setUp(self):
@@ -63,7 +57,7 @@ class PublicRecipeApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateRecipeApiTests(TestCase):
+class PrivateRecipeApiTests(QueryCheckMixin, TestCase):
     """Test authenticated recipe api access"""
 
     def setUp(self):
@@ -85,7 +79,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_limited_to_user(self):
         """Test retrieving recipes for user"""
@@ -102,8 +96,8 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -184,6 +178,64 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ing1, ingredients)
         self.assertIn(ing2, ingredients)
 
+    def test_create_recipe_ingredients_validated_in_one_query(self):
+        """Test the ingredient ids are all checked by a single query"""
+        ingredients = [sample_ingredient(user=self.user, name=f'Spice {i}')
+                       for i in range(20)]
+        payload = {
+            'title': 'Curry',
+            'ingredients': [ingredient.id for ingredient in ingredients],
+            'time_minutes': 30,
+            'price': 25.00
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        lookups = [query['sql'] for query in queries
+                   if query['sql'].startswith('SELECT') and
+                   'FROM "core_ingredient" WHERE' in query['sql']]
+        self.assertEqual(len(lookups), 1)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.ingredients.count(), 20)
+
+    def test_create_recipe_with_other_users_tag_rejected(self):
+        """Test tags of another user cannot be linked to a recipe"""
+        user2 = get_user_model().objects.create_user(
+            'other@mail.com',
+            'testpass'
+        )
+        tag = sample_tag(user=self.user, name='Vegan')
+        foreign_tag = sample_tag(user=user2, name='Dessert')
+        payload = {
+            'title': 'Lime Cheesecake',
+            'tags': [tag.id, foreign_tag.id],
+            'time_minutes': 60,
+            'price': 20.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(foreign_tag.id), res.data['tags'][0])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_update_recipe_with_other_users_ingredient_rejected(self):
+        """Test ingredients of another user cannot be set on a recipe"""
+        user2 = get_user_model().objects.create_user(
+            'other@mail.com',
+            'testpass'
+        )
+        recipe = sample_recipe(user=self.user)
+        foreign = sample_ingredient(user=user2, name='Saffron')
+
+        res = self.client.patch(detail_url(recipe.id),
+                                {'ingredients': [foreign.id]})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(recipe.ingredients.count(), 0)
+
     def test_partial_update_recipe(self):
         """Test updating a recipe with PATCH"""
         recipe = sample_recipe(user=self.user)
@@ -228,7 +280,8 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(len(tags), 0)
 
 
-class RecipeImageUploadTests(TestCase):
+@override_settings(RECIPE_IMAGE_PIPELINE={'EAGER': True})
+class RecipeImageUploadTests(QueryCheckMixin, TestCase):
 
     def setUp(self):
         self.client = APIClient()
@@ -242,6 +295,12 @@ class RecipeImageUploadTests(TestCase):
 
     def tearDown(self):
         # This removes any images that may have been left during testing
+        self.recipe.refresh_from_db()
+        if self.recipe.image:
+            for variant in images.get_config()['VARIANTS']:
+                default_storage.delete(
+                    images.variant_name(self.recipe.image.name, variant)
+                )
         self.recipe.image.delete()
 
     def test_uploading_image_to_recipe(self):
@@ -255,9 +314,33 @@ class RecipeImageUploadTests(TestCase):
             res = self.client.post(url, {'image': ntf}, format='multipart')
 
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+
+    def test_uploading_image_creates_variants(self):
+        """Test that resized variants are generated for an upload"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpeg') as ntf:
+            img = Image.new('RGB', (1200, 800))
+            img.save(ntf, format='JPEG')
+            ntf.seek(0)
+            self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        name = images.variant_name(self.recipe.image.name, 'thumbnail')
+        with default_storage.open(name) as variant:
+            self.assertEqual(Image.open(variant).size, (150, 100))
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        self.assertEqual(
+            set(res.data['image_variants']), {'thumbnail', 'medium'}
+        )
+        self.assertTrue(
+            res.data['image_variants']['thumbnail'].endswith(name)
+        )
 
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
@@ -286,30 +369,102 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
-
-        def test_filter_recipes_by_tag(self):
-            """Test returning recipes with specific tags"""
-            recipe1 = sample_recipe(user=self.user, title='Bunny Chow')
-            recipe2 = sample_recipe(user=self.user, title='Mgwenya')
-            ingredient1 = sample_ingredient(user=self.user, name='Dessert')
-            ingredient2 = sample_ingredient(user=self.user, name='Starter')
-            recipe1.ingredients.add(ingredient1)
-            recipe2.ingredients.add(ingredient2)
-            recipe3 = sample_recipe(user=self.user, title='Nandos')
-
-            res = self.client.get(
-                RECIPES_URL,
-                # When filtering attributes, use a comma-separated list of IDs
-                {'ingredients': f'{ingredient1.id}, {ingredient2.id}'}
-            )
-
-            serializer1 = RecipeSerializer(recipe1)
-            serializer2 = RecipeSerializer(recipe2)
-            serializer3 = RecipeSerializer(recipe3)
-
-            self.assertIn(serializer1.data, res.data)
-            self.assertIn(serializer2.data, res.data)
-            self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipes_by_ingredient(self):
+        """Test returning recipes with specific ingredients"""
+        recipe1 = sample_recipe(user=self.user, title='Bunny Chow')
+        recipe2 = sample_recipe(user=self.user, title='Mgwenya')
+        ingredient1 = sample_ingredient(user=self.user, name='Dessert')
+        ingredient2 = sample_ingredient(user=self.user, name='Starter')
+        recipe1.ingredients.add(ingredient1)
+        recipe2.ingredients.add(ingredient2)
+        recipe3 = sample_recipe(user=self.user, title='Nandos')
+
+        res = self.client.get(
+            RECIPES_URL,
+            # When filtering attributes, use a comma-separated list of IDs
+            {'ingredients': f'{ingredient1.id}, {ingredient2.id}'}
+        )
+
+        serializer1 = RecipeSerializer(recipe1)
+        serializer2 = RecipeSerializer(recipe2)
+        serializer3 = RecipeSerializer(recipe3)
+
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+
+class RecipeFilterTests(QueryCheckMixin, TestCase):
+    """Test filtering recipes by tags and ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(user=self.user, name='Vegan')
+        self.quick = sample_tag(user=self.user, name='Quick')
+
+    def filtered_ids(self, params):
+        """Return the ids of the recipes listed with params"""
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_recipe_matching_several_tags_returned_once(self):
+        """Test a recipe with several of the tags is not duplicated"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(self.vegan, self.quick)
+
+        ids = self.filtered_ids({'tags': f'{self.vegan.id},{self.quick.id}'})
+
+        self.assertEqual(ids, [recipe.id])
+
+    def test_filter_match_all_tags(self):
+        """Test 'match=all' only returns recipes with every tag"""
+        both = sample_recipe(user=self.user, title='Both')
+        both.tags.add(self.vegan, self.quick)
+        one = sample_recipe(user=self.user, title='One')
+        one.tags.add(self.vegan)
+
+        ids = self.filtered_ids({
+            'tags': f'{self.vegan.id},{self.quick.id},{self.vegan.id}',
+            'match': 'all',
+        })
+        any_ids = self.filtered_ids({
+            'tags': f'{self.vegan.id},{self.quick.id}',
+            'match': 'any',
+        })
+
+        self.assertEqual(ids, [both.id])
+        self.assertEqual(any_ids, [one.id, both.id])
+
+    def test_filter_tags_and_ingredients_combined(self):
+        """Test tag and ingredient filters must both match"""
+        salt = sample_ingredient(user=self.user, name='Salt')
+        match = sample_recipe(user=self.user, title='Match')
+        match.tags.add(self.vegan)
+        match.ingredients.add(salt)
+        sample_recipe(user=self.user, title='Tag only').tags.add(self.vegan)
+
+        ids = self.filtered_ids({
+            'tags': str(self.vegan.id),
+            'ingredients': str(salt.id),
+        })
+
+        self.assertEqual(ids, [match.id])
+
+    def test_invalid_filter_params(self):
+        """Test malformed ids and match modes return 400"""
+        for params in ({'tags': '1,two'}, {'ingredients': 'x'},
+                       {'tags': '1', 'match': 'some'}):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
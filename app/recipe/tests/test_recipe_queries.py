@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from core.tests.utils import sample_recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def linked_recipe(user, title='Sample recipe'):
+    """Create and return a recipe with a tag and an ingredient of its own"""
+    return sample_recipe(
+        user,
+        tags=[Tag.objects.create(user=user, name=f'{title} tag')],
+        ingredients=[
+            Ingredient.objects.create(user=user, name=f'{title} ingredient')
+        ],
+        title=title
+    )
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test that recipe endpoints cost a constant number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+
+    def assertConstantQueries(self, url, num, grow):
+        """Assert url costs num queries both before and after grow()
+
+        Fails when the count scales with the number of rows returned,
+        which is how an N+1 query shows up.
+        """
+        with CaptureQueriesContext(connection) as before:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        grow()
+        with CaptureQueriesContext(connection) as after:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        counts = (len(before), len(after))
+        self.assertEqual(
+            counts, (num, num),
+            'Expected %d queries per request, got %r:\n%s' % (
+                num, counts,
+                '\n'.join(query['sql'] for query in after.captured_queries)
+            )
+        )
+
+    @override_settings(RECIPE_FAST_LIST=False)
+    def test_list_recipes_constant_queries(self):
+        """Test listing recipes does not query once per recipe"""
+        linked_recipe(self.user)
+
+        def grow():
+            for i in range(10):
+                linked_recipe(self.user, title=f'Recipe {i}')
+
+        # One query for the collection version, one for the recipes and
+        # one for each related field
+        self.assertConstantQueries(RECIPES_URL, 4, grow)
+
+    def test_fast_list_recipes_constant_queries(self):
+        """Test the fast list path reads the related ids in one query"""
+        linked_recipe(self.user)
+
+        def grow():
+            for i in range(10):
+                linked_recipe(self.user, title=f'Recipe {i}')
+
+        # One query for the collection version and one for the recipes
+        # with their related ids read from their summary columns
+        self.assertConstantQueries(RECIPES_URL, 2, grow)
+
+    def test_retrieve_recipe_constant_queries(self):
+        """Test the recipe detail does not query once per related object"""
+        recipe = linked_recipe(self.user)
+
+        def grow():
+            for i in range(10):
+                recipe.tags.add(Tag.objects.create(user=self.user, name=i))
+                recipe.ingredients.add(
+                    Ingredient.objects.create(user=self.user, name=i)
+                )
+
+        self.assertConstantQueries(detail_url(recipe.id), 4, grow)
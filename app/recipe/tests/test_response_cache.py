@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from core.tests.utils import sample_recipe
+
+from recipe.caching import (
+    CachedResponse,
+    SharedResponseCache,
+    response_cache,
+)
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class ResponseCacheApiTests(TestCase):
+    """Test list responses are served from the response cache"""
+
+    def setUp(self):
+        response_cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test a repeated list only queries the collection version"""
+        sample_recipe(self.user)
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+        self.assertEqual(response_cache.stats()['hits'], 1)
+
+    def test_equivalent_filters_share_entry(self):
+        """Test filters listing the same IDs in any order share an entry"""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        with self.assertNumQueries(1):
+            self.client.get(RECIPES_URL, {'tags': f'{tag2.id}, {tag1.id}'})
+
+    @override_settings(ALLOWED_HOSTS=['internal.local', 'api.example.com'])
+    def test_hosts_do_not_share_entry(self):
+        """Test pagination links follow the host and scheme of a request"""
+        sample_recipe(self.user, title='Curry')
+        sample_recipe(self.user, title='Stew')
+        self.client.get(RECIPES_URL, {'page_size': 1},
+                        HTTP_HOST='internal.local')
+
+        res = self.client.get(RECIPES_URL, {'page_size': 1},
+                              HTTP_HOST='api.example.com')
+        secure = self.client.get(RECIPES_URL, {'page_size': 1},
+                                 HTTP_HOST='api.example.com', secure=True)
+
+        self.assertTrue(
+            res.data['next'].startswith('http://api.example.com/')
+        )
+        self.assertTrue(
+            secure.data['next'].startswith('https://api.example.com/')
+        )
+        self.assertEqual(response_cache.stats()['hits'], 0)
+
+    def test_write_invalidates_users_entries(self):
+        """Test creating a recipe drops only that user's responses"""
+        other = get_user_model().objects.create_user(
+            'other@mail.com',
+            'testpass'
+        )
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+        self.client.get(TAGS_URL)
+        self.client.get(RECIPES_URL)
+        other_client.get(RECIPES_URL)
+        self.assertEqual(response_cache.stats()['size'], 3)
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response_cache.stats()['size'], 1)
+
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegan')
+
+    def test_changes_outside_views_not_served(self):
+        """Test a stale response is not served after a direct write"""
+        self.client.get(TAGS_URL)
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_errors_not_cached(self):
+        """Test invalid requests are not stored"""
+        self.client.get(RECIPES_URL, {'tags': 'abc'})
+
+        self.assertEqual(response_cache.stats()['size'], 0)
+
+
+@override_settings(CACHES={
+    'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+})
+class SharedResponseCacheTests(TestCase):
+    """Test the shared response cache backend"""
+
+    def setUp(self):
+        caches['responses'].clear()
+        self.backend = SharedResponseCache('responses')
+
+    def test_get_and_invalidate(self):
+        """Test entries are readable until their user is invalidated"""
+        self.backend.set(1, 'key', CachedResponse(b'[]', 'text/plain'))
+        self.backend.set(2, 'key', CachedResponse(b'{}', 'text/plain'))
+
+        self.assertEqual(self.backend.get(1, 'key').content, b'[]')
+        self.backend.invalidate(1)
+        self.assertIsNone(self.backend.get(1, 'key'))
+        self.assertEqual(self.backend.get(2, 'key').content, b'{}')
+
+        stats = self.backend.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertEqual(stats['bytes_written'], 4)
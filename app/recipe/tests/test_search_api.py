@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from core.tests.utils import sample_recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class RecipeSearchTests(TestCase):
+    """Test full text search of recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        """Return the titles of the recipes found for text"""
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_title(self):
+        """Test recipes are found by stemmed words of their title"""
+        sample_recipe(self.user, title='Roasted vegetables')
+        sample_recipe(self.user, title='Fish pie')
+
+        self.assertEqual(self.search('vegetable roast'),
+                         ['Roasted vegetables'])
+
+    def test_search_tags_and_ingredients(self):
+        """Test recipes are found by the names of their relations"""
+        curry = sample_recipe(self.user, title='Curry')
+        curry.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+        stew = sample_recipe(self.user, title='Stew')
+        stew.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Lentils')
+        )
+
+        self.assertEqual(self.search('spicy'), ['Curry'])
+        self.assertEqual(self.search('lentil'), ['Stew'])
+
+    def test_search_ranks_title_first(self):
+        """Test a title match ranks above an ingredient match"""
+        sample_recipe(self.user, title='Tomato soup')
+        salad = sample_recipe(self.user, title='Green salad')
+        salad.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Tomato')
+        )
+
+        self.assertEqual(self.search('tomato'), ['Tomato soup', 'Green salad'])
+
+    def test_search_follows_renames_and_deletes(self):
+        """Test the index is updated when names and links change"""
+        recipe = sample_recipe(self.user, title='Porridge')
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+
+        tag.name = 'Brunch'
+        tag.save()
+        self.assertEqual(self.search('breakfast'), [])
+        self.assertEqual(self.search('brunch'), ['Porridge'])
+
+        tag.delete()
+        self.assertEqual(self.search('brunch'), [])
+
+        recipe.title = 'Oatmeal'
+        recipe.save()
+        self.assertEqual(self.search('oatmeal'), ['Oatmeal'])
+
+    def test_search_reverse_links(self):
+        """Test linking from the tag side updates the index"""
+        recipe = sample_recipe(self.user, title='Pancakes')
+        tag = Tag.objects.create(user=self.user, name='Sweet')
+
+        tag.recipe_set.add(recipe)
+        self.assertEqual(self.search('sweet'), ['Pancakes'])
+
+        tag.recipe_set.clear()
+        self.assertEqual(self.search('sweet'), [])
+
+    def test_search_bulk_created_recipes(self):
+        """Test recipes created in bulk are indexed"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [
+            {'title': 'Tofu bowl', 'tags': [tag.id], 'ingredients': [],
+             'time_minutes': 10, 'price': '5.00'},
+            {'title': 'Bean chili', 'tags': [], 'ingredients': [],
+             'time_minutes': 10, 'price': '5.00'},
+        ]
+        self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(self.search('vegan'), ['Tofu bowl'])
+        self.assertEqual(self.search('chili'), ['Bean chili'])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are not searched"""
+        other = get_user_model().objects.create_user(
+            'other@mail.com',
+            'testpass'
+        )
+        sample_recipe(other, title='Lasagne')
+
+        self.assertEqual(self.search('lasagne'), [])
+
+    def test_search_paginates_by_rank(self):
+        """Test the search results can be paged through"""
+        for i in range(3):
+            sample_recipe(self.user, title=f'Bread {i}')
+        sample_recipe(self.user, title='Bread bread')
+
+        res = self.client.get(RECIPES_URL, {'search': 'bread',
+                                            'page_size': 2})
+        titles = [recipe['title'] for recipe in res.data['results']]
+        res = self.client.get(res.data['next'])
+        titles += [recipe['title'] for recipe in res.data['results']]
+
+        self.assertEqual(titles, ['Bread bread', 'Bread 2', 'Bread 1',
+                                  'Bread 0'])
+        self.assertIsNone(res.data['next'])
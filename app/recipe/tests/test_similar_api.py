@@ -0,0 +1,169 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import similarity
+from core.models import CollectionVersion, Recipe, Tag, Ingredient
+from core.tests.utils import sample_recipe
+
+
+def similar_url(recipe_id):
+    """Return the URL of the recipes similar to a recipe"""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SimilarRecipesSetUpMixin:
+
+    def setUp(self):
+        similarity.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+        self.curry = sample_recipe(
+            self.user,
+            [self.vegan, self.spicy],
+            [self.rice, self.tofu],
+            title='Curry'
+        )
+
+    def get_titles(self, recipe, **params):
+        """Return the titles of the recipes similar to recipe"""
+        res = self.client.get(similar_url(recipe.id), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['title'] for item in res.data]
+
+
+class SimilarRecipesApiTests(SimilarRecipesSetUpMixin, TestCase):
+    """Test listing the recipes most like a recipe"""
+
+    def test_similar_ranked(self):
+        """Test recipes are ranked by the tags and ingredients they share"""
+        sample_recipe(self.user, [self.vegan, self.spicy], [self.rice],
+                      title='Stir fry')
+        sample_recipe(self.user, [self.vegan], [], title='Salad')
+        sample_recipe(self.user, [], [], title='Toast')
+        other = get_user_model().objects.create_user(
+            'other@mail.com',
+            'testpass'
+        )
+        sample_recipe(other, title='Copy')
+
+        res = self.client.get(similar_url(self.curry.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['title'] for item in res.data],
+                         ['Stir fry', 'Salad'])
+        self.assertEqual(res.data[0]['similarity'], 0.75)
+        self.assertEqual(res.data[1]['similarity'], 0.25)
+        self.assertEqual(res.data[1]['tags'], [self.vegan.id])
+        self.assertEqual(
+            self.get_titles(self.curry, metric='cosine', limit=1),
+            ['Stir fry']
+        )
+
+    def test_similar_without_links(self):
+        """Test a recipe without tags or ingredients has no similar ones"""
+        toast = sample_recipe(self.user, title='Toast')
+
+        self.assertEqual(self.get_titles(toast), [])
+
+    def test_similar_other_users_recipe(self):
+        """Test asking about another user's recipe is not found"""
+        other = get_user_model().objects.create_user(
+            'other@mail.com',
+            'testpass'
+        )
+        recipe = sample_recipe(other, title='Copy')
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_similar_invalid_params(self):
+        """Test unknown metrics and out of range limits are rejected"""
+        res = self.client.get(similar_url(self.curry.id), {'metric': 'l2'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('metric', res.data)
+
+        res = self.client.get(similar_url(self.curry.id), {'limit': 1000})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('limit', res.data)
+
+    def test_similar_served_from_index(self):
+        """Test a repeated request reads no recipe rows to rank them"""
+        for i in range(5):
+            sample_recipe(self.user, [self.vegan], [], title=f'Salad {i}')
+        self.client.get(similar_url(self.curry.id))
+
+        # The version, the recipe, and the ranked recipes with their
+        # tags and ingredients
+        with self.assertNumQueries(5):
+            self.client.get(similar_url(self.curry.id))
+
+
+class SimilarRecipesIndexTests(SimilarRecipesSetUpMixin,
+                               TransactionTestCase):
+    """Test the cached index follows committed changes"""
+
+    def test_index_caught_up_with_writes(self):
+        """Test writes of this process update the cached index in place"""
+        stew = sample_recipe(self.user, [], [self.rice], title='Stew')
+        salad = sample_recipe(self.user, [], [], title='Salad')
+        self.assertEqual(self.get_titles(self.curry), ['Stew'])
+        index = similarity.index_cache.get(self.user.id)
+
+        self.client.patch(detail_url(salad.id), {
+            'tags': [self.vegan.id, self.spicy.id]
+        })
+        self.assertEqual(self.get_titles(self.curry), ['Salad', 'Stew'])
+
+        self.spicy.delete()
+        self.client.delete(detail_url(stew.id))
+        self.assertEqual(self.get_titles(self.curry), ['Salad'])
+
+        self.rice.recipe_set.add(salad)
+        self.assertEqual(self.get_titles(self.curry), ['Salad'])
+        self.assertEqual(
+            self.client.get(similar_url(self.curry.id)).data[0]['similarity'],
+            round(2 / 3, 4)
+        )
+        self.assertIs(similarity.index_cache.get(self.user.id), index)
+
+    def test_index_rebuilt_after_other_writers(self):
+        """Test a bump this process did not make rebuilds the index"""
+        salad = sample_recipe(self.user, [self.vegan], [], title='Salad')
+        self.get_titles(self.curry)
+        index = similarity.index_cache.get(self.user.id)
+
+        # As another process linking a recipe would
+        Recipe.tags.through.objects.create(recipe=salad, tag=self.spicy)
+        Recipe.objects.filter(pk=salad.pk).update(tag_ids=sorted([
+            self.vegan.id, self.spicy.id
+        ]), tag_count=2)
+        CollectionVersion.objects.filter(user=self.user).update(
+            version=F('version') + 1
+        )
+
+        res = self.client.get(similar_url(self.curry.id))
+
+        self.assertEqual(res.data[0]['similarity'], 0.5)
+        self.assertIsNot(similarity.index_cache.get(self.user.id), index)
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from core.tests.utils import sample_recipe
+
+from recipe.caching import response_cache
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsTests(TestCase):
+    """Test picking recipe fields with ?fields= and ?expand="""
+
+    def setUp(self):
+        response_cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(
+            self.user,
+            tags=[Tag.objects.create(user=self.user, name='Vegan')],
+            ingredients=[
+                Ingredient.objects.create(user=self.user, name='Salt')
+            ]
+        )
+
+    def test_list_fields(self):
+        """Test only the picked fields are serialized and loaded"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'title': 'Sample recipe'}]
+        )
+        # The collection version and the recipes, no relations
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"price"', queries[1]['sql'])
+
+    def test_list_expand(self):
+        """Test expanded relations are nested as objects"""
+        res = self.client.get(RECIPES_URL, {
+            'fields': 'title,tags',
+            'expand': 'tags',
+        })
+
+        tag = self.recipe.tags.get()
+        self.assertEqual(res.data['results'], [{
+            'title': 'Sample recipe',
+            'tags': [{'id': tag.id, 'name': 'Vegan'}],
+        }])
+
+    def test_detail_fields(self):
+        """Test the detail view can be narrowed too"""
+        res = self.client.get(detail_url(self.recipe.id),
+                              {'fields': 'title,image_variants'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {'title': 'Sample recipe', 'image_variants': {}}
+        )
+
+    def test_unknown_field_rejected(self):
+        """Test unknown names are reported"""
+        res = self.client.get(RECIPES_URL, {'fields': 'title,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('secret', res.data['fields'][0])
+
+    def test_unknown_expand_rejected(self):
+        """Test only relations can be expanded"""
+        res = self.client.get(RECIPES_URL, {'expand': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fields_ignored_by_writes(self):
+        """Test creating a recipe still returns every field"""
+        payload = {
+            'title': 'Toast',
+            'tags': [],
+            'ingredients': [],
+            'time_minutes': 5,
+            'price': '1.00',
+        }
+
+        res = self.client.post(f'{RECIPES_URL}?fields=id', payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('title', res.data)
@@ -0,0 +1,185 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import rollups
+from core.models import Recipe, RecipeStats, Tag, Ingredient
+from core.tests.utils import sample_recipe
+
+STATS_URL = reverse('recipe:recipe-stats')
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeStatsApiTests(TestCase):
+    """Test the aggregate stats of a user's recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_stats(self):
+        """Test the figures of the user's recipes are computed"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        curry = sample_recipe(self.user, time_minutes=30, price=10.50)
+        curry.tags.add(vegan, quick)
+        curry.ingredients.add(salt)
+        sample_recipe(self.user, time_minutes=10, price=5.00).tags.add(vegan)
+        sample_recipe(self.user, time_minutes=20, price=2.00)
+        other = get_user_model().objects.create_user(
+            'other@mail.com',
+            'testpass'
+        )
+        sample_recipe(other, price=100)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 3)
+        self.assertEqual(res.data['average_time_minutes'], 20.0)
+        self.assertEqual(res.data['total_price'], '17.50')
+        self.assertEqual(res.data['median_price'], '5.00')
+        self.assertEqual(
+            [(tag['name'], tag['recipe_count'])
+             for tag in res.data['top_tags']],
+            [('Vegan', 2), ('Quick', 1)]
+        )
+        self.assertEqual(res.data['top_ingredients'], [
+            {'id': salt.id, 'name': 'Salt', 'recipe_count': 1}
+        ])
+
+    def test_stats_empty(self):
+        """Test a user without recipes gets empty stats"""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 0)
+        self.assertIsNone(res.data['average_time_minutes'])
+        self.assertEqual(res.data['total_price'], '0.00')
+        self.assertIsNone(res.data['median_price'])
+        self.assertEqual(res.data['top_tags'], [])
+
+    def test_stats_filtered(self):
+        """Test the stats cover the recipes matching the list filters"""
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+        sample_recipe(self.user, price=5.00).tags.add(tag)
+        sample_recipe(self.user, price=10.50).tags.add(tag)
+        sample_recipe(self.user, price=1.00)
+
+        res = self.client.get(STATS_URL, {'tags': f'{tag.id}'})
+
+        self.assertEqual(res.data['recipe_count'], 2)
+        self.assertEqual(res.data['median_price'], '7.75')
+
+
+@override_settings(RECIPE_STATS={'ROLLUP': True})
+class RecipeStatsRollupTests(TestCase):
+    """Test the per user rollup behind unfiltered stats"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Salt'
+        )
+        recipe = sample_recipe(self.user, price=3.00)
+        recipe.tags.add(self.tag)
+
+    def assertRollupCurrent(self):
+        """Assert the rollup holds what aggregating the recipes gives"""
+        self.assertEqual(
+            RecipeStats.objects.values(
+                *rollups.TOTALS, *rollups.COUNTS
+            ).get(user=self.user),
+            rollups.collect(Recipe.objects.filter(user=self.user))
+        )
+
+    def test_rollup_collected_on_first_read(self):
+        """Test the first stats request stores the user's rollup"""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 1)
+        self.assertRollupCurrent()
+
+    def test_rollup_follows_writes(self):
+        """Test every kind of recipe write keeps the rollup current"""
+        self.client.get(STATS_URL)
+
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '10.50',
+            'tags': [self.tag.id],
+            'ingredients': [self.ingredient.id],
+        })
+        curry = res.data['id']
+        self.assertRollupCurrent()
+
+        self.client.patch(detail_url(curry), {'price': '4.00', 'tags': []})
+        self.assertRollupCurrent()
+
+        self.client.post(RECIPES_BULK_URL, [
+            {'title': 'Toast', 'time_minutes': 5, 'price': '1.50',
+             'tags': [self.tag.id], 'ingredients': []},
+            {'title': 'Stew', 'time_minutes': 90, 'price': '8.00',
+             'tags': [], 'ingredients': [self.ingredient.id]},
+        ], format='json')
+        self.assertRollupCurrent()
+
+        self.client.patch(RECIPES_BULK_URL, [
+            {'id': curry, 'time_minutes': 45},
+        ], format='json')
+        self.assertRollupCurrent()
+
+        spicy = Tag.objects.create(user=self.user, name='Spicy')
+        spicy.recipe_set.add(*Recipe.objects.filter(user=self.user))
+        self.assertRollupCurrent()
+
+        self.tag.delete()
+        self.assertRollupCurrent()
+
+        self.client.delete(detail_url(curry))
+        self.assertRollupCurrent()
+
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data['recipe_count'], 3)
+        self.assertEqual(res.data['top_tags'][0]['name'], 'Spicy')
+
+    def test_stats_read_from_rollup(self):
+        """Test unfiltered stats cost the same for any number of recipes"""
+        Recipe.objects.get(user=self.user).ingredients.add(self.ingredient)
+        self.client.get(STATS_URL)
+        # The version, the rollup and the names of the top tags and
+        # ingredients
+        with self.assertNumQueries(4):
+            self.client.get(STATS_URL)
+
+        for i in range(5):
+            sample_recipe(self.user, title=f'Recipe {i}').tags.add(self.tag)
+
+        with self.assertNumQueries(4):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 6)
+        self.assertRollupCurrent()
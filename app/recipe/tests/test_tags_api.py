@@ -1,13 +1,17 @@
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
+from django.db.models import Count
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Tag
+from core.tests.utils import sample_recipe
 
-from recipe.serializers import TagSerializer
+from recipe.serializers import TagUsageSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
 
@@ -36,17 +40,20 @@ class PrivateTagsApiTests(TestCase):
         self.client = APIClient()
         self.client.force_authenticate(self.user)
 
-    def retrieve_tags(self):
-        """Test retrieving tags"""
-        Tag.objects.create(user=self.user, name='Vegan')
+    def test_retrieve_tags(self):
+        """Test retrieving tags with the number of their recipes"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
         Tag.objects.create(user=self.user, name='Dessert')
+        sample_recipe(self.user, tags=[tag])
 
         res = self.client.get(TAGS_URL)
 
-        tags = Tag.objects.all().order_by('-name')
-        serializer = TagSerializer(tags, many=True)
+        tags = Tag.objects.annotate(
+            recipe_count=Count('recipe')
+        ).order_by('-name')
+        serializer = TagUsageSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
@@ -62,8 +69,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -83,3 +90,75 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_tags_with_recipe_count(self):
+        """Test each tag is listed with the number of its recipes"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        Tag.objects.create(user=self.user, name='Unused')
+        for title in ('Curry', 'Salad'):
+            recipe = sample_recipe(self.user, title=title)
+            recipe.tags.add(vegan)
+        recipe.tags.add(quick)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(TAGS_URL, {'ordering': '-recipe_count'})
+
+        self.assertEqual(
+            [(tag['name'], tag['recipe_count'])
+             for tag in res.data['results']],
+            [('Vegan', 2), ('Quick', 1), ('Unused', 0)]
+        )
+        counted = [query for query in queries
+                   if 'FROM "core_tag"' in query['sql']]
+        self.assertEqual(len(counted), 1)
+        self.assertIn('GROUP BY', counted[0]['sql'])
+
+    def test_retrieve_tags_assigned_only(self):
+        """Test filtering tags by those assigned to recipes"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Unused')
+        for title in ('Curry', 'Salad'):
+            sample_recipe(self.user, title=title).tags.add(vegan)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': '1'})
+
+        self.assertEqual(res.data['results'], [
+            {'id': vegan.id, 'name': 'Vegan', 'recipe_count': 2}
+        ])
+
+    def test_retrieve_tags_by_recipe_count_paginated(self):
+        """Test paging through tags ordered by their recipe count"""
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}')
+                for i in range(5)]
+        for i, tag in enumerate(tags):
+            for _ in range(i % 3):
+                sample_recipe(self.user).tags.add(tag)
+
+        names = []
+        res = self.client.get(
+            TAGS_URL,
+            {'ordering': '-recipe_count', 'page_size': 2}
+        )
+        while True:
+            names.extend(tag['name'] for tag in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            names,
+            ['Tag 2', 'Tag 1', 'Tag 4', 'Tag 0', 'Tag 3']
+        )
+
+    def test_retrieve_tags_invalid_params(self):
+        """Test unknown orderings and flags are rejected"""
+        res = self.client.get(TAGS_URL, {'ordering': 'user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', res.data)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 'yes'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('assigned_only', res.data)
@@ -1,26 +1,327 @@
 
 
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+
+from core import renderers, rollups, search, similarity
+from core.models import Tag, Ingredient, Recipe, CollectionVersion
+from core.signals import batch_collection_changes
+
+from recipe import (
+    serializers,
+    querysets,
+    images,
+    filters,
+    fastpath,
+    exporting,
+)
+from recipe.caching import CachedResponse, response_cache
+
+from user.authentication import CachedTokenAuthentication
+
+
+class ConditionalRequestMixin:
+    """Answer conditional list and detail requests from a version counter
+
+    The ETag and Last-Modified of every response derive from the user's
+    CollectionVersion, which is bumped on any change to their recipes,
+    tags or ingredients. A matching If-None-Match or If-Modified-Since
+    gets a 304 before the queryset or the serializer run.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_collection_version(self):
+        """Return the request user's CollectionVersion, loaded once"""
+        if not hasattr(self, '_collection_version'):
+            self._collection_version = CollectionVersion.objects.for_user(
+                self.request.user
+            )
+        return self._collection_version
+
+    def get_etag(self, request, version):
+        """Return the ETag of this response at the given version"""
+        key = ':'.join((
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            str(request.user.pk),
+            str(version.version),
+        ))
+        return '"%s"' % hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        version = self.get_collection_version()
+        etag = self.get_etag(request, version)
+        last_modified = int(version.updated_at.timestamp())
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+
+        return response
+
+
+class ResponseCacheMixin:
+    """Serve list responses from the per user response cache
+
+    Goes with ConditionalRequestMixin, whose collection version is part
+    of the cache key. Every successful write through the viewset, be it
+    create, update, destroy, an image upload or a bulk request, drops
+    the user's cached responses.
+    """
+    # Comma separated ID lists whose order does not matter
+    response_cache_list_params = ()
+
+    def list(self, request, *args, **kwargs):
+        key = response_cache.make_key(
+            f'{self.basename}-list',
+            f'{request.scheme}://{request.get_host()}',
+            request.accepted_renderer.format,
+            self.get_collection_version().version,
+            request.query_params,
+            self.response_cache_list_params
+        )
+        cached = response_cache.get(request.user.pk, key)
+        if cached is not None:
+            return HttpResponse(
+                cached.content,
+                content_type=cached.content_type
+            )
+
+        self._response_cache_key = key
+        return super().list(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response_cache.invalidate(request.user.pk)
+        elif (getattr(self, '_response_cache_key', None) and
+              isinstance(response, Response) and
+              response.status_code == 200):
+            response.render()
+            response_cache.set(
+                request.user.pk,
+                self._response_cache_key,
+                CachedResponse(response.content, response['Content-Type'])
+            )
 
-from core.models import Tag, Ingredient, Recipe
+        return response
 
-from recipe import serializers
 
+class FastListMixin:
+    """Build list responses from values() rows instead of instances
+
+    When the RECIPE_FAST_LIST setting is on and every field of the list
+    serializer can be read straight from a row, see recipe.fastpath,
+    the rows are turned into the same JSON the serializer would produce
+    without creating a model instance per row or calling its fields.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        if not (getattr(settings, 'RECIPE_FAST_LIST', False) and
+                fastpath.supports(serializer)):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = fastpath.rows(queryset, serializer, self.ordering)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                fastpath.serialize(serializer, page)
+            )
+
+        return Response(fastpath.serialize(serializer, rows))
+
+
+class BulkModelMixin:
+    """Create or update a list of objects in a single request
+
+    POST, PUT or PATCH a JSON list to '<resource>/bulk/'. The batch is
+    validated as a whole and errors are reported as a list aligned with
+    the payload, nothing is written unless every item is valid.
+    """
+    max_bulk_size = 1000
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create a list of objects"""
+        error = self._check_bulk_payload(request.data)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        if serializer.is_valid():
+            self.perform_bulk_create(serializer)
+            return Response(
+                self.get_bulk_response_data(serializer.instance),
+                status=status.HTTP_201_CREATED
+            )
+
+        return Response(
+            serializer.errors,
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    @bulk.mapping.put
+    def bulk_update(self, request):
+        """Update a list of objects identified by their 'id'"""
+        return self._bulk_update(request, partial=False)
+
+    @bulk.mapping.patch
+    def bulk_partial_update(self, request):
+        """Partially update a list of objects identified by their 'id'"""
+        return self._bulk_update(request, partial=True)
+
+    def _bulk_update(self, request, partial):
+        error = self._check_bulk_payload(request.data)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+        # Anything but an integer id is not found, true and false
+        # included even though they compare equal to 1 and 0
+        ids = [
+            item.get('id') if isinstance(item, dict) else None
+            for item in request.data
+        ]
+        ids = [
+            pk if isinstance(pk, int) and not isinstance(pk, bool) else None
+            for pk in ids
+        ]
+        found = self.get_queryset().in_bulk([
+            pk for pk in ids if pk is not None
+        ])
+        errors = [
+            {} if pk in found else {'id': ['Object not found.']}
+            for pk in ids
+        ]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(
+            [found[pk] for pk in ids],
+            data=request.data,
+            many=True,
+            partial=partial
+        )
+        if serializer.is_valid():
+            self.perform_bulk_update(serializer)
+            return Response(
+                self.get_bulk_response_data(serializer.instance),
+                status=status.HTTP_200_OK
+            )
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+        return Response(
+            serializer.errors,
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def _check_bulk_payload(self, data):
+        """Return an error for payloads that are not a usable list"""
+        if not isinstance(data, list) or not data:
+            return {'non_field_errors': ['Expected a non-empty list.']}
+        if len(data) > self.max_bulk_size:
+            return {'non_field_errors': [
+                f'Expected at most {self.max_bulk_size} items.'
+            ]}
+
+        return None
+
+    def perform_bulk_create(self, serializer):
+        """Create the objects for the current authenticated user"""
+        serializer.save(user=self.request.user)
+
+    def perform_bulk_update(self, serializer):
+        """Update the objects"""
+        serializer.save()
+
+    def get_bulk_response_data(self, instances):
+        """Return the representation of the objects written"""
+        return self.get_serializer(instances, many=True).data
+
+
+class BaseRecipeAttrViewSet(ConditionalRequestMixin,
+                            ResponseCacheMixin,
+                            FastListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
-                            mixins.CreateModelMixin):
+                            mixins.CreateModelMixin,
+                            BulkModelMixin):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
+    ordering = ('-name', 'id')
+    # Orderings the list takes as '?ordering=', all ending in a unique
+    # field for the keyset pagination
+    orderings = {
+        'name': ('name', 'id'),
+        '-name': ('-name', 'id'),
+        'recipe_count': ('recipe_count', 'id'),
+        '-recipe_count': ('-recipe_count', 'id'),
+    }
+    usage_serializer_class = None
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            queryset = self.annotate_usage(queryset)
+
+        return queryset.order_by(*self.ordering)
+
+    def annotate_usage(self, queryset):
+        """Count the recipes of each object in the grouped list query
+
+        '?assigned_only=1' inner joins the M2M table, whose covering
+        (object, recipe) index serves the count, to keep the objects
+        used by at least one recipe.
+        """
+        params = self.request.query_params
+        self.ordering = filters.parse_ordering(
+            params.get('ordering'), self.orderings, self.ordering
+        )
+        if filters.parse_flag(params.get('assigned_only'), 'assigned_only'):
+            queryset = queryset.filter(recipe__isnull=False)
+
+        return queryset.annotate(
+            recipe_count=Count('recipe', distinct=True)
+        )
+
+    def get_serializer_class(self):
+        """Return the serializer adding the recipe count to lists"""
+        if self.action == 'list':
+            return self.usage_serializer_class
+
+        return self.serializer_class
 
     def perform_create(self, serializer):
         """Create a new object"""
@@ -31,42 +332,105 @@ class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    usage_serializer_class = serializers.TagUsageSerializer
 
 
 class IngredientViewset(BaseRecipeAttrViewSet):
     """Manage ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    usage_serializer_class = serializers.IngredientUsageSerializer
 
 
-class RecipeViewset(viewsets.ModelViewSet):
+class RecipeViewset(ConditionalRequestMixin,
+                    ResponseCacheMixin,
+                    FastListMixin,
+                    viewsets.ModelViewSet,
+                    BulkModelMixin):
     """Manage recipes in the database"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
+    ordering = ('-id',)
+    search_ordering = ('-search_rank', '-id')
+    sparse_field_actions = ('list', 'retrieve')
+    response_cache_list_params = ('tags', 'ingredients', 'fields', 'expand')
+    # Query params narrowing down the recipes the stats are computed over
+    stats_filter_params = ('tags', 'ingredients', 'search')
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, qs, param):
         """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            ids = [int(str_id) for str_id in qs.split(',') if str_id.strip()]
+        except ValueError:
+            raise ValidationError(
+                {param: ['Expected a comma separated list of IDs.']}
+            )
+
+        # Duplicates would throw off the count when matching all IDs
+        return list(dict.fromkeys(ids))
 
     def get_queryset(self):
         """Return recipe objects for the current authenticated user"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
         queryset = self.queryset
+        if tags or ingredients:
+            match = filters.parse_match(
+                self.request.query_params.get('match')
+            )
+        # Filtering runs as subqueries on the M2M tables rather than
+        # joining them, a recipe matching several of the IDs is still
+        # returned once. 'match=all' keeps recipes linked to every ID
         if tags:
-            tags_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags_ids)
-        # '__' is the django syntax for filtering on foreign key objects
-        # There is a 'tags' field in the 'Recipe' queryset which is a
-        # foreign key to the 'Tags' table where the tag ids are found
-        # Hence, search the tags table for ids that are in the list provided
+            tags_ids = self._params_to_ints(tags, 'tags')
+            queryset = filters.filter_related(
+                queryset, 'tags', tags_ids, match
+            )
         if ingredients:
-            ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+            ingredients_ids = self._params_to_ints(ingredients, 'ingredients')
+            queryset = filters.filter_related(
+                queryset, 'ingredients', ingredients_ids, match
+            )
+
+        # Full text search over the title, tag and ingredient names,
+        # best matches first
+        text = self.request.query_params.get('search', '').strip()
+        if text:
+            queryset = search.search(queryset, text)
+            self.ordering = self.search_ordering
+
+        fields, expand = self.get_sparse_fields()
+        queryset = querysets.for_action(queryset, self.action, fields, expand)
 
-        return queryset.filter(user=self.request.user)
+        return queryset.filter(user=self.request.user).order_by(*self.ordering)
+
+    def get_sparse_fields(self):
+        """Return the (fields, expand) names picked by the query params
+
+        Only reads support them, both are None when not given.
+        """
+        if self.action not in self.sparse_field_actions:
+            return None, None
+        serializer_class = self.get_serializer_class()
+        params = self.request.query_params
+        return (
+            filters.parse_fields(
+                params.get('fields'), serializer_class.Meta.fields, 'fields'
+            ),
+            filters.parse_fields(
+                params.get('expand'),
+                tuple(serializer_class.expandable_fields),
+                'expand'
+            ),
+        )
+
+    def get_serializer_context(self):
+        """Pass the sparse fieldset on to the serializer"""
+        context = super().get_serializer_context()
+        context['fields'], context['expand'] = self.get_sparse_fields()
+        return context
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -74,9 +438,22 @@ class RecipeViewset(viewsets.ModelViewSet):
             return serializers.RecipeDetailSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'stats':
+            return serializers.RecipeStatsSerializer
+        elif self.action == 'similar':
+            return serializers.SimilarRecipeSerializer
 
         return self.serializer_class
 
+    def get_bulk_response_data(self, instances):
+        """Return the recipes written, prefetched like the list view"""
+        ids = [recipe.id for recipe in instances]
+        recipes = querysets.recipe_list(self.queryset).in_bulk(ids)
+        return self.get_serializer(
+            [recipes[pk] for pk in ids],
+            many=True
+        ).data
+
     def perform_create(self, serializer):
         """Create a new recipe"""
         # This is all thats needed to create an object, built in function of
@@ -85,7 +462,93 @@ class RecipeViewset(viewsets.ModelViewSet):
         # to a model, the MVS knows how to create new objects with
         # the model when using an HTTP post
         # Just assign an authenticated user to the model for it to work
-        serializer.save(user=self.request.user)
+        # Saving the recipe and then its tags and ingredients bumps the
+        # user's version and reindexes the recipe once rather than thrice
+        with batch_collection_changes():
+            serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        """Update a recipe along with its tags and ingredients"""
+        with batch_collection_changes():
+            serializer.save()
+
+    @action(methods=['GET'], detail=False,
+            renderer_classes=(renderers.NDJSONRenderer,))
+    def export(self, request):
+        """Stream the user's recipes as NDJSON, one recipe per line"""
+        chunk_size = settings.RECIPE_EXPORT_CHUNK_SIZE
+        recipes = exporting.iter_recipes(
+            self.get_queryset(), self.ordering, chunk_size
+        )
+        response = StreamingHttpResponse(
+            request.accepted_renderer.iter_render(recipes, chunk_size),
+            content_type=request.accepted_renderer.media_type
+        )
+        response['Content-Disposition'] = \
+            'attachment; filename="recipes.ndjson"'
+
+        return response
+
+    @action(methods=['GET'], detail=False)
+    def stats(self, request):
+        """Return aggregate figures of the user's recipes
+
+        The recipes can be filtered like the list. Unfiltered stats come
+        from the user's rollup when the RECIPE_STATS 'ROLLUP' setting is
+        on, otherwise they are aggregated in SQL on every request.
+        """
+        return self._conditional(self._stats, request)
+
+    def _stats(self, request):
+        filtered = any(
+            request.query_params.get(param)
+            for param in self.stats_filter_params
+        )
+        if rollups.get_config()['ROLLUP'] and not filtered:
+            values = rollups.user_values(request.user)
+        else:
+            values = rollups.collect(self.get_queryset())
+
+        return Response(self.get_serializer(rollups.stats(values)).data)
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """Return the user's recipes sharing the most tags and ingredients
+
+        Ranked by the Jaccard index of their tags and ingredients, or
+        their cosine similarity with '?metric=cosine', best first. The
+        ranking comes from the user's index in core.similarity.
+        """
+        return self._conditional(self._similar, request)
+
+    def _similar(self, request):
+        config = similarity.get_config()
+        params = request.query_params
+        metric = filters.parse_choice(
+            params.get('metric'), similarity.METRICS, 'metric'
+        )
+        limit = filters.parse_limit(
+            params.get('limit'), config['LIMIT'], config['MAX_LIMIT']
+        )
+        recipe = self.get_object()
+
+        ranked = similarity.similar_recipes(
+            request.user,
+            self.get_collection_version().version,
+            recipe.pk,
+            limit,
+            metric
+        )
+        recipes = querysets.recipe_list(
+            self.queryset.filter(user=request.user)
+        ).in_bulk([pk for pk, _ in ranked])
+        similar = []
+        for pk, score in ranked:
+            if pk in recipes:
+                recipes[pk].similarity = round(score, 4)
+                similar.append(recipes[pk])
+
+        return Response(self.get_serializer(similar, many=True).data)
 
 # 'actions' aredefined as functions in the viewset
 # 'detail' defines that the 'action' will be for a specific recipe, hence
@@ -104,11 +567,12 @@ class RecipeViewset(viewsets.ModelViewSet):
         )
 # Validates that only the required fields are present and correct
         if serializer.is_valid():
-            # since a ModelSerializer is used we can use the 'save()'
-            serializer.save()
+            # Writing and resizing the image happens on the worker pool,
+            # the recipe is marked pending until its variants are ready
+            images.schedule(recipe, serializer.validated_data['image'])
             return Response(
                 serializer.data,
-                status=status.HTTP_200_OK
+                status=status.HTTP_202_ACCEPTED
             )
 
         return Response(
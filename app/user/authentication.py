@@ -0,0 +1,124 @@
+import pickle
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.authentication import TokenAuthentication
+
+from core import instrumentation
+from core.cache import LRUCache
+
+
+class TokenCache:
+    """Cache of token key to authenticated Token
+
+    Tokens are kept pickled, with their user attached, in an in-process
+    LRU or, when a shared Django cache is configured, in that cache only.
+    Invalidations land where every worker reads, so a token revoked or
+    a user deactivated through any process stops authenticating in all
+    of them. Each lookup unpickles a fresh copy so requests never share
+    model instances.
+    """
+    key_prefix = 'auth-token:'
+
+    def __init__(self, max_size=10000, ttl=60, shared_cache=None):
+        self.local = LRUCache(max_size=max_size, ttl=ttl)
+        self.ttl = ttl
+        self.shared_cache = shared_cache
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """Build the cache from the TOKEN_AUTH_CACHE setting"""
+        config = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+        return cls(
+            max_size=config.get('MAX_SIZE', 10000),
+            ttl=config.get('TTL', 60),
+            shared_cache=config.get('SHARED_CACHE'),
+        )
+
+    @property
+    def shared(self):
+        if self.shared_cache is None:
+            return None
+        return caches[self.shared_cache]
+
+    def get(self, key):
+        """Return the cached Token for key, or None"""
+        if self.shared is None:
+            data = self.local.get(key)
+        else:
+            data = self.shared.get(self.key_prefix + key)
+            with self._lock:
+                if data is None:
+                    self.shared_misses += 1
+                else:
+                    self.shared_hits += 1
+        if data is None:
+            return None
+
+        return pickle.loads(data)
+
+    def set(self, key, token):
+        """Cache token, with its user, under key"""
+        data = pickle.dumps(token, pickle.HIGHEST_PROTOCOL)
+        if self.shared is None:
+            self.local.set(key, data)
+        else:
+            self.shared.set(self.key_prefix + key, data, self.ttl)
+
+    def invalidate(self, key):
+        """Drop key from the cache"""
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(self.key_prefix + key)
+
+    def clear(self):
+        """Drop the local tier and reset the counters"""
+        self.local.clear()
+        self.shared_hits = self.shared_misses = 0
+
+    def stats(self):
+        """Return hit and miss counters of the local and shared caches"""
+        stats = self.local.stats()
+        stats['shared_hits'] = self.shared_hits
+        stats['misses'] += self.shared_misses
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = (
+            (stats['hits'] + stats['shared_hits']) / lookups
+            if lookups else 0.0
+        )
+
+        return stats
+
+
+token_cache = TokenCache.from_settings()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches token to user resolution
+
+    Entries are dropped when the token is deleted or its user is saved,
+    see user.signals, and a cached user that is no longer active is
+    looked up again. Without a shared cache other worker processes only
+    notice once the TTL runs out, as do all of them for changes made by
+    queryset updates and deletes, which send no signals.
+    """
+
+    def authenticate(self, request):
+        with instrumentation.timed('auth'):
+            return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None and not token.user.is_active:
+            token_cache.invalidate(key)
+            token = None
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+
+        return (token.user, token)
@@ -0,0 +1,109 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from user.authentication import (
+    CachedTokenAuthentication, TokenCache, token_cache
+)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test caching token to user resolution"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@mail.com',
+            password='testpass',
+            name='Test Name'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_cached_lookup_skips_database(self):
+        """Test that a repeated lookup is served without queries"""
+        user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_invalid_token_rejected(self):
+        """Test that an unknown token fails and is not cached"""
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials('invalid')
+
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+    def test_deleted_token_invalidated(self):
+        """Test that a deleted token stops authenticating"""
+        self.auth.authenticate_credentials(self.token.key)
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user_invalidated(self):
+        """Test that deactivating the user stops the token authenticating"""
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_shared_tier_serves_other_workers(self):
+        """Test that a token cached by one worker is found by another"""
+        first = TokenCache(shared_cache='default')
+        second = TokenCache(shared_cache='default')
+        first.set(self.token.key, self.token)
+
+        token = second.get(self.token.key)
+
+        self.assertEqual(token.user, self.user)
+        self.assertEqual(second.stats()['shared_hits'], 1)
+        self.assertEqual(second.stats()['misses'], 0)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_shared_invalidation_reaches_other_workers(self):
+        """Test that a token revoked by another worker stops working"""
+        worker = TokenCache(shared_cache='default')
+        other_worker = TokenCache(shared_cache='default')
+        with patch('user.authentication.token_cache', worker):
+            self.auth.authenticate_credentials(self.token.key)
+            # Another process deletes the token, clearing the shared tier
+            Token.objects.filter(pk=self.token.pk).delete()
+            other_worker.invalidate(self.token.key)
+
+            with self.assertRaises(AuthenticationFailed):
+                self.auth.authenticate_credentials(self.token.key)
+
+    def test_inactive_cached_user_rejected(self):
+        """Test that a cached user that is no longer active fails"""
+        self.auth.authenticate_credentials(self.token.key)
+        token = token_cache.get(self.token.key)
+        token.user.is_active = False
+        token_cache.set(self.token.key, token)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)